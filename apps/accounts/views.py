@@ -6,8 +6,7 @@ from django.contrib.auth.decorators import login_required, user_passes_test
 from django.contrib.auth.forms import AuthenticationForm
 from django.core import signing
 from django.core.exceptions import FieldDoesNotExist
-from django.db.models import Q, Sum, Exists, OuterRef
-from django.db.models.functions import TruncMonth
+from django.db.models import Q, Exists, OuterRef
 from django.db.models.deletion import ProtectedError
 from django.http import HttpResponseBadRequest
 from django.shortcuts import get_object_or_404, redirect, render
@@ -16,6 +15,7 @@ from django.utils import timezone
 
 from .forms import AddUserForm, SignUpForm
 from apps.orders.models import Order
+from apps.orders.services.rollups import sales_series
 
 User = get_user_model()
 
@@ -225,6 +225,9 @@ def my_invoices(request):
     if sel:
         qs = qs.select_related(*sel)
 
+    if hasattr(qs, "with_totals"):
+        qs = qs.with_totals()  # template falls back to inv.total when amount is 0
+
     invoices = qs.order_by(*_invoice_ordering(Inv))[:200]
 
     return render(
@@ -312,26 +315,10 @@ def users_list(request):
 def user_detail(request, pk):
     u = get_object_or_404(User, pk=pk)
 
-    # build 12-month history for this user's orders
+    # 12-month history for this user's orders, from the monthly rollup rows
     now = timezone.now()
     start = (now.replace(day=1) - timezone.timedelta(days=365)).replace(day=1)
-
-    qs = (
-        Order.objects.filter(user=u, created_at__gte=start)
-        .annotate(month=TruncMonth("created_at"))
-        .values("month")
-        .annotate(
-            airport_total=Sum("amount", filter=Q(category=Order.Category.AIRPORT_SERVICE)),
-            car_total=Sum("amount", filter=Q(category=Order.Category.CAR_RENTAL)),
-        )
-        .order_by("month")
-    )
-
-    labels, airport_series, car_series = [], [], []
-    for row in qs:
-        labels.append(row["month"].strftime("%b %Y"))
-        airport_series.append(float(row.get("airport_total") or 0))
-        car_series.append(float(row.get("car_total") or 0))
+    sales = sales_series(timezone.localtime(start).date(), timezone.localdate(), "month", user=u)
 
     phone = ""
     if hasattr(u, "profile") and getattr(u.profile, "phone", ""):
@@ -340,9 +327,10 @@ def user_detail(request, pk):
     ctx = {
         "u": u,
         "phone": phone or "",
-        "labels": labels,
-        "airport_series": airport_series,
-        "car_series": car_series,
+        "labels": sales.labels,
+        "airport_series": sales.airport,
+        "car_series": sales.car,
+        "sales_currency": sales.currency,
     }
     return render(request, "accounts/user_detail.html", ctx)
 
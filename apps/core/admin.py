@@ -1,3 +1,20 @@
 from django.contrib import admin
+from django.utils import timezone
 
-# Register your models here.
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "task", "queue", "status", "attempts", "max_attempts", "run_at", "finished_at")
+    list_filter = ("status", "queue", "task")
+    search_fields = ("task", "key")
+    readonly_fields = ("created_at", "finished_at", "locked_by", "locked_until", "last_error")
+    actions = ["requeue"]
+
+    @admin.action(description="Re-queue selected jobs")
+    def requeue(self, request, queryset):
+        n = queryset.exclude(status=Job.Status.RUNNING).update(
+            status=Job.Status.QUEUED, attempts=0, run_at=timezone.now(), locked_until=None,
+        )
+        self.message_user(request, f"{n} job(s) re-queued.")
@@ -0,0 +1,117 @@
+"""
+Exchange rates from a local file (FX_RATES_FILE, JSON or CSV; no network),
+held in memory per worker and reloaded only when the file changes.
+
+JSON: {"base": "EUR", "as_of": "...", "rates": {"USD": "0.858", ...}}
+CSV:  currency,rate  (header optional; base is BASE_CURRENCY)
+
+A rate is the value of one unit of the currency in the base currency.
+Conversion happens in SQL with one CASE over currency, so a report sums
+every currency into the base in the same aggregate query:
+
+    Order.objects.aggregate(total=Sum(fx.to_base("amount")))
+"""
+from __future__ import annotations
+
+import csv
+import json
+import logging
+import os
+import threading
+from decimal import Decimal, InvalidOperation
+from typing import Dict, Iterable, NamedTuple, Optional
+
+from django.conf import settings
+from django.db.models import Case, DecimalField, F, Value, When
+
+logger = logging.getLogger(__name__)
+
+CENT = Decimal("0.01")
+MONEY = DecimalField(max_digits=20, decimal_places=6)
+
+
+class RateTable(NamedTuple):
+    base: str
+    rates: Dict[str, Decimal]
+    as_of: str = ""
+
+    def rate(self, currency: str) -> Optional[Decimal]:
+        return self.rates.get((currency or "").upper())
+
+    def convert(self, amount, currency: str) -> Optional[Decimal]:
+        """amount in the base currency (to the cent), or None when there is no rate."""
+        rate = self.rate(currency)
+        if rate is None or amount is None:
+            return None
+        return (Decimal(amount) * rate).quantize(CENT)
+
+
+_lock = threading.Lock()
+_loaded: Dict[str, object] = {"key": None, "table": None}
+
+
+def _base_currency() -> str:
+    return getattr(settings, "BASE_CURRENCY", "EUR").upper()
+
+
+def _parse(path: str) -> RateTable:
+    base, as_of, raw = _base_currency(), "", {}
+    with open(path, newline="", encoding="utf-8") as fh:
+        if path.endswith(".json"):
+            data = json.load(fh)
+            base, as_of, raw = data.get("base", base).upper(), data.get("as_of", ""), data["rates"]
+        else:
+            for row in csv.reader(fh):
+                if len(row) >= 2 and row[0].strip() and row[0].strip().lower() != "currency":
+                    raw[row[0]] = row[1]
+    rates = {}
+    for cur, value in raw.items():
+        try:
+            rates[cur.strip().upper()] = Decimal(str(value).strip())
+        except InvalidOperation:
+            logger.warning("Ignoring FX rate %r for %s in %s", value, cur, path)
+    rates[base] = Decimal(1)
+    return RateTable(base, rates, as_of)
+
+
+def rates() -> RateTable:
+    """The current rate table; one stat() per call, a re-parse only when the file changed."""
+    path = str(getattr(settings, "FX_RATES_FILE", ""))
+    try:
+        key = (path, os.stat(path).st_mtime_ns)
+    except OSError:
+        key = (path, None)
+    if _loaded["key"] == key:
+        return _loaded["table"]
+    with _lock:
+        if _loaded["key"] != key:
+            if key[1] is None:
+                logger.warning("FX rates file %s not found; only %s amounts convert", path, _base_currency())
+                table = RateTable(_base_currency(), {_base_currency(): Decimal(1)})
+            else:
+                table = _parse(path)
+            _loaded.update(key=key, table=table)
+    return _loaded["table"]
+
+
+def to_base(field: str = "amount", currency_field: str = "currency",
+            currencies: Optional[Iterable[str]] = None) -> Case:
+    """
+    SQL expression converting `field` to the base currency. Rows in a
+    currency without a rate become NULL, so Sum() leaves them out; use
+    missing() to report them. Pass `currencies` to keep the CASE short.
+    """
+    table = rates()
+    wanted = table.rates if currencies is None else {c for c in currencies if table.rate(c) is not None}
+    whens = [
+        When(**{currency_field: cur}, then=F(field) * Value(table.rates[cur], output_field=MONEY))
+        for cur in sorted(wanted)
+        if cur != table.base
+    ]
+    return Case(*whens, When(**{currency_field: table.base}, then=F(field)), default=None, output_field=MONEY)
+
+
+def missing(currencies: Iterable[str]) -> list:
+    """Currencies in the data that the rate table can't convert."""
+    table = rates()
+    return sorted({c for c in currencies if c and table.rate(c) is None})
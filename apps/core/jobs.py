@@ -0,0 +1,267 @@
+"""
+Database-backed job queue (no external broker).
+
+    from apps.core import jobs
+
+    @jobs.task("invoices.email")
+    def email_invoice(invoice_id): ...
+
+    jobs.enqueue("invoices.email", invoice_id=inv.pk, key=f"invoice-email:{inv.pk}")
+
+Jobs are rows in core.Job, inserted in the caller's transaction, and run by
+`manage.py run_worker`. Claiming is a conditional UPDATE, so it is safe
+across worker processes on both SQLite and Postgres. A running job's lease
+is renewed by a heartbeat; a job whose worker died is picked up again once
+its visibility timeout expires. Failed and abandoned runs both count toward
+max_attempts; failed jobs are retried with exponential backoff.
+"""
+from __future__ import annotations
+
+import logging
+import random
+import threading
+import traceback
+import uuid
+from datetime import timedelta
+from typing import Callable, Dict, Optional
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_registry: Dict[str, Callable] = {}
+_failure_hooks: Dict[str, Callable] = {}
+_running = threading.local()
+
+
+def task(name: str):
+    """Register a function as a job handler under `name`; kwargs come from the payload."""
+    def decorator(fn):
+        _registry[name] = fn
+        return fn
+    return decorator
+
+
+def on_failure(name: str):
+    """Register fn(**payload) to call once task `name` has exhausted its retries."""
+    def decorator(fn):
+        _failure_hooks[name] = fn
+        return fn
+    return decorator
+
+
+def _notify_failure(job: Job) -> None:
+    hook = _failure_hooks.get(job.task)
+    if hook is None:
+        return
+    try:
+        hook(**job.payload)
+    except Exception:
+        logger.exception("Failure hook for %s raised", job)
+
+
+def current() -> Optional[Job]:
+    """The job this thread is executing, if any."""
+    return getattr(_running, "job", None)
+
+
+def report_progress(**state) -> bool:
+    """
+    Store `state` (JSON) on the running job's row, where any process can
+    read it, e.g. a web worker showing progress. No-op outside a job.
+    """
+    job = current()
+    if job is None:
+        return False
+    job.progress = {**state, "updated_at": timezone.now().isoformat()}
+    return bool(_owned(job).update(progress=job.progress))
+
+
+def discover() -> None:
+    """Import every installed app's `tasks` module so handlers are registered."""
+    autodiscover_modules("tasks")
+
+
+def _setting(name: str, default):
+    return getattr(settings, name, default)
+
+
+def enqueue(name: str, *, key: str = "", queue: str = "default", delay: float = 0,
+            max_attempts: Optional[int] = None, **payload) -> Job:
+    """
+    Queue task `name`. With a `key`, an existing QUEUED job with the same key
+    is returned instead of adding a duplicate.
+    """
+    if key:
+        existing = Job.objects.filter(key=key, status=Job.Status.QUEUED).first()
+        if existing is not None:
+            return existing
+    job = Job.objects.create(
+        queue=queue,
+        task=name,
+        payload=payload,
+        key=key,
+        max_attempts=max_attempts or _setting("JOBS_MAX_ATTEMPTS", 5),
+        run_at=timezone.now() + timedelta(seconds=delay),
+    )
+    if _setting("JOBS_RUN_EAGERLY", False):
+        transaction.on_commit(lambda: run(job.pk, worker="eager"))
+    return job
+
+
+# ---------- worker side ----------
+#
+# A claim is a lease: locked_by names the worker and locked_until is kept in
+# the future by a heartbeat while the handler runs. Only the lease holder may
+# record the outcome, and the attempt is counted when the job is claimed, so
+# a job whose worker died still uses up one of its max_attempts.
+
+def _lease() -> timedelta:
+    return timedelta(seconds=_setting("JOBS_VISIBILITY_TIMEOUT", 300))
+
+
+def _claimable(queue: str, now):
+    return Job.objects.filter(queue=queue).filter(
+        Q(status=Job.Status.QUEUED, run_at__lte=now)
+        | Q(status=Job.Status.RUNNING, locked_until__lt=now)  # abandoned by a dead worker
+    ).filter(attempts__lt=F("max_attempts"))
+
+
+def _claimable_any(now):
+    return Job.objects.filter(
+        Q(status=Job.Status.QUEUED) | Q(status=Job.Status.RUNNING, locked_until__lt=now)
+    ).filter(attempts__lt=F("max_attempts"))
+
+
+def _owned(job: Job):
+    """The job row, as long as this worker still holds its lease."""
+    return Job.objects.filter(pk=job.pk, status=Job.Status.RUNNING, locked_by=job.locked_by)
+
+
+def _fail_abandoned(now) -> None:
+    """Abandoned jobs that were on their last attempt fail instead of running again."""
+    stale = Job.objects.filter(
+        status=Job.Status.RUNNING, locked_until__lt=now, attempts__gte=F("max_attempts"),
+    )
+    for job in stale[:10]:
+        failed = stale.filter(pk=job.pk).update(
+            status=Job.Status.FAILED, locked_until=None, finished_at=now,
+            last_error=f"Worker {job.locked_by} stopped renewing its lease on the last attempt.",
+        )
+        if failed:
+            logger.error("Job %s abandoned on its last attempt", job)
+            _notify_failure(job)
+
+
+def _take(candidates, pk: int, worker: str, now) -> Optional[Job]:
+    won = candidates.filter(pk=pk).update(
+        status=Job.Status.RUNNING,
+        attempts=F("attempts") + 1,
+        locked_until=now + _lease(),
+        locked_by=worker[:64],
+    )
+    return Job.objects.get(pk=pk) if won else None
+
+
+def claim(worker: str, queue: str = "default") -> Optional[Job]:
+    """
+    Take the next due job. Each candidate is claimed with a conditional
+    UPDATE; losing a race to another worker just moves on to the next one.
+    """
+    now = timezone.now()
+    _fail_abandoned(now)
+    for pk in _claimable(queue, now).order_by("run_at", "id").values_list("pk", flat=True)[:10]:
+        job = _take(_claimable(queue, now), pk, worker, now)
+        if job is not None:
+            return job
+    return None
+
+
+class _Heartbeat(threading.Thread):
+    """Extends a running job's lease every third of the visibility timeout until stopped."""
+
+    def __init__(self, job: Job):
+        super().__init__(name=f"job-heartbeat-{job.pk}", daemon=True)
+        self.job = job
+        self.lost = False
+        self._stop_event = threading.Event()
+
+    def run(self):
+        lease = _lease()
+        try:
+            while not self._stop_event.wait(max(1.0, lease.total_seconds() / 3)):
+                try:
+                    renewed = _owned(self.job).update(locked_until=timezone.now() + lease)
+                except Exception:
+                    logger.warning("Could not renew the lease of job %s", self.job, exc_info=True)
+                    continue
+                if not renewed:
+                    self.lost = True
+                    logger.error("Job %s lost its lease; another worker may run it", self.job)
+                    return
+        finally:
+            connection.close()
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+
+def _backoff(attempts: int) -> float:
+    base = _setting("JOBS_RETRY_BACKOFF", 30)
+    return base * (2 ** (attempts - 1)) * random.uniform(0.8, 1.2)
+
+
+def _finish(job: Job, **fields) -> bool:
+    """Record the outcome unless the lease was lost (the new holder owns the row now)."""
+    if _owned(job).update(locked_until=None, **fields):
+        return True
+    logger.warning("Job %s finished after losing its lease; outcome not recorded", job)
+    return False
+
+
+def execute(job: Job) -> bool:
+    """Run a claimed job and record the outcome; True on success."""
+    fn = _registry.get(job.task)
+    heartbeat = _Heartbeat(job)
+    heartbeat.start()
+    _running.job = job
+    try:
+        if fn is None:
+            raise LookupError(f"No handler registered for task {job.task!r}")
+        fn(**job.payload)
+    except Exception:
+        _running.job = None
+        heartbeat.stop()
+        error = traceback.format_exc(limit=5)
+        if job.attempts >= job.max_attempts or fn is None:
+            logger.error("Job %s failed permanently after %d attempt(s)", job, job.attempts)
+            if _finish(job, status=Job.Status.FAILED, last_error=error, finished_at=timezone.now()):
+                _notify_failure(job)
+        else:
+            retry_in = _backoff(job.attempts)
+            logger.warning("Job %s failed (attempt %d), retrying in %.0fs", job, job.attempts, retry_in)
+            _finish(
+                job, status=Job.Status.QUEUED, last_error=error,
+                run_at=timezone.now() + timedelta(seconds=retry_in),
+            )
+        return False
+    _running.job = None
+    heartbeat.stop()
+    _finish(job, status=Job.Status.DONE, finished_at=timezone.now())
+    return True
+
+
+def run(pk: int, worker: str = "inline") -> bool:
+    """Claim and run one specific job now (JOBS_RUN_EAGERLY, admin "run now")."""
+    discover()
+    job = _take(_claimable_any(timezone.now()), pk, f"{worker}:{uuid.uuid4().hex[:8]}", timezone.now())
+    if job is None:
+        return False
+    return execute(job)
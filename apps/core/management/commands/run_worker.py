@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import os
+import signal
+import socket
+import threading
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connection
+
+from apps.core import jobs
+
+
+class Command(BaseCommand):
+    help = "Run background jobs from the database queue (core.Job)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queue", default="default", help="Queue to consume")
+        parser.add_argument("--concurrency", type=int, default=2, help="Worker threads")
+        parser.add_argument(
+            "--poll", type=float, default=getattr(settings, "JOBS_POLL_INTERVAL", 2.0),
+            help="Seconds to sleep when the queue is empty",
+        )
+        parser.add_argument("--once", action="store_true", help="Drain due jobs, then exit")
+
+    def handle(self, *args, **options):
+        jobs.discover()
+        self.stop = threading.Event()
+        signal.signal(signal.SIGTERM, lambda *_: self.stop.set())
+        signal.signal(signal.SIGINT, lambda *_: self.stop.set())
+
+        base = f"{socket.gethostname()}:{os.getpid()}"
+        n = max(1, options["concurrency"])
+        self.stdout.write(f"Worker {base}: queue={options['queue']} concurrency={n}")
+
+        threads = [
+            threading.Thread(
+                target=self._loop, args=(f"{base}:{i}", options["queue"], options["poll"], options["once"]),
+                name=f"job-worker-{i}", daemon=True,
+            )
+            for i in range(n)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            while t.is_alive():
+                t.join(0.5)  # keep the main thread responsive to signals
+        self.stdout.write("Worker stopped.")
+
+    def _loop(self, worker: str, queue: str, poll: float, once: bool):
+        try:
+            while not self.stop.is_set():
+                close_old_connections()
+                job = jobs.claim(worker, queue)
+                if job is None:
+                    if once:
+                        return
+                    self.stop.wait(poll)
+                    continue
+                ok = jobs.execute(job)
+                self.stdout.write(f"[{worker}] {job.task} #{job.pk} {'done' if ok else 'failed'}")
+        finally:
+            connection.close()
@@ -1,5 +1,6 @@
 from django.conf import settings  
 from django.db import models
+from django.utils import timezone
 
 class Profile(models.Model):
     user = models.OneToOneField(
@@ -10,3 +11,41 @@ class Profile(models.Model):
     display_name = models.CharField(max_length=150, blank=True, default="")
     avatar_url   = models.URLField(blank=True, default="")
     phone        = models.CharField(max_length=40, blank=True, default="")  # added
+
+
+class Job(models.Model):
+    """
+    Unit of background work for `manage.py run_worker` (see apps.core.jobs).
+    A RUNNING job whose locked_until has passed is treated as abandoned and
+    picked up again (visibility timeout).
+    """
+
+    class Status(models.TextChoices):
+        QUEUED = "QUEUED", "Queued"
+        RUNNING = "RUNNING", "Running"
+        DONE = "DONE", "Done"
+        FAILED = "FAILED", "Failed"
+
+    queue        = models.CharField(max_length=32, default="default")
+    task         = models.CharField(max_length=100)  # registered name, e.g. "invoices.email"
+    payload      = models.JSONField(default=dict, blank=True)
+    key          = models.CharField(max_length=100, blank=True, default="", db_index=True)  # de-duplication
+    status       = models.CharField(max_length=10, choices=Status.choices, default=Status.QUEUED)
+    attempts     = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    run_at       = models.DateTimeField(default=timezone.now)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    locked_by    = models.CharField(max_length=64, blank=True, default="")
+    last_error   = models.TextField(blank=True, default="")
+    progress     = models.JSONField(default=dict, blank=True)  # set by the handler, see jobs.report_progress()
+    created_at   = models.DateTimeField(auto_now_add=True)
+    finished_at  = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ("run_at", "id")
+        indexes = [
+            models.Index(fields=["queue", "status", "run_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.task} #{self.pk} ({self.status})"
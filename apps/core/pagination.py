@@ -0,0 +1,286 @@
+"""
+Keyset ("seek") pagination for newest-first list views.
+
+    paginator = KeysetPaginator(qs, per_page=12)
+    page_obj = paginator.get_page(cursor=request.GET.get("cursor"), number=request.GET.get("page"))
+
+Pages are fetched with WHERE (created_at, id) < (last_created_at, last_id)
+instead of OFFSET, so deep pages cost the same as the first one. Cursors are
+signed, opaque strings carrying the boundary row and the page number. A plain
+?page=N still works (OFFSET) for direct jumps from a page window. The total
+is estimated (Postgres reltuples for unfiltered tables) or counted once and
+cached for LIST_COUNT_CACHE_TTL seconds.
+
+MergedKeysetPaginator pages several querysets as one newest-first feed (a
+k-way merge): each page takes at most per_page + 1 rows from every source.
+Its ?page=N jumps run one UNION ALL of (field, source, pk) keys with
+ORDER BY/LIMIT/OFFSET in the database, then load just that page's rows.
+"""
+from __future__ import annotations
+
+import hashlib
+import heapq
+import itertools
+import math
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import connections
+from django.db.models import IntegerField, Q, Value
+from django.utils.dateparse import parse_datetime
+
+_SALT = "core.pagination.cursor"
+ESTIMATE_ABOVE = 10_000  # trust reltuples only for big tables; small ones are cheap to count
+
+
+def cached_count(qs, ttl: Optional[int] = None) -> int:
+    """
+    Row count for qs: Postgres planner estimate when the query is unfiltered
+    and the table is large, otherwise COUNT(*) cached per distinct SQL.
+    """
+    conn = connections[qs.db]
+    if conn.vendor == "postgresql" and not qs.query.where:
+        with conn.cursor() as cur:
+            cur.execute("SELECT reltuples::bigint FROM pg_class WHERE relname = %s", [qs.model._meta.db_table])
+            row = cur.fetchone()
+        if row and row[0] > ESTIMATE_ABOVE:
+            return int(row[0])
+
+    sql, params = qs.order_by().query.sql_with_params()
+    key = "list-count:" + hashlib.sha1(f"{qs.db}|{sql}|{params}".encode()).hexdigest()
+    count = cache.get(key)
+    if count is None:
+        count = qs.order_by().count()
+        cache.set(key, count, ttl if ttl is not None else getattr(settings, "LIST_COUNT_CACHE_TTL", 60))
+    return count
+
+
+class KeysetPage:
+    """Duck-types the Page attributes the list templates use, plus cursors."""
+
+    def __init__(self, object_list: List, number: int, paginator: "KeysetPaginator",
+                 has_next: bool, next_cursor: str = "", previous_cursor: str = ""):
+        self.object_list = object_list
+        self.number = number
+        self.paginator = paginator
+        self._has_next = has_next
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self) -> bool:
+        return self._has_next
+
+    def has_previous(self) -> bool:
+        return self.number > 1
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+    def next_page_number(self) -> int:
+        return self.number + 1
+
+    def previous_page_number(self) -> int:
+        return self.number - 1
+
+
+class KeysetPaginator:
+    """Newest-first pages over (created_at, id); see module docstring."""
+
+    def __init__(self, queryset, per_page: int, field: str = "created_at"):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.field = field
+        self._count = None
+
+    @property
+    def count(self) -> int:
+        if self._count is None:
+            self._count = cached_count(self.queryset)
+        return self._count
+
+    @property
+    def num_pages(self) -> int:
+        return max(1, math.ceil(self.count / self.per_page))
+
+    # ---- cursors ----
+
+    def _cursor(self, obj, direction: str, number: int) -> str:
+        value = getattr(obj, self.field)
+        return signing.dumps([value.isoformat(), obj.pk, direction, number], salt=_SALT, compress=True)
+
+    @staticmethod
+    def _decode(cursor: str):
+        try:
+            ts, pk, direction, number = signing.loads(cursor, salt=_SALT)
+            return parse_datetime(ts), int(pk), direction, int(number)
+        except (signing.BadSignature, TypeError, ValueError):
+            return None
+
+    # ---- pages ----
+
+    def get_page(self, cursor: Optional[str] = None, number=None) -> KeysetPage:
+        decoded = self._decode(cursor) if cursor else None
+        if decoded and decoded[0] is not None:
+            return self._seek(*decoded)
+        try:
+            number = int(number or 1)
+        except (TypeError, ValueError):
+            number = 1
+        return self._offset(max(1, number))
+
+    def _page(self, rows: List, number: int, has_next: bool) -> KeysetPage:
+        next_cursor = self._cursor(rows[-1], "n", number + 1) if rows and has_next else ""
+        prev_cursor = self._cursor(rows[0], "p", number - 1) if rows and number > 1 else ""
+        return KeysetPage(rows, number, self, has_next, next_cursor, prev_cursor)
+
+    def _offset(self, number: int) -> KeysetPage:
+        if number > 1 and number > self.num_pages:
+            number = self.num_pages  # like Paginator.get_page: out of range -> last page
+        start = (number - 1) * self.per_page
+        qs = self.queryset.order_by(f"-{self.field}", "-pk")
+        rows = list(qs[start:start + self.per_page + 1])
+        return self._page(rows[: self.per_page], number, len(rows) > self.per_page)
+
+    def _seek(self, value, pk: int, direction: str, number: int) -> KeysetPage:
+        f = self.field
+        if direction == "p":
+            newer = Q(**{f"{f}__gt": value}) | Q(**{f: value, "pk__gt": pk})
+            rows = list(self.queryset.filter(newer).order_by(f, "pk")[: self.per_page + 1])
+            if len(rows) <= self.per_page:
+                return self._offset(1)  # reached the top: normalise to the real first page
+            rows = rows[: self.per_page][::-1]
+            return self._page(rows, max(2, number), True)
+
+        older = Q(**{f"{f}__lt": value}) | Q(**{f: value, "pk__lt": pk})
+        rows = list(self.queryset.filter(older).order_by(f"-{f}", "-pk")[: self.per_page + 1])
+        return self._page(rows[: self.per_page], number, len(rows) > self.per_page)
+
+    def window(self, page: KeysetPage, radius: int = 1) -> dict:
+        """The page-window context the list templates were built around."""
+        current, num_pages = page.number, self.num_pages
+        start = max(1, current - radius)
+        end = min(num_pages, current + radius)
+        return {
+            "num_pages": num_pages,
+            "current": current,
+            "window_pages": list(range(start, end + 1)),
+            "show_left_ellipsis": start > 2,
+            "show_right_ellipsis": end < num_pages - 1,
+            "first_page": 1,
+            "last_page": num_pages,
+            "prev_page": current - 1 if page.has_previous() else current,
+            "next_page": current + 1 if page.has_next() else current,
+        }
+
+
+class MergedKeysetPaginator(KeysetPaginator):
+    """
+    Newest-first pages over several querysets merged on (field, source, pk),
+    e.g. MergedKeysetPaginator({"order": orders, "tourism": bookings}, 15).
+    Every source is read with the same seek condition, limited to
+    per_page + 1 rows, and the sorted streams are merged with heapq. Each
+    row gets `feed_source` set to its source's name. The field must exist
+    on every source.
+    """
+
+    def __init__(self, sources: Dict[str, object], per_page: int, field: str = "created_at"):
+        super().__init__(None, per_page, field)
+        self.sources = list(sources.items())
+
+    @property
+    def count(self) -> int:
+        if self._count is None:
+            self._count = sum(cached_count(qs) for _, qs in self.sources)
+        return self._count
+
+    def _cursor(self, obj, direction: str, number: int) -> str:
+        value = getattr(obj, self.field)
+        return signing.dumps(
+            [value.isoformat(), obj.pk, direction, number, obj.feed_rank], salt=_SALT, compress=True,
+        )
+
+    @staticmethod
+    def _decode(cursor: str):
+        try:
+            ts, pk, direction, number, rank = signing.loads(cursor, salt=_SALT)
+            return parse_datetime(ts), int(pk), direction, int(number), int(rank)
+        except (signing.BadSignature, TypeError, ValueError):
+            return None
+
+    def _key(self, obj):
+        return getattr(obj, self.field), obj.feed_rank, obj.pk
+
+    def _streams(self, conditions, newest_first: bool, limit: int):
+        """Each source's next `limit` rows past its condition, tagged and in feed order."""
+        f = self.field
+        order = (f"-{f}", "-pk") if newest_first else (f, "pk")
+        for rank, (name, qs) in enumerate(self.sources):
+            rows = list(qs.filter(conditions(rank)).order_by(*order)[:limit])
+            for obj in rows:
+                obj.feed_source, obj.feed_rank = name, rank
+            yield rows
+
+    def _merge(self, conditions, newest_first: bool, limit: int) -> List:
+        streams = list(self._streams(conditions, newest_first, limit))
+        merged = heapq.merge(*streams, key=self._key, reverse=newest_first)
+        return list(itertools.islice(merged, limit))
+
+    def _offset(self, number: int) -> KeysetPage:
+        if number > 1 and number > self.num_pages:
+            number = self.num_pages
+        start = (number - 1) * self.per_page
+        f = self.field
+        keys = [
+            qs.order_by().annotate(feed_key_rank=Value(rank, output_field=IntegerField()))
+            .values_list(f, "feed_key_rank", "pk")
+            for rank, (_, qs) in enumerate(self.sources)
+        ]
+        if not keys:
+            return self._page([], number, False)
+        union = keys[0].union(*keys[1:], all=True) if len(keys) > 1 else keys[0]
+        page_keys = list(union.order_by(f"-{f}", "-feed_key_rank", "-pk")[start:start + self.per_page + 1])
+
+        wanted: Dict[int, List] = {}
+        for _, rank, pk in page_keys:
+            wanted.setdefault(rank, []).append(pk)
+        loaded = {rank: self.sources[rank][1].order_by().in_bulk(pks) for rank, pks in wanted.items()}
+        rows = []
+        for _, rank, pk in page_keys:
+            obj = loaded[rank].get(pk)
+            if obj is not None:  # deleted in between
+                obj.feed_source, obj.feed_rank = self.sources[rank][0], rank
+                rows.append(obj)
+        return self._page(rows[: self.per_page], number, len(page_keys) > self.per_page)
+
+    def _seek(self, value, pk: int, direction: str, number: int, rank: int = 0) -> KeysetPage:
+        f = self.field
+
+        def beyond(op):
+            # Rows after the boundary in (field, rank, pk) order, for source `r`.
+            def condition(r):
+                past = Q(**{f"{f}__{op}": value})
+                if r == rank:
+                    return past | Q(**{f: value, f"pk__{op}": pk})
+                if (r < rank) == (op == "lt"):
+                    return past | Q(**{f: value})
+                return past
+            return condition
+
+        limit = self.per_page + 1
+        if direction == "p":
+            rows = self._merge(beyond("gt"), False, limit)
+            if len(rows) <= self.per_page:
+                return self._offset(1)
+            return self._page(rows[: self.per_page][::-1], max(2, number), True)
+
+        rows = self._merge(beyond("lt"), True, limit)
+        return self._page(rows[: self.per_page], number, len(rows) > self.per_page)
+
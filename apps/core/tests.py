@@ -1,3 +1,260 @@
-from django.test import TestCase
+import os
+import shutil
+import tempfile
+import time
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.core.cache import cache
+from django.db.models import Sum
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from apps.orders.models import Order
+
+from . import fx, jobs
+from .models import Job
+from .pagination import KeysetPaginator, MergedKeysetPaginator, cached_count
+
+calls = []
+
+
+@jobs.task("tests.record")
+def _record(value=None):
+    calls.append(value)
+
+
+@jobs.task("tests.slow")
+def _slow(seconds):
+    time.sleep(seconds)
+    running = Job.objects.get(task="tests.slow")
+    calls.append((running.locked_until, jobs.claim("w2")))
+
+
+@jobs.task("tests.boom")
+def _boom():
+    raise RuntimeError("boom")
+
+
+@jobs.on_failure("tests.record")
+def _record_failed(value=None):
+    calls.append(("failed", value))
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        calls.clear()
+
+    def expire(self, job):
+        Job.objects.filter(pk=job.pk).update(locked_until=timezone.now() - timedelta(seconds=1))
+
+    def test_claim_counts_the_attempt(self):
+        job = jobs.enqueue("tests.record", value=1)
+        claimed = jobs.claim("w1")
+        self.assertEqual((claimed.pk, claimed.attempts, claimed.locked_by), (job.pk, 1, "w1"))
+        self.assertIsNone(jobs.claim("w2"))  # leased
+
+        self.assertTrue(jobs.execute(claimed))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts, calls), (Job.Status.DONE, 1, [1]))
+
+    def test_worker_that_lost_its_lease_does_not_record_the_outcome(self):
+        jobs.enqueue("tests.record", value=2)
+        first = jobs.claim("w1")
+        self.expire(first)
+        second = jobs.claim("w2")
+        self.assertEqual((second.pk, second.attempts), (first.pk, 2))
+
+        jobs.execute(first)  # w1 finishes late
+        row = Job.objects.get(pk=first.pk)
+        self.assertEqual((row.status, row.locked_by), (Job.Status.RUNNING, "w2"))
+        self.assertTrue(jobs.execute(second))
+        self.assertEqual(Job.objects.get(pk=first.pk).status, Job.Status.DONE)
+
+    def test_abandoned_last_attempt_fails_instead_of_rerunning(self):
+        job = jobs.enqueue("tests.record", value=3, max_attempts=1)
+        self.expire(jobs.claim("w1"))
+        self.assertIsNone(jobs.claim("w2"))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertEqual(calls, [("failed", 3)])
+
+    def test_failures_retry_until_max_attempts(self):
+        job = jobs.enqueue("tests.boom", max_attempts=2)
+        self.assertFalse(jobs.execute(jobs.claim("w1")))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.Status.QUEUED, 1))
+        self.assertIsNone(jobs.claim("w1"))  # backing off
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        self.assertFalse(jobs.execute(jobs.claim("w1")))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.Status.FAILED, 2))
+
+
+class JobHeartbeatTests(TransactionTestCase):
+    def setUp(self):
+        calls.clear()
+
+    @override_settings(JOBS_VISIBILITY_TIMEOUT=3)
+    def test_heartbeat_keeps_a_long_job_leased(self):
+        job = jobs.enqueue("tests.slow", seconds=4.5)  # longer than the visibility timeout
+        claimed = jobs.claim("w1")
+        self.assertTrue(jobs.execute(claimed))
+
+        [(lease_while_running, stolen)] = calls
+        self.assertGreater(lease_while_running, claimed.locked_until)
+        self.assertIsNone(stolen)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.Status.DONE, 1))
+
+
+class KeysetPaginatorTests(TestCase):
+    """Pages core.Job rows on run_at; several rows share a run_at to exercise the pk tie-break."""
+
+    def setUp(self):
+        cache.clear()
+        base = timezone.now()
+        times = [base - timedelta(minutes=m) for m in (0, 1, 1, 1, 2, 3, 3, 4, 5, 6)]
+        Job.objects.bulk_create([Job(task="t", run_at=t) for t in times])
+        self.expected = list(Job.objects.order_by("-run_at", "-pk").values_list("pk", flat=True))
+        self.paginator = KeysetPaginator(Job.objects.all(), per_page=3, field="run_at")
+
+    def pks(self, page):
+        return [job.pk for job in page]
+
+    def walk(self):
+        page, pages = self.paginator.get_page(), []
+        while True:
+            pages.append(page)
+            if not page.has_next():
+                return pages
+            page = self.paginator.get_page(cursor=page.next_cursor)
+
+    def test_cursors_walk_every_row_once_in_order(self):
+        pages = self.walk()
+        self.assertEqual([p.number for p in pages], [1, 2, 3, 4])
+        self.assertEqual([pk for p in pages for pk in self.pks(p)], self.expected)
+
+    def test_offset_pages_match_cursor_pages(self):
+        for page in self.walk():
+            self.assertEqual(self.pks(self.paginator.get_page(number=page.number)), self.pks(page))
+        self.assertEqual(self.paginator.get_page(number=99).number, 4)  # out of range -> last page
+
+    def test_previous_cursor_returns_the_page_before(self):
+        pages = self.walk()
+        for before, page in zip(pages, pages[1:]):
+            back = self.paginator.get_page(cursor=page.previous_cursor)
+            self.assertEqual((back.number, self.pks(back)), (before.number, self.pks(before)))
+        self.assertFalse(pages[0].previous_cursor)
+
+    def test_tampered_cursor_falls_back_to_first_page(self):
+        page = self.paginator.get_page(cursor="not-a-cursor")
+        self.assertEqual((page.number, self.pks(page)), (1, self.expected[:3]))
+
+    def test_count_is_cached(self):
+        self.assertEqual(cached_count(Job.objects.filter(task="t")), 10)
+        Job.objects.create(task="t")
+        with self.assertNumQueries(0):
+            self.assertEqual(cached_count(Job.objects.filter(task="t")), 10)
+        cache.clear()
+        self.assertEqual(cached_count(Job.objects.filter(task="t")), 11)
+
+
+
+class MergedKeysetPaginatorTests(TestCase):
+    """Two core.Job sources (queues "a" and "b") merged on run_at; several run_at values are shared across them."""
+
+    def setUp(self):
+        cache.clear()
+        base = timezone.now()
+        rows = [("a", 0), ("b", 0), ("a", 1), ("b", 1), ("b", 1), ("a", 2), ("b", 3), ("a", 3), ("a", 4), ("b", 5)]
+        Job.objects.bulk_create([Job(task="t", queue=q, run_at=base - timedelta(minutes=m)) for q, m in rows])
+        sources = {"a": Job.objects.filter(queue="a"), "b": Job.objects.filter(queue="b")}
+        # Feed order: run_at, then the later source first, then pk (all descending).
+        rank = {"a": 0, "b": 1}
+        self.expected = [
+            (job.queue, job.pk)
+            for job in sorted(Job.objects.all(), key=lambda j: (j.run_at, rank[j.queue], j.pk), reverse=True)
+        ]
+        self.paginator = MergedKeysetPaginator(sources, per_page=3, field="run_at")
+
+    def keys(self, page):
+        return [(job.feed_source, job.pk) for job in page]
+
+    def walk(self):
+        page, pages = self.paginator.get_page(), []
+        while True:
+            pages.append(page)
+            if not page.has_next():
+                return pages
+            page = self.paginator.get_page(cursor=page.next_cursor)
+
+    def test_ties_across_sources_break_on_source_then_pk(self):
+        pages = self.walk()
+        self.assertEqual([p.number for p in pages], [1, 2, 3, 4])
+        self.assertEqual([key for p in pages for key in self.keys(p)], self.expected)
+        self.assertEqual([job.queue for job in pages[0]], ["b", "a", "b"])
+
+    def test_previous_cursor_returns_the_page_before(self):
+        pages = self.walk()
+        for before, page in zip(pages, pages[1:]):
+            back = self.paginator.get_page(cursor=page.previous_cursor)
+            self.assertEqual((back.number, self.keys(back)), (before.number, self.keys(before)))
+
+    def test_offset_pages_come_from_one_query_and_match_cursor_pages(self):
+        pages = self.walk()
+        self.paginator.count  # counted once per paginator
+        for page in pages:
+            sources = {source for source, _ in self.keys(page)}
+            with self.assertNumQueries(1 + len(sources)):  # the key UNION plus one row fetch per source on the page
+                jumped = self.paginator.get_page(number=page.number)
+            self.assertEqual(self.keys(jumped), self.keys(page))
+            self.assertEqual(bool(jumped.next_cursor), page.has_next())
+        self.assertEqual(self.keys(self.paginator.get_page(number=99)), self.keys(pages[-1]))
+
+    def test_cursor_from_an_offset_page_continues_the_feed(self):
+        second = self.paginator.get_page(number=2)
+        self.assertEqual(self.keys(self.paginator.get_page(cursor=second.next_cursor)), self.expected[6:9])
+
+class FxRatesTests(TestCase):
+    def setUp(self):
+        self.tmp = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmp)
+
+    def rates_file(self, text, name="rates.csv"):
+        path = os.path.join(self.tmp, name)
+        with open(path, "w", encoding="utf-8") as fh:
+            fh.write(text)
+        return path
+
+    def test_csv_rates_and_missing_currencies(self):
+        path = self.rates_file("currency,rate\nusd,0.5\nGBP,not-a-number\n")
+        with self.settings(FX_RATES_FILE=path, BASE_CURRENCY="EUR"):
+            table = fx.rates()
+            self.assertEqual(table.convert(Decimal("10.005"), "USD"), Decimal("5.00"))
+            self.assertEqual(table.convert(Decimal("3"), "eur"), Decimal("3.00"))
+            self.assertIsNone(table.convert(Decimal("1"), "GBP"))
+            self.assertEqual(fx.missing(["EUR", "GBP", "JPY", ""]), ["GBP", "JPY"])
+
+    def test_reloads_when_the_file_changes(self):
+        path = self.rates_file('{"base": "EUR", "as_of": "2030-01-01", "rates": {"USD": "0.5"}}', "rates.json")
+        with self.settings(FX_RATES_FILE=path):
+            self.assertEqual(fx.rates().as_of, "2030-01-01")
+            self.rates_file('{"base": "EUR", "as_of": "2030-01-02", "rates": {"USD": "0.6"}}', "rates.json")
+            os.utime(path, ns=(time.time_ns(), os.stat(path).st_mtime_ns + 1_000_000))
+            self.assertEqual((fx.rates().as_of, fx.rates().rate("USD")), ("2030-01-02", Decimal("0.6")))
+
+    def test_missing_file_only_converts_the_base_currency(self):
+        with self.settings(FX_RATES_FILE=os.path.join(self.tmp, "nope.json"), BASE_CURRENCY="EUR"):
+            self.assertEqual(fx.missing(["EUR", "USD"]), ["USD"])
+
+    def test_to_base_sums_in_sql_and_leaves_out_unknown_currencies(self):
+        for amount, currency in (("10.00", "EUR"), ("20.00", "USD"), ("99.00", "XYZ")):
+            Order.objects.create(category=Order.Category.CAR_RENTAL, amount=Decimal(amount), currency=currency)
+        with self.settings(FX_RATES_FILE=self.rates_file("USD,0.5\n"), BASE_CURRENCY="EUR"):
+            with self.assertNumQueries(1):
+                total = Order.objects.aggregate(total=Sum(fx.to_base("amount")))["total"]
+            self.assertEqual(total.quantize(fx.CENT), Decimal("20.00"))
+            converted = Order.objects.annotate(base=fx.to_base(currencies=["USD"])).order_by("pk")
+            self.assertEqual([o.base for o in converted][1:], [Decimal("10.00"), None])
@@ -1,3 +1,37 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.test import TestCase
+from django.urls import reverse
+
+from apps.orders.models import Order
+
+User = get_user_model()
+
+
+class SalesDataTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(User.objects.create_user("staff", "staff@example.com", "x"))
+        self.url = reverse("dashboard:sales_data") + "?range=7d&granularity=day"
+        Order.objects.create(category=Order.Category.CAR_RENTAL, amount=Decimal("10.00"))
+
+    def test_etag_revalidates_until_the_data_changes(self):
+        first = self.client.get(self.url)
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.json()["car"][-1], 10.0)
+
+        again = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual(again.status_code, 304)
+
+        cache.clear()  # another process: same rows, same body, same tag
+        self.assertEqual(self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"]).status_code, 304)
+
+        Order.objects.create(category=Order.Category.CAR_RENTAL, amount=Decimal("5.00"))
+        changed = self.client.get(self.url, HTTP_IF_NONE_MATCH=first["ETag"])
+        self.assertEqual((changed.status_code, changed.json()["car"][-1]), (200, 15.0))
+        self.assertNotEqual(changed["ETag"], first["ETag"])
 
-# Create your tests here.
+    def test_unknown_range_is_rejected(self):
+        self.assertEqual(self.client.get(reverse("dashboard:sales_data") + "?range=1y").status_code, 400)
@@ -6,15 +6,19 @@ from .views import (
     places_create_view,
     places_edit_view,
     places_delete_view,
+    invoice_orders_view,
+    sales_data_view,
 )
 
 app_name = "dashboard"
 
 urlpatterns = [
     path("", dashboard_view, name="home"),
+    path("sales.json", sales_data_view, name="sales_data"),
     path("profile/edit/", profile_edit_view, name="profile_edit"),
     path("places/", places_list_view, name="places_list"),
     path("places/create/", places_create_view, name="places_create"),
     path("places/<int:pk>/edit/", places_edit_view, name="places_edit"),
     path("places/<int:pk>/delete/", places_delete_view, name="places_delete"),
+    path("orders/invoice/", invoice_orders_view, name="invoice_orders"),
 ]
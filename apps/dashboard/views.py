@@ -1,16 +1,26 @@
-from django.shortcuts import render
-from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Q
-from django.db.models.functions import TruncMonth
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.db.models import Q
 from django.shortcuts import render, get_object_or_404, redirect
 from django.utils import timezone
 from django.contrib import messages
+from django.core.cache import cache
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response
 from django.contrib.auth import get_user_model
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.forms import PasswordChangeForm
+from django.views.decorators.http import require_GET, require_POST
 
-from apps.orders.models import Order
-from apps.explore.models import Place, PlaceImage, PlaceBooking
+from apps.core import fx
+from apps.orders.models import rollup_version
+from apps.orders.services.feed import booking_feed
+from apps.orders.services.rollups import GRANULARITIES, sales_series
+from apps.explore.models import Place, PlaceImage
+from apps.explore.services.demand import travel_demand
+from apps.invoices.services import order_invoicing
 from django import forms
 
 User = get_user_model()
@@ -52,63 +62,149 @@ def _hide_location_fields(form: PlaceForm) -> PlaceForm:
     return form
 
 
+def _parse_date(value: str | None, default):
+    try:
+        return timezone.datetime.strptime(value or "", "%Y-%m-%d").date()
+    except ValueError:
+        return default
+
+
+def _demand_heatmap_rows(demand: dict) -> list[dict]:
+    """Zip the demand matrices into per-place rows of template-ready cells."""
+    peak = demand["peak"] or 1
+    rows = []
+    for name, b_row, t_row in zip(demand["places"], demand["bookings"], demand["travellers"]):
+        cells = [
+            {"bookings": b, "travellers": t, "alpha": round(t / peak, 2)}
+            for b, t in zip(b_row, t_row)
+        ]
+        rows.append({"place": name, "cells": cells})
+    return rows
+
+
+# Chart ranges: (label, unit, count); the range ends today.
+SALES_RANGES = {
+    "7d": ("Last 7 days", "day", 7),
+    "30d": ("Last 30 days", "day", 30),
+    "90d": ("Last 90 days", "day", 90),
+    "6m": ("Last 6 months", "month", 6),
+    "12m": ("Last 12 months", "month", 12),
+    "24m": ("Last 24 months", "month", 24),
+}
+SALES_DEFAULT_RANGE = "12m"
+
+
+def _range_start(key: str, today):
+    _, unit, count = SALES_RANGES[key]
+    if unit == "day":
+        return today - timezone.timedelta(days=count - 1)
+    month0 = today.year * 12 + today.month - 1 - (count - 1)
+    return today.replace(year=month0 // 12, month=month0 % 12 + 1, day=1)
+
+
+def _sales_cache_key(range_key: str, granularity: str, today) -> str:
+    table = fx.rates()
+    return f"dashboard:sales:{range_key}:{granularity}:{today}:v{rollup_version()}:{table.base}:{table.as_of}"
+
+
+def _sales(range_key: str, granularity: str) -> dict:
+    """Chart payload for a range, cached per (range, granularity, day, rollup version, FX table)."""
+    today = timezone.localdate()
+    key = _sales_cache_key(range_key, granularity, today)
+    data = cache.get(key)
+    if data is None:
+        series = sales_series(_range_start(range_key, today), today, granularity)
+        data = {"range": range_key, "granularity": granularity, **series._asdict()}
+        cache.set(key, data, getattr(settings, "DASHBOARD_SALES_CACHE_TTL", 300))
+    return data
+
+
 @login_required
-def dashboard_view(request):
-    # ---- Sales (last 12 months), grouped by month ----
-    now = timezone.now()
-    start = (now.replace(day=1) - timezone.timedelta(days=365)).replace(day=1)
-    sales_qs = (
-        Order.objects.filter(created_at__gte=start)
-        .annotate(month=TruncMonth("created_at"))
-        .values("month")
-        .annotate(
-            airport_total=Sum("amount", filter=Q(category=Order.Category.AIRPORT_SERVICE)),
-            car_total=Sum("amount", filter=Q(category=Order.Category.CAR_RENTAL)),
+@require_GET
+def sales_data_view(request):
+    """Sales series as JSON: ?range=7d|30d|90d|6m|12m|24m&granularity=day|week|month, with an ETag."""
+    range_key = request.GET.get("range", SALES_DEFAULT_RANGE)
+    granularity = request.GET.get("granularity", "month")
+    if range_key not in SALES_RANGES or granularity not in GRANULARITIES:
+        return JsonResponse(
+            {"error": f"range must be one of {', '.join(SALES_RANGES)}; "
+                      f"granularity one of {', '.join(GRANULARITIES)}"},
+            status=400,
         )
-        .order_by("month")
-    )
 
-    # Build labels & datasets aligned by month
-    labels = []
-    airport_series = []
-    car_series = []
-    for row in sales_qs:
-        labels.append(row["month"].strftime("%b %Y"))  # e.g., "Aug 2025"
-        airport_series.append(float(row["airport_total"] or 0))
-        car_series.append(float(row["car_total"] or 0))
-
-    # ---- Recent 5 airport services ----
-    recent_services = (
-        Order.objects
-        .filter(category=Order.Category.AIRPORT_SERVICE)
-        .order_by("-created_at")[:5]
-    )
+    resp = JsonResponse(_sales(range_key, granularity))
+    etag = f'"{hashlib.sha1(resp.content).hexdigest()[:20]}"'  # same body, same tag, in any process
+    not_modified = get_conditional_response(request, etag=etag)
+    if not_modified is not None:
+        return not_modified
+    resp["ETag"] = etag
+    resp["Cache-Control"] = "private, no-cache"  # always revalidate; 304s are cheap
+    return resp
 
-    # ---- Recent 5 car rentals ----
-    recent_cars = (
-        Order.objects
-        .filter(category=Order.Category.CAR_RENTAL)
-        .order_by("-created_at")[:5]
-    )
 
-    # ---- Recent 5 tourism bookings ----
-    recent_tourism = (
-        PlaceBooking.objects
-        .select_related("place")
-        .order_by("-created_at")[:5]
+@login_required
+def dashboard_view(request):
+    # ---- Sales: first paint of the chart; range/granularity changes fetch sales_data_view ----
+    sales = _sales(SALES_DEFAULT_RANGE, "month")
+
+    # ---- Recent bookings: orders and tourism merged newest-first (one page of the feed) ----
+    recent_bookings = booking_feed(per_page=8).get_page()
+
+    # ---- Tourism demand heatmap (place x travel date) ----
+    today = timezone.localdate()
+    demand_from = _parse_date(request.GET.get("demand_from"), today)
+    demand_to = _parse_date(request.GET.get("demand_to"), demand_from + timezone.timedelta(days=27))
+    if demand_to < demand_from or (demand_to - demand_from).days > 92:
+        demand_to = demand_from + timezone.timedelta(days=27)
+    demand_region = (request.GET.get("region") or "").strip()
+    demand = travel_demand(demand_from, demand_to, demand_region)
+    regions = (
+        Place.objects.order_by("region").values_list("region", flat=True).distinct()
     )
 
     context = {
-        "labels": labels,
-        "airport_series": airport_series,
-        "car_series": car_series,
-        "recent_services": recent_services,
-        "recent_cars": recent_cars,
-        "recent_tourism": recent_tourism,
+        "labels": sales["labels"],
+        "airport_series": sales["airport"],
+        "car_series": sales["car"],
+        "sales_currency": sales["currency"],
+        "sales_unconverted": sales["unconverted"],
+        "sales_ranges": SALES_RANGES,
+        "sales_range": SALES_DEFAULT_RANGE,
+        "sales_granularities": GRANULARITIES,
+        "recent_bookings": recent_bookings,
+        "demand": demand,
+        "demand_rows": _demand_heatmap_rows(demand),
+        "regions": regions,
     }
+    if request.user.is_staff:
+        first_of_month = today.replace(day=1)
+        context["order_invoicing"] = order_invoicing.last_progress()
+        context["invoice_orders_from"] = (first_of_month - timezone.timedelta(days=1)).replace(day=1)
+        context["invoice_orders_to"] = first_of_month - timezone.timedelta(days=1)
     return render(request, "dashboard/index.html", context)
 
 
+@user_passes_test(lambda u: u.is_staff)
+@require_POST
+def invoice_orders_view(request):
+    """Queue a background run invoicing the uninvoiced orders in a date range."""
+    from apps.invoices.tasks import queue_order_invoicing
+
+    start = _parse_date(request.POST.get("from"), None)
+    end = _parse_date(request.POST.get("to"), None)
+    if start is None or end is None or end < start:
+        messages.error(request, "Choose a valid date range to invoice.")
+        return redirect("dashboard:home")
+
+    pending = order_invoicing.uninvoiced_orders(start, end).filter(user__isnull=False).count()
+    if not pending:
+        messages.info(request, f"No uninvoiced orders between {start:%d %b %Y} and {end:%d %b %Y}.")
+        return redirect("dashboard:home")
+    queue_order_invoicing(start, end)
+    messages.success(request, f"Invoicing {pending} order(s) in the background; progress is shown below.")
+    return redirect("dashboard:home")
+
+
 @login_required
 def profile_edit_view(request):
     profile_form = DashboardProfileForm(instance=request.user)
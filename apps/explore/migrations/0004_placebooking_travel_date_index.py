@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:29
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('explore', '000Y_placebooking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='placebooking',
+            index=models.Index(fields=['travel_date', 'place'], name='explore_pla_travel__2720b0_idx'),
+        ),
+    ]
@@ -81,6 +81,9 @@ class PlaceBooking(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["travel_date", "place"]),  # dashboard demand heatmap
+        ]
 
     def __str__(self):
         return f"{self.full_name} - {self.place.name}"
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import datetime
+from typing import Any, Dict
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+
+from apps.explore.models import Place, PlaceBooking
+
+
+def _cache_key(start: datetime.date, end: datetime.date, region: str) -> str:
+    return f"explore:demand:{start.isoformat()}:{end.isoformat()}:{region.lower()}"
+
+
+def _week_totals(matrix: np.ndarray, days: int) -> np.ndarray:
+    """Collapse a (places x days) matrix into per-week totals across all places."""
+    per_day = matrix.sum(axis=0)
+    n_weeks = -(-days // 7)  # ceil
+    padded = np.zeros(n_weeks * 7, dtype=per_day.dtype)
+    padded[:days] = per_day
+    return padded.reshape(n_weeks, 7).sum(axis=1)
+
+
+def _week_lengths(days: int) -> np.ndarray:
+    """Days covered by each week; only the last one can be short."""
+    n_weeks = -(-days // 7)
+    lengths = np.full(n_weeks, 7, dtype=np.int64)
+    lengths[-1] = days - 7 * (n_weeks - 1)
+    return lengths
+
+
+def _week_deltas(totals: np.ndarray, lengths: np.ndarray) -> list:
+    """
+    Change against the previous week, with a short trailing week pro-rated
+    to seven days so it is not read as a drop. The first week has no
+    previous week to compare with, so its delta is None.
+    """
+    full_week = totals * 7.0 / lengths
+    return [None] + [int(round(d)) for d in np.diff(full_week)]
+
+
+def travel_demand(
+    start: datetime.date,
+    end: datetime.date,
+    region: str = "",
+) -> Dict[str, Any]:
+    """
+    Place x travel-date demand for bookings with travel_date in [start, end].
+
+    One grouped query feeds two dense NumPy matrices (bookings, travellers)
+    of shape (places, days); weekly totals and week-over-week deltas are
+    derived from them (deltas are None for the first week; a short last
+    week is compared pro-rated). Results are cached per (start, end, region).
+    """
+    region = (region or "").strip()
+    key = _cache_key(start, end, region)
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    days = (end - start).days + 1
+    dates = [start + datetime.timedelta(days=i) for i in range(days)]
+
+    rows = PlaceBooking.objects.filter(travel_date__range=(start, end)).exclude(status="cancelled")
+    if region:
+        rows = rows.filter(place__region__iexact=region)
+    rows = list(
+        rows.order_by()
+        .values_list("place_id", "travel_date")
+        .annotate(bookings=Count("id"), travellers=Sum("travelers"))
+    )
+
+    place_ids = sorted({r[0] for r in rows})
+    names = dict(Place.objects.filter(pk__in=place_ids).values_list("id", "name"))
+    places = sorted(place_ids, key=lambda pk: names.get(pk, ""))
+
+    bookings = np.zeros((len(places), days), dtype=np.int64)
+    travellers = np.zeros((len(places), days), dtype=np.int64)
+    if rows:
+        row_of = {pk: i for i, pk in enumerate(places)}
+        arr = np.array(
+            [(row_of[pid], (d - start).days, b, t or 0) for pid, d, b, t in rows],
+            dtype=np.int64,
+        )
+        bookings[arr[:, 0], arr[:, 1]] = arr[:, 2]
+        travellers[arr[:, 0], arr[:, 1]] = arr[:, 3]
+
+    wk_bookings = _week_totals(bookings, days)
+    wk_travellers = _week_totals(travellers, days)
+    lengths = _week_lengths(days)
+    d_bookings = _week_deltas(wk_bookings, lengths)
+    d_travellers = _week_deltas(wk_travellers, lengths)
+
+    weeks = [
+        {
+            "start": start + datetime.timedelta(weeks=i),
+            "bookings": int(wk_bookings[i]),
+            "travellers": int(wk_travellers[i]),
+            "days": int(lengths[i]),
+            "bookings_delta": d_bookings[i],
+            "travellers_delta": d_travellers[i],
+        }
+        for i in range(len(wk_bookings))
+    ]
+
+    peak = int(travellers.max()) if travellers.size else 0
+    data = {
+        "start": start,
+        "end": end,
+        "region": region,
+        "dates": dates,
+        "places": [names.get(pk, "") for pk in places],
+        "bookings": bookings.tolist(),
+        "travellers": travellers.tolist(),
+        "peak": peak,
+        "weeks": weeks,
+    }
+    cache.set(key, data, getattr(settings, "EXPLORE_CACHE_TTL_DEMAND", 300))
+    return data
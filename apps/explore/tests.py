@@ -0,0 +1,55 @@
+import datetime
+
+from django.core.cache import cache
+from django.test import TestCase
+
+from .models import Place, PlaceBooking
+from .services.demand import travel_demand
+
+
+class TravelDemandTests(TestCase):
+    start = datetime.date(2030, 1, 7)  # a Monday
+
+    def setUp(self):
+        cache.clear()
+        self.place = Place.objects.create(name="Kachikally", category="culture", region="Bakau", short_desc="x")
+
+    def book(self, day_offset, travelers=1, status="new", place=None):
+        return PlaceBooking.objects.create(
+            place=place or self.place, full_name="T", email="t@example.com", phone="1",
+            travel_date=self.start + datetime.timedelta(days=day_offset), travelers=travelers, status=status,
+        )
+
+    def test_matrix_cells_and_cancelled_bookings(self):
+        other = Place.objects.create(name="Abuko", category="nature", region="Lamin", short_desc="x")
+        self.book(0, travelers=2)
+        self.book(0, travelers=3)
+        self.book(2, travelers=1, place=other)
+        self.book(1, travelers=9, status="cancelled")
+
+        data = travel_demand(self.start, self.start + datetime.timedelta(days=6))
+        self.assertEqual(data["places"], ["Abuko", "Kachikally"])
+        self.assertEqual(data["bookings"][1][:3], [2, 0, 0])
+        self.assertEqual(data["travellers"][1][:3], [5, 0, 0])
+        self.assertEqual(data["travellers"][0][2], 1)
+        self.assertEqual(data["peak"], 5)
+
+        only = travel_demand(self.start, self.start + datetime.timedelta(days=6), region="lamin")
+        self.assertEqual(only["places"], ["Abuko"])
+
+    def test_first_week_has_no_delta(self):
+        for day in (0, 1, 7):
+            self.book(day)
+        weeks = travel_demand(self.start, self.start + datetime.timedelta(days=13))["weeks"]
+        self.assertEqual([w["bookings"] for w in weeks], [2, 1])
+        self.assertIsNone(weeks[0]["bookings_delta"])
+        self.assertIsNone(weeks[0]["travellers_delta"])
+        self.assertEqual(weeks[1]["bookings_delta"], -1)
+
+    def test_short_last_week_is_pro_rated(self):
+        # One booking a day for 7 + 3 days: the short week keeps the same pace.
+        for day in range(10):
+            self.book(day)
+        weeks = travel_demand(self.start, self.start + datetime.timedelta(days=9))["weeks"]
+        self.assertEqual([(w["bookings"], w["days"]) for w in weeks], [(7, 7), (3, 3)])
+        self.assertEqual(weeks[1]["bookings_delta"], 0)
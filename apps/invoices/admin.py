@@ -1,5 +1,10 @@
 from django.contrib import admin
-from .models import Invoice, InvoiceItem
+from django.utils import timezone
+
+from .models import (
+    Invoice, InvoiceItem, InvoiceStatusChange, OrderInvoice, RecurringInvoice, RecurringInvoiceItem,
+)
+from .services import lifecycle
 
 class InvoiceItemInline(admin.TabularInline):
     model = InvoiceItem
@@ -12,3 +17,65 @@ class InvoiceAdmin(admin.ModelAdmin):
     search_fields = ("number", "user__username", "user__email", "user__first_name", "user__last_name")
     date_hierarchy = "issued_at"
     inlines = [InvoiceItemInline]
+    actions = ["send_selected", "mark_paid", "mark_overdue", "mark_void"]
+
+    @admin.action(description="Email selected invoices (one bulk run)")
+    def send_selected(self, request, queryset):
+        from .tasks import queue_bulk_send
+
+        ids = list(queryset.exclude(status__in=[Invoice.Status.PAID, Invoice.Status.VOID]).values_list("pk", flat=True))
+        if ids:
+            queue_bulk_send(ids)
+        self.message_user(request, f"{len(ids)} invoice(s) queued for a bulk send.")
+
+    # Status transitions: one UPDATE for the whole selection + bulk audit rows.
+
+    def _transitioned(self, request, result):
+        self.message_user(request, f"{result.changed} invoice(s) marked {result.to_status.lower()}.")
+
+    @admin.action(description="Mark selected invoices paid")
+    def mark_paid(self, request, queryset):
+        self._transitioned(request, lifecycle.mark_paid(queryset, actor=request.user, source="admin"))
+
+    @admin.action(description="Mark selected invoices overdue (if past due)")
+    def mark_overdue(self, request, queryset):
+        result = lifecycle.transition(
+            queryset.filter(due_at__lt=timezone.localdate()), Invoice.Status.OVERDUE, [Invoice.Status.SENT],
+            actor=request.user, source="admin",
+        )
+        self._transitioned(request, result)
+
+    @admin.action(description="Void selected invoices")
+    def mark_void(self, request, queryset):
+        self._transitioned(request, lifecycle.void(queryset, actor=request.user, source="admin"))
+
+
+@admin.register(InvoiceStatusChange)
+class InvoiceStatusChangeAdmin(admin.ModelAdmin):
+    list_display = ("invoice", "from_status", "to_status", "source", "changed_by", "changed_at")
+    list_filter = ("to_status", "source", "changed_at")
+    search_fields = ("invoice__number",)
+    list_select_related = ("invoice", "changed_by")
+    readonly_fields = ("invoice", "from_status", "to_status", "source", "changed_by", "changed_at")
+
+
+class RecurringInvoiceItemInline(admin.TabularInline):
+    model = RecurringInvoiceItem
+    extra = 1
+
+
+@admin.register(RecurringInvoice)
+class RecurringInvoiceAdmin(admin.ModelAdmin):
+    list_display = ("user", "cadence", "next_run", "currency", "active", "last_run_at")
+    list_filter = ("active", "cadence", "currency")
+    search_fields = ("user__username", "user__email")
+    list_select_related = ("user",)
+    inlines = [RecurringInvoiceItemInline]
+
+
+@admin.register(OrderInvoice)
+class OrderInvoiceAdmin(admin.ModelAdmin):
+    list_display = ("order", "invoice", "created_at")
+    search_fields = ("invoice__number", "order__customer_name")
+    list_select_related = ("order", "invoice")
+    raw_id_fields = ("order", "invoice")
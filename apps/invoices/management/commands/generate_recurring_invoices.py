@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.invoices.services import recurring
+
+
+class Command(BaseCommand):
+    help = (
+        "Create the invoices due from recurring templates (next_run <= --as-of) with "
+        "bulk inserts and one block of invoice numbers per batch, then advance next_run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--as-of", help="YYYY-MM-DD run date (default: today)")
+        parser.add_argument("--batch-size", type=int, default=2000, help="Templates per transaction")
+        parser.add_argument("--send", action="store_true", help="Queue one bulk email job for the new invoices")
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many would be created")
+
+    def handle(self, *args, **options):
+        try:
+            as_of = date.fromisoformat(options["as_of"]) if options["as_of"] else None
+        except ValueError:
+            raise CommandError("--as-of must be YYYY-MM-DD")
+
+        started = time.perf_counter()
+        result = recurring.generate_due(as_of, batch_size=options["batch_size"], dry_run=options["dry_run"])
+        if options["dry_run"]:
+            self.stdout.write(f"{result.planned} invoice(s) would be created from {result.templates} template(s).")
+            return
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(result.invoices)} invoice(s) from {result.templates} template(s) in {elapsed:.2f}s."
+        ))
+        if options["send"] and result.invoices:
+            from apps.invoices.tasks import queue_bulk_send
+
+            queue_bulk_send(result.invoices)
+            self.stdout.write("Queued a bulk send job.")
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.invoices.services import order_invoicing
+
+
+class Command(BaseCommand):
+    help = (
+        "Invoice every uninvoiced pending/paid order created in a date range: one invoice "
+        "and one item per order, bulk-inserted in chunks, linked so no order is billed twice."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="start", required=True, help="YYYY-MM-DD (inclusive)")
+        parser.add_argument("--to", dest="end", help="YYYY-MM-DD (inclusive, default: today)")
+        parser.add_argument("--chunk-size", type=int, default=1000, help="Orders per transaction")
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many would be invoiced")
+
+    def handle(self, *args, **options):
+        try:
+            start = date.fromisoformat(options["start"])
+            end = date.fromisoformat(options["end"]) if options["end"] else timezone.localdate()
+        except ValueError:
+            raise CommandError("--from/--to must be YYYY-MM-DD")
+        if end < start:
+            raise CommandError("--to is before --from")
+
+        started = time.perf_counter()
+
+        def report(done, total):
+            self.stdout.write(f"  {done}/{total} orders invoiced ({time.perf_counter() - started:.1f}s)")
+
+        result = order_invoicing.invoice_orders(
+            start, end, chunk_size=options["chunk_size"], dry_run=options["dry_run"], progress=report,
+        )
+        if options["dry_run"]:
+            self.stdout.write(
+                f"{result.selected - result.skipped} order(s) would be invoiced; "
+                f"{result.skipped} without a customer account skipped."
+            )
+            return
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(result.invoices)} invoice(s) from {result.selected} order(s) "
+            f"in {time.perf_counter() - started:.2f}s; {result.skipped} without a customer account skipped."
+        ))
@@ -0,0 +1,81 @@
+from __future__ import annotations
+
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.invoices.models import Invoice
+from apps.invoices.services import pdf_assets
+from apps.invoices.services.browser_pool import PDF_OPTIONS, BrowserPool
+from apps.invoices.services.weasy import WeasyRenderer
+from apps.invoices.views import _render_pdf_html
+
+
+def _playwright_cold(html: str) -> bytes:
+    """The old per-request path: start Playwright, launch Chromium, render, tear down."""
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch()
+        page = browser.new_context().new_page()
+        page.set_content(html, wait_until="load")
+        pdf = page.pdf(**PDF_OPTIONS)
+        browser.close()
+    return pdf
+
+
+def _weasyprint_cold(html: str) -> bytes:
+    """Fresh WeasyPrint document per PDF: fonts and inline CSS parsed every time."""
+    from weasyprint import HTML
+
+    return HTML(string=html, base_url=pdf_assets.bundle().base_url).write_pdf()
+
+
+class Command(BaseCommand):
+    help = "Benchmark invoice PDF rendering: cold (setup per PDF) vs warm (reused engine) latency."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--invoice", type=int, help="Invoice pk (default: most recent)")
+        parser.add_argument("--renders", type=int, default=5, help="Renders per scenario")
+
+    def handle(self, *args, **options):
+        qs = Invoice.objects.select_related("user").prefetch_related("items")
+        inv = qs.filter(pk=options["invoice"]).first() if options["invoice"] else qs.first()
+        if inv is None:
+            raise CommandError("No invoice to render.")
+
+        html = _render_pdf_html(None, inv)
+        n = max(1, options["renders"])
+
+        self.stdout.write(f"Invoice {inv.number}: {n} render(s) per scenario")
+        self._run("playwright cold", n, lambda: _playwright_cold(html))
+
+        pool = BrowserPool(max_pages=1, recycle_after=n + 1)
+        try:
+            self._run("playwright warm (first)", 1, lambda: pool.render(html, wait_until="load"))
+            self._run("playwright warm", n, lambda: pool.render(html, wait_until="load"))
+        finally:
+            pool.shutdown()
+
+        bare_html = _render_pdf_html(None, inv, inline_css=False)
+        weasy = WeasyRenderer()
+        self._run("weasyprint cold", n, lambda: _weasyprint_cold(html))
+        self._run("weasyprint warm (first)", 1, lambda: weasy.render(bare_html))
+        self._run("weasyprint warm", n, lambda: weasy.render(bare_html))
+
+    def _run(self, label: str, n: int, fn):
+        timings = []
+        try:
+            for _ in range(n):
+                t0 = time.perf_counter()
+                fn()
+                timings.append((time.perf_counter() - t0) * 1000)
+        except Exception as exc:
+            reason = (str(exc).splitlines() or [type(exc).__name__])[0]
+            self.stdout.write(self.style.WARNING(f"{label:<26} unavailable: {reason}"))
+            return
+        self.stdout.write(
+            f"{label:<26} median {statistics.median(timings):8.1f} ms   "
+            f"min {min(timings):8.1f} ms   max {max(timings):8.1f} ms"
+        )
@@ -0,0 +1,43 @@
+from __future__ import annotations
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.invoices.models import Invoice
+from apps.invoices.services import pdf_cache
+from apps.invoices.views import _render_invoice_pdf
+
+
+class Command(BaseCommand):
+    help = "Pre-render and store PDFs for recently changed invoices so downloads and emails hit the cache."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hours", type=int, default=24, help="Invoices changed within this many hours")
+        parser.add_argument("--limit", type=int, default=500, help="Max invoices per run")
+
+    def handle(self, *args, **options):
+        since = timezone.now() - timedelta(hours=options["hours"])
+        invoices = (
+            Invoice.objects.filter(updated_at__gte=since)
+            .exclude(status=Invoice.Status.VOID)
+            .select_related("user")
+            .prefetch_related("items")
+            .order_by("-updated_at")[: options["limit"]]
+        )
+
+        rendered = cached = fallback = 0
+        for inv in invoices:
+            if pdf_cache.lookup(inv) is not None:
+                cached += 1
+                continue
+            result = pdf_cache.get_or_render(inv, lambda: _render_invoice_pdf(None, inv))
+            if result.stored:
+                rendered += 1
+            else:
+                fallback += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rendered {rendered}, already cached {cached}, not cacheable (fallback engine) {fallback}."
+        ))
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.invoices.services import lifecycle
+
+
+class Command(BaseCommand):
+    help = (
+        "Advance invoice statuses in bulk: SENT past due -> OVERDUE, and open invoices "
+        "that already have paid_at -> PAID. Each is one UPDATE plus bulk audit rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--as-of", help="YYYY-MM-DD used for overdue detection (default: today)")
+        parser.add_argument("--skip-overdue", action="store_true", help="Don't mark overdue invoices")
+        parser.add_argument("--skip-paid", action="store_true", help="Don't reconcile invoices with paid_at")
+        parser.add_argument("--dry-run", action="store_true", help="Only report how many would change")
+
+    def handle(self, *args, **options):
+        try:
+            as_of = date.fromisoformat(options["as_of"]) if options["as_of"] else None
+        except ValueError:
+            raise CommandError("--as-of must be YYYY-MM-DD")
+
+        common = {"source": "command", "dry_run": options["dry_run"]}
+        results = []
+        if not options["skip_overdue"]:
+            results.append(lifecycle.mark_overdue(as_of, **common))
+        if not options["skip_paid"]:
+            results.append(lifecycle.reconcile_paid(**common))
+
+        verb = "would be marked" if options["dry_run"] else "marked"
+        for result in results:
+            self.stdout.write(self.style.SUCCESS(f"{result.changed} invoice(s) {verb} {result.to_status}."))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.invoices.services import search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the invoice search documents (after imports that bypassed model signals)."
+
+    def handle(self, *args, **options):
+        n = search.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {n} invoice(s)."))
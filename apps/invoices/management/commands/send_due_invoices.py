@@ -0,0 +1,52 @@
+from __future__ import annotations
+
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from apps.invoices.models import Invoice
+from apps.invoices.services.mailing import due_invoices, send_invoices
+
+
+class Command(BaseCommand):
+    help = "Email every invoice matching a status and due date in one bulk run (one SMTP connection)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--status", action="append", choices=[Invoice.Status.DRAFT, *Invoice.OPEN_STATUSES],
+            help="Status to include (repeatable; default DRAFT)",
+        )
+        parser.add_argument("--due-before", help="YYYY-MM-DD; default: today + --due-within days")
+        parser.add_argument("--due-within", type=int, default=0, help="Include invoices due in the next N days")
+        parser.add_argument("--any-due-date", action="store_true", help="Ignore the due date")
+        parser.add_argument("--limit", type=int, default=1000, help="Max invoices per run")
+        parser.add_argument("--workers", type=int, help="PDF render threads (default INVOICE_BULK_PDF_WORKERS)")
+        parser.add_argument("--batch-size", type=int, help="Invoices rendered and recorded per batch")
+        parser.add_argument("--dry-run", action="store_true", help="List the selection without sending")
+
+    def handle(self, *args, **options):
+        due_before = None
+        if not options["any_due_date"]:
+            if options["due_before"]:
+                try:
+                    due_before = date.fromisoformat(options["due_before"])
+                except ValueError:
+                    raise CommandError("--due-before must be YYYY-MM-DD")
+            else:
+                due_before = timezone.localdate() + timedelta(days=options["due_within"])
+
+        invoices = list(
+            due_invoices(options["status"] or [Invoice.Status.DRAFT], due_before)
+            .exclude(user__email="")[: options["limit"]]
+        )
+        if options["dry_run"]:
+            for inv in invoices:
+                self.stdout.write(f"{inv.number}  due {inv.due_at}  {inv.user.email}")
+            self.stdout.write(f"{len(invoices)} invoice(s) would be sent.")
+            return
+
+        result = send_invoices(invoices, batch_size=options["batch_size"], workers=options["workers"])
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {len(result.sent)} of {result.selected}; failed {len(result.failed)}."
+        ))
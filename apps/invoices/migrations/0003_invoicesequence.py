@@ -0,0 +1,21 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0002_invoice_tax_rate_alter_invoice_amount_invoiceitem'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceSequence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(max_length=6, unique=True)),
+                ('last_value', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+    ]
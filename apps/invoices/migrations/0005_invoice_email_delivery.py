@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0004_invoice_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='invoice',
+            name='email_error',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='email_status',
+            field=models.CharField(blank=True, choices=[('', 'Not sent'), ('QUEUED', 'Queued'), ('SENT', 'Sent'), ('FAILED', 'Failed')], default='', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='emailed_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,88 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:46
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# SQLite: external-content FTS5 table over invoices_invoicesearch, kept in
+# sync by triggers; the trigram tokenizer gives substring (icontains) matching.
+SQLITE_FORWARD = [
+    """CREATE VIRTUAL TABLE invoices_invoicesearch_fts USING fts5(
+        document, content='invoices_invoicesearch', content_rowid='invoice_id', tokenize='trigram')""",
+    """CREATE TRIGGER invoices_invoicesearch_ai AFTER INSERT ON invoices_invoicesearch BEGIN
+        INSERT INTO invoices_invoicesearch_fts(rowid, document) VALUES (new.invoice_id, new.document);
+    END""",
+    """CREATE TRIGGER invoices_invoicesearch_ad AFTER DELETE ON invoices_invoicesearch BEGIN
+        INSERT INTO invoices_invoicesearch_fts(invoices_invoicesearch_fts, rowid, document)
+        VALUES ('delete', old.invoice_id, old.document);
+    END""",
+    """CREATE TRIGGER invoices_invoicesearch_au AFTER UPDATE ON invoices_invoicesearch BEGIN
+        INSERT INTO invoices_invoicesearch_fts(invoices_invoicesearch_fts, rowid, document)
+        VALUES ('delete', old.invoice_id, old.document);
+        INSERT INTO invoices_invoicesearch_fts(rowid, document) VALUES (new.invoice_id, new.document);
+    END""",
+]
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS invoices_invoicesearch_au",
+    "DROP TRIGGER IF EXISTS invoices_invoicesearch_ad",
+    "DROP TRIGGER IF EXISTS invoices_invoicesearch_ai",
+    "DROP TABLE IF EXISTS invoices_invoicesearch_fts",
+]
+
+# Postgres: trigram GIN index serves LIKE '%term%' on the lower-cased document.
+POSTGRES_FORWARD = [
+    "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+    "CREATE INDEX invoices_invoicesearch_trgm ON invoices_invoicesearch USING gin (document gin_trgm_ops)",
+]
+POSTGRES_BACKWARD = ["DROP INDEX IF EXISTS invoices_invoicesearch_trgm"]
+
+
+def _run(schema_editor, statements):
+    for sql in statements:
+        schema_editor.execute(sql)
+
+
+def create_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        _run(schema_editor, SQLITE_FORWARD)
+    elif vendor == "postgresql":
+        _run(schema_editor, POSTGRES_FORWARD)
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        _run(schema_editor, SQLITE_BACKWARD)
+    elif vendor == "postgresql":
+        _run(schema_editor, POSTGRES_BACKWARD)
+
+
+def backfill(apps, schema_editor):
+    Invoice = apps.get_model("invoices", "Invoice")
+    InvoiceSearch = apps.get_model("invoices", "InvoiceSearch")
+    db = schema_editor.connection.alias
+    rows = []
+    for inv in Invoice.objects.using(db).select_related("user").iterator(chunk_size=1000):
+        u = inv.user
+        parts = (inv.number, u.username, u.email, u.first_name, u.last_name)
+        rows.append(InvoiceSearch(invoice_id=inv.pk, document=" ".join(p for p in parts if p).lower()))
+    InvoiceSearch.objects.using(db).bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0005_invoice_email_delivery'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InvoiceSearch',
+            fields=[
+                ('invoice', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search', serialize=False, to='invoices.invoice')),
+                ('document', models.TextField(blank=True, default='')),
+            ],
+        ),
+        migrations.RunPython(create_index, drop_index),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:48
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0006_invoicesearch'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='invoice',
+            index=models.Index(fields=['status', 'due_at'], name='invoices_in_status_99a5ff_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:49
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0007_invoice_status_due_at_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='invoice',
+            name='status',
+            field=models.CharField(choices=[('DRAFT', 'Draft'), ('SENT', 'Sent'), ('OVERDUE', 'Overdue'), ('PAID', 'Paid'), ('VOID', 'Void')], db_index=True, default='DRAFT', max_length=10),
+        ),
+        migrations.CreateModel(
+            name='InvoiceStatusChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('from_status', models.CharField(choices=[('DRAFT', 'Draft'), ('SENT', 'Sent'), ('OVERDUE', 'Overdue'), ('PAID', 'Paid'), ('VOID', 'Void')], max_length=10)),
+                ('to_status', models.CharField(choices=[('DRAFT', 'Draft'), ('SENT', 'Sent'), ('OVERDUE', 'Overdue'), ('PAID', 'Paid'), ('VOID', 'Void')], max_length=10)),
+                ('source', models.CharField(blank=True, default='', max_length=32)),
+                ('changed_at', models.DateTimeField(db_index=True, default=django.utils.timezone.now)),
+                ('changed_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('invoice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='status_changes', to='invoices.invoice')),
+            ],
+            options={
+                'ordering': ('-changed_at',),
+                'indexes': [models.Index(fields=['invoice', 'changed_at'], name='invoices_in_invoice_a29f5e_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:50
+
+import django.db.models.deletion
+import django.utils.timezone
+from decimal import Decimal
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0008_invoice_overdue_status_change'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecurringInvoice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cadence', models.CharField(choices=[('WEEKLY', 'Weekly'), ('MONTHLY', 'Monthly'), ('QUARTERLY', 'Quarterly'), ('YEARLY', 'Yearly')], default='MONTHLY', max_length=10)),
+                ('start_date', models.DateField(default=django.utils.timezone.localdate)),
+                ('next_run', models.DateField(default=django.utils.timezone.localdate)),
+                ('due_days', models.PositiveSmallIntegerField(default=14)),
+                ('currency', models.CharField(default='EUR', max_length=3)),
+                ('tax_rate', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=5)),
+                ('notes', models.TextField(blank=True, default='')),
+                ('active', models.BooleanField(default=True)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='recurring_invoices', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ('next_run', 'id'),
+            },
+        ),
+        migrations.AddField(
+            model_name='invoice',
+            name='recurring',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='invoices', to='invoices.recurringinvoice'),
+        ),
+        migrations.CreateModel(
+            name='RecurringInvoiceItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('description', models.CharField(max_length=255)),
+                ('qty', models.DecimalField(decimal_places=2, default=Decimal('1.00'), max_digits=10)),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('recurring', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='invoices.recurringinvoice')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='recurringinvoice',
+            index=models.Index(fields=['active', 'next_run'], name='invoices_re_active_2f9c37_idx'),
+        ),
+    ]
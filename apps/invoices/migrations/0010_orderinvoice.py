@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('invoices', '0009_recurringinvoice'),
+        ('orders', '0002_alter_order_options_order_user_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderInvoice',
+            fields=[
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='invoice_link', serialize=False, to='orders.order')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('invoice', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='order_links', to='invoices.invoice')),
+            ],
+        ),
+    ]
@@ -1,19 +1,78 @@
 # apps/invoices/models.py
-from decimal import Decimal
+import threading
+from contextlib import contextmanager
+from decimal import ROUND_HALF_UP, Decimal
+from typing import NamedTuple
+
 from django.conf import settings
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models.functions import Coalesce, Round
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from django.utils import timezone
 
+CENT = Decimal("0.01")
+ZERO = Decimal("0.00")
+
+
+class InvoiceTotals(NamedTuple):
+    subtotal: Decimal
+    tax_amount: Decimal
+    total: Decimal
+
+    @classmethod
+    def from_subtotal(cls, subtotal, tax_rate) -> "InvoiceTotals":
+        # Half-up so Python and SQL ROUND() (with_totals) agree to the cent.
+        subtotal = Decimal(subtotal or ZERO).quantize(CENT, ROUND_HALF_UP)
+        tax = (subtotal * (Decimal(tax_rate or ZERO) / Decimal("100"))).quantize(CENT, ROUND_HALF_UP)
+        return cls(subtotal, tax, subtotal + tax)
+
+
+class InvoiceQuerySet(models.QuerySet):
+    def with_totals(self):
+        """
+        Annotate annotated_subtotal / annotated_tax / annotated_total in SQL
+        (one correlated subquery, no row multiplication from the items join).
+        Invoice.subtotal/tax_amount/total pick these up without extra queries.
+        """
+        money = models.DecimalField(max_digits=12, decimal_places=2)
+        line_sum = (
+            InvoiceItem.objects.filter(invoice=models.OuterRef("pk"))
+            .order_by()
+            .values("invoice")
+            .annotate(s=models.Sum(models.F("qty") * models.F("unit_price")))
+            .values("s")
+        )
+        subtotal = Round(Coalesce(models.Subquery(line_sum, output_field=money), ZERO, output_field=money), 2)
+        return self.annotate(annotated_subtotal=subtotal).annotate(
+            annotated_tax=Round(
+                models.F("annotated_subtotal") * models.F("tax_rate") / Decimal("100"), 2,
+                output_field=money,
+            ),
+        ).annotate(
+            annotated_total=models.ExpressionWrapper(
+                models.F("annotated_subtotal") + models.F("annotated_tax"), output_field=money
+            ),
+        )
+
 
 class Invoice(models.Model):
     class Status(models.TextChoices):
         DRAFT = "DRAFT", "Draft"
         SENT = "SENT", "Sent"
+        OVERDUE = "OVERDUE", "Overdue"
         PAID = "PAID", "Paid"
         VOID = "VOID", "Void"
 
+    # Issued but not yet settled: what AR aging and reminders look at.
+    OPEN_STATUSES = (Status.SENT, Status.OVERDUE)
+
+    class EmailStatus(models.TextChoices):
+        NONE = "", "Not sent"
+        QUEUED = "QUEUED", "Queued"
+        SENT = "SENT", "Sent"
+        FAILED = "FAILED", "Failed"
+
     user        = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name="invoices")
     number      = models.CharField(max_length=32, unique=True, blank=True)
     status      = models.CharField(max_length=10, choices=Status.choices, default=Status.DRAFT, db_index=True)
@@ -24,71 +83,207 @@ class Invoice(models.Model):
     paid_at     = models.DateField(null=True, blank=True)
     notes       = models.TextField(blank=True, default="")
     created_at  = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at  = models.DateTimeField(auto_now=True, db_index=True)
+
+    # delivery (set by the invoices.email background job)
+    email_status = models.CharField(max_length=10, choices=EmailStatus.choices, blank=True, default="")
+    emailed_at   = models.DateTimeField(null=True, blank=True)
+    email_error  = models.CharField(max_length=255, blank=True, default="")
 
     # cached total
     amount      = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal("0.00"))
 
+    # set when generated from a RecurringInvoice schedule
+    recurring   = models.ForeignKey(
+        "invoices.RecurringInvoice", on_delete=models.SET_NULL, null=True, blank=True, related_name="invoices"
+    )
+
     def __str__(self):
         return self.number or f"Invoice #{self.pk}"
 
+    objects = InvoiceQuerySet.as_manager()
+
+    # ---- totals ----
+
+    def compute_totals(self, fresh: bool = False) -> InvoiceTotals:
+        """
+        Subtotal, tax and total in at most one query, memoized per instance.
+        Sources, cheapest first: with_totals() annotations, prefetched items,
+        a single aggregate. fresh=True skips the memo and caches and always
+        aggregates from the database.
+        """
+        if not fresh:
+            cached = getattr(self, "_totals", None)
+            if cached is not None:
+                return cached
+            annotated = getattr(self, "annotated_subtotal", None)
+            if annotated is not None:
+                self._totals = InvoiceTotals(
+                    Decimal(annotated).quantize(CENT, ROUND_HALF_UP),
+                    Decimal(self.annotated_tax).quantize(CENT, ROUND_HALF_UP),
+                    Decimal(self.annotated_total).quantize(CENT, ROUND_HALF_UP),
+                )
+                return self._totals
+
+        if not self.pk:
+            subtotal = ZERO
+        elif not fresh and "items" in getattr(self, "_prefetched_objects_cache", {}):
+            subtotal = sum((it.qty * it.unit_price for it in self.items.all()), ZERO)
+        else:
+            agg = self.items.aggregate(s=models.Sum(models.F("qty") * models.F("unit_price")))
+            subtotal = agg["s"] or ZERO
+
+        self._totals = InvoiceTotals.from_subtotal(subtotal, self.tax_rate)
+        return self._totals
+
+    def invalidate_totals(self):
+        self._totals = None
+
+    def refresh_from_db(self, *args, **kwargs):
+        self.invalidate_totals()
+        super().refresh_from_db(*args, **kwargs)
+
     @property
     def subtotal(self) -> Decimal:
         """Sum of qty * unit_price across items. 0.00 if not yet saved (no PK)."""
-        if not self.pk:
-            return Decimal("0.00")
-        agg = self.items.aggregate(s=models.Sum(models.F("qty") * models.F("unit_price")))
-        return (agg["s"] or Decimal("0.00")).quantize(Decimal("0.01"))
+        return self.compute_totals().subtotal
 
     @property
     def tax_amount(self) -> Decimal:
-        return (self.subtotal * (self.tax_rate / Decimal("100"))).quantize(Decimal("0.01"))
+        return self.compute_totals().tax_amount
 
     @property
     def total(self) -> Decimal:
-        return (self.subtotal + self.tax_amount).quantize(Decimal("0.01"))
+        return self.compute_totals().total
 
     def save(self, *args, **kwargs):
         """
-        First save (no PK yet): create number, save once to get PK,
-        then compute cached amount and update.
-        Subsequent saves: recompute cached amount and save.
+        First save (no PK yet): take the next number from the monthly
+        sequence and insert once, in one transaction; a new invoice has no
+        items, so its cached amount is 0.00.
+        Subsequent saves: recompute cached amount (one aggregate) and save.
         """
-        creating = self.pk is None
+        using = kwargs.get("using")
+
+        if self.pk is None:
+            # Number + insert share one transaction so the sequence row lock
+            # is held until the invoice row exists (no duplicate numbers).
+            with transaction.atomic(using=using):
+                if not self.number:
+                    self.number = reserve_invoice_numbers(1, using=using)[0]
+                kwargs.pop("update_fields", None)  # ensure full insert
+                self.invalidate_totals()
+                self.amount = ZERO
+                super().save(*args, **kwargs)
+            return
 
-        # Generate invoice number if missing
         if not self.number:
-            today = timezone.now()
-            yyyymm = today.strftime("%Y%m")
-            prefix = f"INV-{yyyymm}-"
-            last = Invoice.objects.filter(number__startswith=prefix).order_by("-number").first()
-            if last and last.number:
-                try:
-                    seq = int(last.number.split("-")[-1]) + 1
-                except Exception:
-                    seq = 1
-            else:
-                seq = 1
-            self.number = f"{prefix}{seq:04d}"
-
-        if creating:
-            # Save once to obtain PK (can't read self.items before PK exists)
-            kwargs.pop("update_fields", None)  # ensure full insert
-            super().save(*args, **kwargs)
-            # Now compute and cache amount
-            self.amount = self.total
-            super().save(update_fields=["amount"])
-        else:
-            self.amount = self.total
-            super().save(*args, **kwargs)
+            self.number = reserve_invoice_numbers(1, using=using)[0]
+        self.amount = self.compute_totals(fresh=True).total
+        super().save(*args, **kwargs)
 
     class Meta:
         ordering = ("-created_at",)
         indexes = [
             models.Index(fields=["status", "created_at"]),
+            models.Index(fields=["status", "due_at"]),  # AR aging / overdue scans
             models.Index(fields=["user", "created_at"]),
         ]
 
 
+class InvoiceSequence(models.Model):
+    """Last issued invoice number per month (INV-YYYYMM-NNNN)."""
+
+    period     = models.CharField(max_length=6, unique=True)  # YYYYMM
+    last_value = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.period}: {self.last_value}"
+
+    @staticmethod
+    def prefix(period: str) -> str:
+        return f"INV-{period}-"
+
+    @classmethod
+    def _seed_value(cls, period: str, using=None) -> int:
+        """Highest existing number for a period (invoices created before this table existed)."""
+        prefix = cls.prefix(period)
+        qs = Invoice.objects.using(using) if using else Invoice.objects
+        last = qs.filter(number__startswith=prefix).order_by("-number").values_list("number", flat=True).first()
+        try:
+            return int(last.split("-")[-1]) if last else 0
+        except ValueError:
+            return 0
+
+    @classmethod
+    def reserve(cls, period: str, count: int = 1, using=None) -> range:
+        """
+        Atomically take the next `count` sequence values for period.
+        The F() update row-locks the sequence until the caller's transaction
+        ends, so concurrent reservations queue instead of colliding.
+        """
+        if count < 1:
+            raise ValueError("count must be >= 1")
+        qs = cls.objects.using(using) if using else cls.objects
+        with transaction.atomic(using=using):
+            if not qs.filter(period=period).update(last_value=models.F("last_value") + count):
+                # First number of the month: create the row (get_or_create
+                # absorbs the insert race), then increment as usual.
+                qs.get_or_create(period=period, defaults={"last_value": cls._seed_value(period, using)})
+                qs.filter(period=period).update(last_value=models.F("last_value") + count)
+            last = qs.filter(period=period).values_list("last_value", flat=True).get()
+        return range(last - count + 1, last + 1)
+
+
+def reserve_invoice_numbers(count: int = 1, when=None, using=None) -> list[str]:
+    """Reserve a block of consecutive invoice numbers for the month of `when` (default: now)."""
+    period = (when or timezone.now()).strftime("%Y%m")
+    prefix = InvoiceSequence.prefix(period)
+    return [f"{prefix}{seq:04d}" for seq in InvoiceSequence.reserve(period, count, using=using)]
+
+
+class InvoiceStatusChange(models.Model):
+    """Audit row per invoice for every status transition (see services.lifecycle)."""
+
+    invoice     = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name="status_changes")
+    from_status = models.CharField(max_length=10, choices=Invoice.Status.choices)
+    to_status   = models.CharField(max_length=10, choices=Invoice.Status.choices)
+    source      = models.CharField(max_length=32, blank=True, default="")  # e.g. "command", "admin"
+    changed_by  = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    changed_at  = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        ordering = ("-changed_at",)
+        indexes = [models.Index(fields=["invoice", "changed_at"])]
+
+    def __str__(self):
+        return f"{self.invoice_id}: {self.from_status} → {self.to_status}"
+
+
+class InvoiceSearch(models.Model):
+    """
+    Denormalized search text per invoice (number + customer fields, lower-cased),
+    kept in sync by the receivers below. Indexed by migration 0006: a pg_trgm
+    GIN index on Postgres, an FTS5 trigram table on SQLite (see services.search).
+    """
+
+    invoice  = models.OneToOneField(Invoice, on_delete=models.CASCADE, primary_key=True, related_name="search")
+    document = models.TextField(blank=True, default="")
+
+    # Customer fields that end up in the document.
+    USER_FIELDS = ("username", "email", "first_name", "last_name")
+
+    def __str__(self):
+        return self.document
+
+    @classmethod
+    def build(cls, number: str, user) -> str:
+        parts = (number, *(getattr(user, f) for f in cls.USER_FIELDS))
+        return " ".join(p for p in parts if p).lower()
+
+
 class InvoiceItem(models.Model):
     invoice     = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name="items")
     description = models.CharField(max_length=255)
@@ -102,17 +297,188 @@ class InvoiceItem(models.Model):
         return f"{self.description} ({self.qty} × {self.unit_price})"
 
 
+class RecurringInvoice(models.Model):
+    """Template a batch run turns into a real Invoice every cadence (services.recurring)."""
+
+    class Cadence(models.TextChoices):
+        WEEKLY = "WEEKLY", "Weekly"
+        MONTHLY = "MONTHLY", "Monthly"
+        QUARTERLY = "QUARTERLY", "Quarterly"
+        YEARLY = "YEARLY", "Yearly"
+
+    user       = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT, related_name="recurring_invoices")
+    cadence    = models.CharField(max_length=10, choices=Cadence.choices, default=Cadence.MONTHLY)
+    start_date = models.DateField(default=timezone.localdate)  # its day-of-month anchors monthly runs
+    next_run   = models.DateField(default=timezone.localdate)
+    due_days   = models.PositiveSmallIntegerField(default=14)  # due_at = issued_at + due_days
+    currency   = models.CharField(max_length=3, default="EUR")
+    tax_rate   = models.DecimalField(max_digits=5, decimal_places=2, default=Decimal("0.00"))
+    notes      = models.TextField(blank=True, default="")
+    active     = models.BooleanField(default=True)
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ("next_run", "id")
+        indexes = [models.Index(fields=["active", "next_run"])]
+
+    def __str__(self):
+        return f"{self.user} · {self.get_cadence_display()} from {self.start_date}"
+
+
+class RecurringInvoiceItem(models.Model):
+    recurring   = models.ForeignKey(RecurringInvoice, on_delete=models.CASCADE, related_name="items")
+    description = models.CharField(max_length=255)
+    qty         = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal("1.00"))
+    unit_price  = models.DecimalField(max_digits=10, decimal_places=2)
+
+    def __str__(self):
+        return f"{self.description} ({self.qty} × {self.unit_price})"
+
+
+class OrderInvoice(models.Model):
+    """
+    Which invoice billed an order (services.order_invoicing). The order is
+    the primary key, so an order can never be invoiced twice, even by two
+    concurrent runs.
+    """
+
+    order      = models.OneToOneField("orders.Order", on_delete=models.CASCADE, primary_key=True, related_name="invoice_link")
+    invoice    = models.ForeignKey(Invoice, on_delete=models.CASCADE, related_name="order_links")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"order {self.order_id} → invoice {self.invoice_id}"
+
+
 # --- Keep cached amount in sync when items change ---
+#
+# Item receivers only record the invoice id. Recalculation is coalesced per
+# invoice and runs once when the surrounding transaction commits (or right
+# away in autocommit mode), so saving a 20-line formset costs one recompute
+# instead of one per line.
+
+_recalc_state = threading.local()
+
+
+class _PendingRecalc:
+    """on_commit callback that recomputes every invoice touched in one transaction."""
+
+    def __init__(self, using):
+        self.using = using
+        self.ids: set[int] = set()
+        self.done = False
+
+    def __call__(self):
+        batches = getattr(_recalc_state, "batches", {})
+        if batches.get(self.using) is self:
+            del batches[self.using]
+        if self.done:  # registered once per item; the first call does the work
+            return
+        self.done = True
+        recalc_amounts(self.ids, using=self.using)
+
+
+def recalc_amounts(invoice_ids, using=None) -> int:
+    """Refresh the cached amount (and updated_at) of the given invoices in two queries."""
+    ids = {pk for pk in invoice_ids if pk}
+    if not ids:
+        return 0
+    qs = Invoice.objects.using(using) if using else Invoice.objects
+    invoices = list(qs.filter(pk__in=ids).with_totals().only("pk", "amount", "tax_rate"))
+    now = timezone.now()
+    for inv in invoices:
+        inv.amount = inv.compute_totals().total
+        inv.updated_at = now  # item edits change the document even when the total doesn't
+    if invoices:
+        qs.bulk_update(invoices, ["amount", "updated_at"])
+    return len(invoices)
+
+
+def schedule_recalc(invoice_id, using=None):
+    """Queue an amount recalculation for invoice_id, coalesced per transaction."""
+    if not invoice_id:
+        return
+    suspended = getattr(_recalc_state, "suspended", None)
+    if suspended is not None:
+        suspended.add(invoice_id)
+        return
+
+    using = using or router.db_for_write(Invoice)
+    conn = transaction.get_connection(using)
+    if not conn.in_atomic_block:
+        recalc_amounts([invoice_id], using=using)
+        return
+
+    batches = _recalc_state.__dict__.setdefault("batches", {})
+    batch = batches.get(using)
+    if batch is None:
+        batch = batches[using] = _PendingRecalc(using)
+    batch.ids.add(invoice_id)
+    # Registered again for every item: a rollback silently drops the callbacks
+    # registered inside it, so this way whatever survives still runs the batch
+    # (ids from the rolled-back part just get a harmless recompute).
+    transaction.on_commit(batch, using=using)
+
+
+@contextmanager
+def deferred_amounts(*invoices):
+    """
+    Suspend the per-item receivers for bulk item operations and recompute
+    the touched invoices (plus any passed explicitly) once on exit:
+
+        with deferred_amounts(inv):
+            InvoiceItem.objects.filter(invoice=inv).delete()
+            InvoiceItem.objects.bulk_create(lines)
+    """
+    outer = getattr(_recalc_state, "suspended", None)
+    touched = {getattr(inv, "pk", inv) for inv in invoices}
+    _recalc_state.suspended = touched
+    try:
+        yield touched
+    finally:
+        _recalc_state.suspended = outer
+        if outer is not None:
+            outer.update(touched)
+        else:
+            for pk in touched:
+                schedule_recalc(pk)
+
 
 @receiver(post_save, sender=InvoiceItem)
-def _recalc_amount_on_item_save(sender, instance: InvoiceItem, **kwargs):
-    inv = instance.invoice
-    # Avoid recursion storm: update amount only
-    inv.amount = inv.total
-    Invoice.objects.filter(pk=inv.pk).update(amount=inv.amount)
+def _recalc_amount_on_item_save(sender, instance: InvoiceItem, using=None, **kwargs):
+    schedule_recalc(instance.invoice_id, using=using)
 
 @receiver(post_delete, sender=InvoiceItem)
-def _recalc_amount_on_item_delete(sender, instance: InvoiceItem, **kwargs):
-    inv = instance.invoice
-    inv.amount = inv.total
-    Invoice.objects.filter(pk=inv.pk).update(amount=inv.amount)
+def _recalc_amount_on_item_delete(sender, instance: InvoiceItem, using=None, **kwargs):
+    schedule_recalc(instance.invoice_id, using=using)
+
+
+# --- Keep the search document in sync with the invoice and its customer ---
+
+@receiver(post_save, sender=Invoice)
+def _sync_search_on_invoice_save(sender, instance: Invoice, raw=False, using=None, **kwargs):
+    if raw:
+        return
+    InvoiceSearch.objects.using(using).update_or_create(
+        invoice_id=instance.pk,
+        defaults={"document": InvoiceSearch.build(instance.number, instance.user)},
+    )
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def _sync_search_on_user_save(sender, instance, created=False, raw=False, using=None, update_fields=None, **kwargs):
+    if created or raw:
+        return
+    # Most user saves (e.g. last_login on every login) don't touch the indexed fields.
+    if update_fields is not None and not set(update_fields) & set(InvoiceSearch.USER_FIELDS):
+        return
+    docs = InvoiceSearch.objects.using(using).filter(invoice__user=instance)
+    sample = docs.values_list("invoice__number", "document").first()
+    if sample is None or InvoiceSearch.build(sample[0], instance) == sample[1]:
+        return  # no invoices, or name/email unchanged
+    rows = [
+        InvoiceSearch(invoice_id=pk, document=InvoiceSearch.build(number, instance))
+        for pk, number in Invoice.objects.using(using).filter(user=instance).values_list("pk", "number")
+    ]
+    InvoiceSearch.objects.using(using).bulk_update(rows, ["document"], batch_size=500)
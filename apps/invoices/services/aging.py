@@ -0,0 +1,126 @@
+from __future__ import annotations
+
+import datetime
+from decimal import Decimal
+from typing import Any, Dict, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from apps.core import fx
+
+from ..models import CENT, ZERO, Invoice
+
+# (key, label, min days past due, max days past due); None = open-ended
+BUCKETS = (
+    ("current", "Current", None, 0),
+    ("d1_30", "1–30", 1, 30),
+    ("d31_60", "31–60", 31, 60),
+    ("d61_90", "61–90", 61, 90),
+    ("d90_plus", "90+", 91, None),
+)
+
+
+def _bucket_q(as_of: datetime.date, lo: Optional[int], hi: Optional[int]) -> Q:
+    """Open invoices whose due date is lo..hi days before as_of (no due date counts as current)."""
+    q = Q(status__in=Invoice.OPEN_STATUSES)
+    if lo is None:
+        return q & (Q(due_at__isnull=True) | Q(due_at__gte=as_of - datetime.timedelta(days=hi)))
+    q &= Q(due_at__lte=as_of - datetime.timedelta(days=lo))
+    if hi is not None:
+        q &= Q(due_at__gte=as_of - datetime.timedelta(days=hi))
+    return q
+
+
+def _money(value) -> Decimal:
+    return Decimal(value or ZERO).quantize(CENT)
+
+
+def _rate(collected: Decimal, billed: Decimal) -> Optional[Decimal]:
+    # share of billed (open + PAID) value already collected
+    return (collected / billed * 100).quantize(Decimal("0.1")) if billed else None
+
+
+def _base_totals(currencies: list) -> Dict[str, Any]:
+    """
+    The per-currency rows converted with the local FX table and summed into
+    one base-currency row (no extra query). Currencies without a rate are
+    listed under "unconverted" and left out of the total.
+    """
+    table = fx.rates()
+    unconverted = fx.missing(row["currency"] for row in currencies)
+    rows = [row for row in currencies if row["currency"] not in unconverted]
+    if not rows:
+        return {"base": None, "unconverted": unconverted}
+
+    def total(get) -> Decimal:
+        return sum((table.convert(get(row), row["currency"]) for row in rows), ZERO)
+
+    outstanding, collected = total(lambda r: r["outstanding"]), total(lambda r: r["paid"])
+    return {
+        "base": {
+            "currency": table.base,
+            "buckets": [total(lambda r, i=i: r["buckets"][i]) for i in range(len(BUCKETS))],
+            "outstanding": outstanding,
+            "open_count": sum(r["open_count"] for r in rows),
+            "paid": collected,
+            "paid_count": sum(r["paid_count"] for r in rows),
+            "collection_rate": _rate(collected, outstanding + collected),
+        },
+        "unconverted": unconverted,
+    }
+
+
+def ar_aging(as_of: Optional[datetime.date] = None) -> Dict[str, Any]:
+    """
+    Outstanding (SENT/OVERDUE) amounts per currency and due bucket, plus the PAID
+    collection rate, from one conditional-aggregation query grouped by
+    currency (served by the (status, due_at) index), and the same figures
+    converted to the base currency ("base"). Cached for
+    INVOICE_AGING_CACHE_TTL seconds per as_of date.
+    """
+    as_of = as_of or timezone.localdate()
+    key = f"invoices:aging:{as_of.isoformat()}"
+    cached = cache.get(key)
+    if cached is not None:
+        return cached
+
+    sent, paid = Q(status__in=Invoice.OPEN_STATUSES), Q(status=Invoice.Status.PAID)
+    aggregates = {name: Sum("amount", filter=_bucket_q(as_of, lo, hi)) for name, _, lo, hi in BUCKETS}
+    rows = (
+        Invoice.objects.filter(status__in=[*Invoice.OPEN_STATUSES, Invoice.Status.PAID])
+        .order_by()
+        .values("currency")
+        .annotate(
+            **aggregates,
+            outstanding=Sum("amount", filter=sent),
+            open_count=Count("id", filter=sent),
+            paid=Sum("amount", filter=paid),
+            paid_count=Count("id", filter=paid),
+        )
+        .order_by("currency")
+    )
+
+    currencies = []
+    for row in rows:
+        outstanding, collected = _money(row["outstanding"]), _money(row["paid"])
+        currencies.append({
+            "currency": row["currency"],
+            "buckets": [_money(row[name]) for name, *_ in BUCKETS],
+            "outstanding": outstanding,
+            "open_count": row["open_count"],
+            "paid": collected,
+            "paid_count": row["paid_count"],
+            "collection_rate": _rate(collected, outstanding + collected),
+        })
+
+    report = {
+        "as_of": as_of,
+        "buckets": [label for _, label, *_ in BUCKETS],
+        "currencies": currencies,
+        **_base_totals(currencies),
+    }
+    cache.set(key, report, getattr(settings, "INVOICE_AGING_CACHE_TTL", 120))
+    return report
@@ -0,0 +1,199 @@
+from __future__ import annotations
+
+import asyncio
+import atexit
+import logging
+import threading
+from typing import Optional
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+PDF_OPTIONS = {
+    "format": "A4",
+    "margin": {"top": "18mm", "right": "18mm", "bottom": "18mm", "left": "18mm"},
+    "print_background": True,
+}
+
+
+class BrowserPool:
+    """
+    One long-lived headless Chromium per worker process.
+
+    Playwright objects are bound to the thread/loop that created them, so the
+    browser lives on a private asyncio loop in a daemon thread; Django threads
+    submit HTML and block on the result. Up to ``max_pages`` pages render
+    concurrently and are reused between renders. The browser is relaunched
+    after ``recycle_after`` renders (once idle) or when a health check fails.
+    """
+
+    def __init__(self, max_pages: int = 2, recycle_after: int = 200, timeout: float = 30.0):
+        self.max_pages = max(1, max_pages)
+        self.recycle_after = max(1, recycle_after)
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Loop-side state (only touched from the pool thread)
+        self._pw = None
+        self._browser = None
+        self._context = None
+        self._idle: list = []
+        self._renders = 0
+        self._active = 0
+        self._sem: Optional[asyncio.Semaphore] = None
+        self._launch_lock: Optional[asyncio.Lock] = None
+
+    # ---------- sync API (any thread) ----------
+
+    def render(self, html: str, wait_until: str = "networkidle") -> bytes:
+        loop = self._ensure_loop()
+        fut = asyncio.run_coroutine_threadsafe(self._render(html, wait_until), loop)
+        try:
+            return fut.result(self.timeout)
+        except Exception:
+            fut.cancel()
+            raise
+
+    def warm(self) -> None:
+        """Launch the browser and open the page pool ahead of the first render."""
+        self.render("<html><body></body></html>")
+
+    def healthy(self) -> bool:
+        if self._loop is None:
+            return False
+        fut = asyncio.run_coroutine_threadsafe(self._healthy(), self._loop)
+        try:
+            return fut.result(5)
+        except Exception:
+            return False
+
+    def stats(self) -> dict:
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "renders_since_launch": self._renders,
+            "active": self._active,
+            "max_pages": self.max_pages,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = self._thread = None
+        if loop is None:
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self._close_browser(), loop).result(10)
+        except Exception:
+            logger.debug("Browser pool shutdown failed", exc_info=True)
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(5)
+
+    def _ensure_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None or self._thread is None or not self._thread.is_alive():
+                loop = asyncio.new_event_loop()
+                ready = threading.Event()
+
+                def run():
+                    asyncio.set_event_loop(loop)
+                    loop.call_soon(ready.set)
+                    loop.run_forever()
+
+                thread = threading.Thread(target=run, name="invoice-pdf-browser", daemon=True)
+                thread.start()
+                ready.wait()
+                self._loop, self._thread = loop, thread
+            return self._loop
+
+    # ---------- loop side ----------
+
+    async def _healthy(self) -> bool:
+        return self._browser is not None and self._browser.is_connected()
+
+    async def _launch(self):
+        """Start Playwright and Chromium: (playwright, browser)."""
+        from playwright.async_api import async_playwright
+
+        pw = await async_playwright().start()
+        return pw, await pw.chromium.launch()
+
+    async def _ensure_browser(self):
+        if await self._healthy():
+            return
+        await self._close_browser()
+        self._pw, self._browser = await self._launch()
+        self._context = await self._browser.new_context()
+        self._idle = [await self._context.new_page() for _ in range(self.max_pages)]
+        self._renders = 0
+        logger.info("Invoice PDF browser launched (%d pages)", self.max_pages)
+
+    async def _close_browser(self):
+        browser, pw = self._browser, self._pw
+        self._browser = self._pw = self._context = None
+        self._idle = []
+        try:
+            if browser is not None:
+                await browser.close()
+        finally:
+            if pw is not None:
+                await pw.stop()
+
+    async def _render(self, html: str, wait_until: str) -> bytes:
+        if self._sem is None:
+            self._sem = asyncio.Semaphore(self.max_pages)
+            self._launch_lock = asyncio.Lock()
+
+        async with self._sem:
+            async with self._launch_lock:
+                await self._ensure_browser()
+            browser = self._browser
+            page = self._idle.pop() if self._idle else await self._context.new_page()
+            self._active += 1
+            ok = False
+            try:
+                await page.set_content(html, wait_until=wait_until)
+                pdf = await page.pdf(**PDF_OPTIONS)
+                ok = True
+                return pdf
+            finally:
+                self._active -= 1
+                self._renders += 1
+                if ok and browser is self._browser and not page.is_closed():
+                    self._idle.append(page)  # reuse; next set_content replaces the DOM
+                else:
+                    await self._discard(page)
+                if self._renders >= self.recycle_after and self._active == 0:
+                    logger.info("Recycling invoice PDF browser after %d renders", self._renders)
+                    await self._close_browser()
+
+    async def _discard(self, page):
+        """Drop a page that failed mid-render, and the browser too if it died."""
+        try:
+            await page.close()
+        except Exception:
+            pass
+        if not await self._healthy():
+            await self._close_browser()
+
+
+_pool: Optional[BrowserPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> BrowserPool:
+    """Process-wide pool, created lazily so each forked worker gets its own."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = BrowserPool(
+                max_pages=getattr(settings, "INVOICE_PDF_BROWSER_PAGES", 2),
+                recycle_after=getattr(settings, "INVOICE_PDF_BROWSER_RECYCLE_AFTER", 200),
+                timeout=getattr(settings, "INVOICE_PDF_RENDER_TIMEOUT", 30),
+            )
+            atexit.register(_pool.shutdown)
+        return _pool
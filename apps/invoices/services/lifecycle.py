@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import datetime
+from typing import Iterable, NamedTuple, Optional
+
+from django.db import connections, transaction
+from django.db.models import BigIntegerField, CharField, DateTimeField, F, Value
+from django.db.models.functions import Cast, Coalesce
+from django.utils import timezone
+
+from ..models import Invoice, InvoiceStatusChange
+
+S = Invoice.Status
+
+
+class TransitionResult(NamedTuple):
+    to_status: str
+    changed: int
+
+
+def _audit_stamped(to_status: str, from_status: str, stamp, *, actor, source: str, using: str) -> None:
+    """INSERT ... SELECT one InvoiceStatusChange per invoice the UPDATE stamped with `stamp`."""
+    rows = (
+        Invoice.objects.using(using).filter(status=to_status, updated_at=stamp).order_by()
+        .annotate(
+            _from=Value(from_status, output_field=CharField()),
+            _to=Value(to_status, output_field=CharField()),
+            _source=Value(source, output_field=CharField()),
+            _actor=Cast(Value(getattr(actor, "pk", actor)), BigIntegerField()),  # typed even when NULL
+            _at=Value(stamp, output_field=DateTimeField()),
+        )
+        .values_list("pk", "_from", "_to", "_source", "_actor", "_at")
+    )
+    select_sql, params = rows.query.get_compiler(using).as_sql()
+    meta, qn = InvoiceStatusChange._meta, connections[using].ops.quote_name
+    columns = ", ".join(
+        qn(meta.get_field(f).column)
+        for f in ("invoice", "from_status", "to_status", "source", "changed_by", "changed_at")
+    )
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"INSERT INTO {qn(meta.db_table)} ({columns}) {select_sql}", params)
+
+
+def transition(qs, to_status: str, allowed_from: Iterable[str], *, actor=None, source: str = "",
+               dry_run: bool = False, **fields) -> TransitionResult:
+    """
+    Move every invoice in qs whose status is in allowed_from to to_status
+    (plus any extra `fields`, which may be expressions) and record one
+    InvoiceStatusChange per invoice, without pulling the rows into Python:
+    per source status, one UPDATE filtered on qs's own conditions, then one
+    INSERT ... SELECT for the audit rows. Each UPDATE stamps updated_at with
+    its own timestamp, which is how the INSERT finds exactly the rows it
+    changed; the UPDATE's row locks keep concurrent transitions out.
+    """
+    allowed_from = [s for s in allowed_from if s != to_status]
+    scoped = qs.filter(status__in=allowed_from).order_by()
+    if dry_run:
+        return TransitionResult(to_status, scoped.count())
+
+    using = qs.db
+    now, changed = timezone.now(), 0
+    with transaction.atomic(using=using):
+        for i, from_status in enumerate(allowed_from):
+            stamp = now + datetime.timedelta(microseconds=i)
+            n = qs.filter(status=from_status).order_by().update(status=to_status, updated_at=stamp, **fields)
+            if n:
+                _audit_stamped(to_status, from_status, stamp, actor=actor, source=source, using=using)
+                changed += n
+    return TransitionResult(to_status, changed)
+
+
+def mark_overdue(as_of: Optional[datetime.date] = None, **kwargs) -> TransitionResult:
+    """SENT invoices whose due date has passed become OVERDUE."""
+    as_of = as_of or timezone.localdate()
+    return transition(Invoice.objects.filter(due_at__lt=as_of), S.OVERDUE, [S.SENT], **kwargs)
+
+
+def mark_paid(qs, paid_on: Optional[datetime.date] = None, **kwargs) -> TransitionResult:
+    """Open invoices become PAID; an existing paid_at is kept, otherwise paid_on (default today)."""
+    paid_on = paid_on or timezone.localdate()
+    return transition(qs, S.PAID, Invoice.OPEN_STATUSES, paid_at=Coalesce(F("paid_at"), paid_on), **kwargs)
+
+
+def reconcile_paid(**kwargs) -> TransitionResult:
+    """Open invoices that already carry a paid_at (e.g. set via the admin) become PAID."""
+    return transition(Invoice.objects.filter(paid_at__isnull=False), S.PAID, Invoice.OPEN_STATUSES, **kwargs)
+
+
+def void(qs, **kwargs) -> TransitionResult:
+    """Anything not yet paid can be voided."""
+    return transition(qs, S.VOID, [S.DRAFT, *Invoice.OPEN_STATUSES], **kwargs)
@@ -0,0 +1,160 @@
+from __future__ import annotations
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Iterable, List, NamedTuple, Optional, Sequence
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import close_old_connections
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from ..models import Invoice
+from . import lifecycle, pdf_cache
+
+logger = logging.getLogger(__name__)
+
+
+class BulkSendResult(NamedTuple):
+    selected: int
+    sent: List[int]
+    failed: List[int]
+    skipped: List[int]  # no customer email
+
+
+def invoice_email_message(inv, pdf_bytes: bytes, connection=None) -> EmailMessage:
+    subject = f"Invoice {inv.number}"
+    body = render_to_string("invoices/email.txt", {"inv": inv})
+    email = EmailMessage(subject, body, to=[inv.user.email], connection=connection)
+    email.attach(filename=f"{inv.number}.pdf", content=pdf_bytes, mimetype="application/pdf")
+    return email
+
+
+def due_invoices(statuses: Sequence[str] = (Invoice.Status.DRAFT,), due_before: Optional[date] = None):
+    """Invoices in `statuses` due on/before `due_before` (any due date if None), oldest due first."""
+    qs = Invoice.objects.filter(status__in=statuses).select_related("user").prefetch_related("items")
+    if due_before is not None:
+        qs = qs.filter(due_at__lte=due_before)
+    return qs.order_by("due_at", "pk")
+
+
+# ---------- PDF rendering ----------
+
+def _render(inv):
+    from ..views import _render_invoice_pdf
+
+    return _render_invoice_pdf(None, inv)
+
+
+def _pdf_or_none(inv) -> Optional[bytes]:
+    try:
+        return pdf_cache.get_or_render(inv, lambda: _render(inv)).read()
+    except Exception:
+        logger.exception("Could not render the PDF of invoice %s", inv.number)
+        return None
+    finally:
+        close_old_connections()
+
+
+def render_pdfs(invoices: Iterable[Invoice], pool: ThreadPoolExecutor) -> dict:
+    """
+    {pk: pdf_bytes or None} for one batch of invoices, through the PDF cache
+    like the ZIP export: hits are read from storage, misses are rendered on
+    `pool` threads (browser pool / serialized WeasyPrint) and stored.
+    """
+    invoices = list(invoices)
+    return dict(zip((inv.pk for inv in invoices), pool.map(_pdf_or_none, invoices)))
+
+
+def _render_workers(workers: Optional[int]) -> int:
+    return max(1, workers or getattr(settings, "INVOICE_BULK_PDF_WORKERS", 4))
+
+
+# ---------- sending ----------
+
+def _record(sent: List[int], failed: List[int]) -> None:
+    """Delivery outcome of one batch; DRAFT -> SENT goes through the audited transition."""
+    now = timezone.now()
+    if sent:
+        Invoice.objects.filter(pk__in=sent).update(
+            email_status=Invoice.EmailStatus.SENT, emailed_at=now, email_error="",
+        )
+        lifecycle.transition(
+            Invoice.objects.filter(pk__in=sent), Invoice.Status.SENT, [Invoice.Status.DRAFT], source="bulk-send",
+        )
+    if failed:
+        Invoice.objects.filter(pk__in=failed).update(
+            email_status=Invoice.EmailStatus.FAILED, email_error="Bulk send failed; see logs.",
+        )
+
+
+def _send_batch(connection, batch: List[Invoice], pdfs: dict, sent: List[int], failed: List[int]) -> bool:
+    """
+    Send one message per invoice, appending each pk to sent or failed as it
+    goes. Returns False when the SMTP session could not be re-opened (the
+    rest of the batch is then failed without trying).
+    """
+    for n, inv in enumerate(batch):
+        if pdfs[inv.pk] is None:
+            failed.append(inv.pk)
+            continue
+        try:
+            connection.send_messages([invoice_email_message(inv, pdfs[inv.pk], connection)])
+        except Exception:
+            logger.exception("Emailing invoice %s failed", inv.number)
+            failed.append(inv.pk)
+        else:
+            sent.append(inv.pk)
+            continue
+        connection.close()
+        try:
+            connection.open()  # fresh session for the next message
+        except Exception:
+            logger.exception("SMTP reconnect failed; giving up on the remaining invoices")
+            failed.extend(other.pk for other in batch[n + 1:])
+            return False
+    return True
+
+
+def send_invoices(invoices: Iterable[Invoice], batch_size: Optional[int] = None,
+                  workers: Optional[int] = None) -> BulkSendResult:
+    """
+    Email each invoice (PDF attached) over one SMTP connection, `batch_size`
+    at a time. Only one batch of PDFs is held in memory, and each batch's
+    outcome is recorded per invoice before the next batch starts, so a
+    failure or a retry never re-sends an invoice that already went out.
+    """
+    invoices = list(invoices)
+    batch_size = batch_size or getattr(settings, "INVOICE_EMAIL_BATCH_SIZE", 50)
+    skipped = [inv.pk for inv in invoices if not inv.user.email]
+    to_send = [inv for inv in invoices if inv.user.email]
+
+    # Render as they'll be once sent, so the stored PDF stays valid after the update.
+    for inv in to_send:
+        if inv.status == Invoice.Status.DRAFT:
+            inv.status = Invoice.Status.SENT
+
+    sent, failed = [], []
+    connection = get_connection(fail_silently=False)
+    connection.open()
+    try:
+        with ThreadPoolExecutor(_render_workers(workers), thread_name_prefix="invoice-mail") as pool:
+            for i in range(0, len(to_send), batch_size):
+                batch = to_send[i:i + batch_size]
+                batch_sent, batch_failed = [], []
+                try:
+                    connected = _send_batch(connection, batch, render_pdfs(batch, pool), batch_sent, batch_failed)
+                finally:
+                    _record(batch_sent, batch_failed)  # even if the batch blew up halfway
+                    sent.extend(batch_sent)
+                    failed.extend(batch_failed)
+                if not connected:
+                    rest = [inv.pk for inv in to_send[i + batch_size:]]
+                    _record([], rest)
+                    failed.extend(rest)
+                    break
+    finally:
+        connection.close()
+    return BulkSendResult(len(invoices), sent, failed, skipped)
@@ -0,0 +1,120 @@
+from __future__ import annotations
+
+import datetime
+from typing import Callable, List, NamedTuple, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core import jobs
+from apps.core.models import Job
+from apps.orders.models import Order
+
+from ..models import Invoice, InvoiceItem, InvoiceSearch, OrderInvoice, reserve_invoice_numbers
+
+INVOICEABLE = (Order.Status.PENDING, Order.Status.PAID)
+DUE_DAYS = 14
+
+
+class OrderInvoicingResult(NamedTuple):
+    selected: int
+    invoices: List[int]  # pks of the created invoices (empty on a dry run)
+    skipped: int  # orders without a customer account
+
+
+def uninvoiced_orders(start: datetime.date, end: datetime.date):
+    """Pending/paid orders created in [start, end] that no invoice covers yet."""
+    return Order.objects.filter(
+        created_at__date__gte=start, created_at__date__lte=end,
+        status__in=INVOICEABLE, invoice_link__isnull=True,
+    ).order_by("created_at", "pk")
+
+
+def _invoice_chunk(orders: List[Order], now) -> List[int]:
+    numbers = reserve_invoice_numbers(len(orders), when=now)
+    invoices = []
+    for number, order in zip(numbers, orders):
+        issued = timezone.localtime(order.created_at).date()
+        paid = order.status == Order.Status.PAID
+        invoices.append(Invoice(
+            user=order.user, number=number, currency=order.currency, amount=order.amount,
+            status=Invoice.Status.PAID if paid else Invoice.Status.DRAFT,
+            issued_at=issued, due_at=issued + datetime.timedelta(days=DUE_DAYS),
+            paid_at=issued if paid else None,
+        ))
+
+    # bulk_create skips save() and signals: amount is the order's (one item,
+    # no tax) and the search rows are written here.
+    Invoice.objects.bulk_create(invoices, batch_size=1000)
+    InvoiceItem.objects.bulk_create(
+        [
+            InvoiceItem(
+                invoice_id=inv.pk, qty=1, unit_price=order.amount,
+                description=f"{order.get_category_display()} order #{order.pk}"
+                            + (f" ({order.customer_name})" if order.customer_name else ""),
+            )
+            for inv, order in zip(invoices, orders)
+        ],
+        batch_size=1000,
+    )
+    InvoiceSearch.objects.bulk_create(
+        [InvoiceSearch(invoice_id=inv.pk, document=InvoiceSearch.build(inv.number, inv.user)) for inv in invoices],
+        batch_size=1000,
+    )
+    # Order is the link's primary key: an order another run invoiced in the
+    # meantime fails this insert and rolls the whole chunk back.
+    OrderInvoice.objects.bulk_create(
+        [OrderInvoice(order_id=order.pk, invoice_id=inv.pk, created_at=now) for inv, order in zip(invoices, orders)],
+        batch_size=1000,
+    )
+    return [inv.pk for inv in invoices]
+
+
+def invoice_orders(start: datetime.date, end: datetime.date, chunk_size: int = 1000, dry_run: bool = False,
+                   progress: Optional[Callable[[int, int], None]] = None) -> OrderInvoicingResult:
+    """
+    Turn every uninvoiced order in the date range into an invoice with one
+    item, `chunk_size` orders per transaction (one block of invoice numbers
+    and one bulk insert per table). Orders placed without an account are
+    skipped. progress(done, total) is called after each chunk.
+    """
+    qs = uninvoiced_orders(start, end)
+    skipped = qs.filter(user__isnull=True).count()
+    pks = list(qs.filter(user__isnull=False).values_list("pk", flat=True))
+    if dry_run:
+        return OrderInvoicingResult(len(pks) + skipped, [], skipped)
+
+    now = timezone.now()
+    created = []
+    for i in range(0, len(pks), chunk_size):
+        with transaction.atomic():
+            chunk = list(
+                uninvoiced_orders(start, end).filter(pk__in=pks[i:i + chunk_size], user__isnull=False)
+                .select_related("user").select_for_update(of=("self",))
+            )
+            if chunk:
+                created.extend(_invoice_chunk(chunk, now))
+        if progress:
+            progress(min(i + chunk_size, len(pks)), len(pks))
+    return OrderInvoicingResult(len(pks) + skipped, created, skipped)
+
+
+def record_progress(done: int = 0, total: int = 0, **extra) -> None:
+    """Progress of the background run, stored on its Job row so the web processes see it."""
+    jobs.report_progress(done=done, total=total, **extra)
+
+
+_STATES = {
+    Job.Status.QUEUED: "queued", Job.Status.RUNNING: "running",
+    Job.Status.DONE: "done", Job.Status.FAILED: "failed",
+}
+
+
+def last_progress() -> Optional[dict]:
+    """Latest background run, shown on the staff dashboard (None if there never was one)."""
+    from ..tasks import ORDERS_TASK
+
+    job = Job.objects.filter(task=ORDERS_TASK).order_by("-created_at", "-pk").first()
+    if job is None:
+        return None
+    return {**job.payload, **job.progress, "state": _STATES.get(job.status, job.status)}
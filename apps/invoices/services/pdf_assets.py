@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import base64
+import hashlib
+import mimetypes
+import re
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+# Static files the invoice PDF uses; anything they reference via url() is inlined too.
+PDF_STYLESHEETS = ("css/invoice_pdf.css",)
+PDF_IMAGES = {"logo": "images/company-logo.png"}
+
+_URL_RE = re.compile(r"""url\(\s*(['"]?)(?!data:|https?:|//)([^'")]+)\1\s*\)""")
+
+mimetypes.add_type("font/woff2", ".woff2")
+mimetypes.add_type("font/woff", ".woff")
+mimetypes.add_type("font/ttf", ".ttf")
+mimetypes.add_type("image/svg+xml", ".svg")
+
+
+class PdfAssets(NamedTuple):
+    css: str                 # concatenated stylesheets, url()s rewritten to data URIs
+    images: Dict[str, str]   # name -> data URI
+    base_url: str            # file:// base for anything still relative
+    digest: str              # changes whenever any inlined asset changes
+
+
+def _static_path(path: str) -> Optional[Path]:
+    """Collected copy in STATIC_ROOT first, then the app/project static dirs."""
+    root = getattr(settings, "STATIC_ROOT", None)
+    if root:
+        candidate = Path(root) / path
+        if candidate.is_file():
+            return candidate
+    found = finders.find(path)
+    return Path(found) if found else None
+
+
+def _data_uri(path: Path) -> str:
+    mime = mimetypes.guess_type(path.name)[0] or "application/octet-stream"
+    return f"data:{mime};base64,{base64.b64encode(path.read_bytes()).decode('ascii')}"
+
+
+def _inline_css(path: Path, static_name: str) -> str:
+    css = path.read_text(encoding="utf-8")
+    base = static_name.rsplit("/", 1)[0]
+
+    def repl(m):
+        ref = m.group(2).split("?", 1)[0].split("#", 1)[0]
+        target = _static_path(str(Path(base, ref)).replace("\\", "/")) if not ref.startswith("/") else None
+        if target is None and ref.startswith(settings.STATIC_URL):
+            target = _static_path(ref[len(settings.STATIC_URL):])
+        return f'url("{_data_uri(target)}")' if target else m.group(0)
+
+    return _URL_RE.sub(repl, css)
+
+
+def _build() -> PdfAssets:
+    h = hashlib.sha256()
+    css_parts = []
+    for name in PDF_STYLESHEETS:
+        path = _static_path(name)
+        if path:
+            css = _inline_css(path, name)
+            css_parts.append(css)
+            h.update(css.encode())
+
+    images = {}
+    for key, name in PDF_IMAGES.items():
+        path = _static_path(name)
+        if path:
+            images[key] = _data_uri(path)
+            h.update(images[key].encode())
+
+    root = getattr(settings, "STATIC_ROOT", None) or settings.BASE_DIR
+    return PdfAssets("\n".join(css_parts), images, Path(root).resolve().as_uri() + "/", h.hexdigest()[:12])
+
+
+@lru_cache(maxsize=1)
+def bundle() -> PdfAssets:
+    """
+    Prepared once per process; PDF renders then need no network at all.
+    Call bundle.cache_clear() after collectstatic in a long-lived process.
+    """
+    return _build()
@@ -0,0 +1,223 @@
+from __future__ import annotations
+
+import hashlib
+import json
+import re
+import time
+from functools import lru_cache
+from typing import Callable, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.http import FileResponse, HttpResponse
+from django.template.loader import get_template
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+from . import pdf_assets
+
+# Fallback output is cheap to rebuild and shouldn't outlive a broken HTML engine.
+CACHEABLE_ENGINES = {"playwright", "weasyprint"}
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class CachedPdf(NamedTuple):
+    name: str                  # storage path
+    etag: str                  # content hash of the invoice (also the file name)
+    engine: str                # engine that produced it, or "cache"
+    content: Optional[bytes]   # set when freshly rendered; None when served from storage
+    stored: bool
+    render_ms: Optional[float] = None  # wall time of the render on a miss
+
+    def read(self) -> bytes:
+        if self.content is not None:
+            return self.content
+        with default_storage.open(self.name, "rb") as fh:
+            return fh.read()
+
+
+@lru_cache(maxsize=1)
+def template_version() -> str:
+    """INVOICE_PDF_TEMPLATE_VERSION plus digests of the PDF template and its inlined assets (once per process)."""
+    h = hashlib.sha256(str(getattr(settings, "INVOICE_PDF_TEMPLATE_VERSION", "1")).encode())
+    h.update(pdf_assets.bundle().digest.encode())
+    try:
+        origin = get_template("invoices/pdf.html").origin
+        with open(origin.name, "rb") as fh:
+            h.update(fh.read())
+    except Exception:
+        pass
+    return h.hexdigest()[:12]
+
+
+def invoice_fingerprint(inv) -> str:
+    """
+    Hash of everything that ends up on the PDF. Any edit (invoice, customer
+    name, items) or template change yields a new hash, so stale files are
+    never looked up again; storing the new version deletes them (prune()).
+    """
+    user = inv.user
+    payload = {
+        "v": template_version(),
+        "inv": [
+            inv.pk, inv.number, inv.status, inv.currency, str(inv.tax_rate),
+            str(inv.issued_at), str(inv.due_at), str(inv.paid_at), inv.notes, str(inv.amount),
+        ],
+        "user": [user.username, user.get_full_name(), user.email],
+        "items": [
+            [it.pk, it.description, str(it.qty), str(it.unit_price)]
+            for it in sorted(inv.items.all(), key=lambda it: it.pk)
+        ],
+    }
+    raw = json.dumps(payload, sort_keys=True, default=str)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+def _storage_name(inv, digest: str) -> str:
+    return f"invoices/pdf/{inv.pk}/{digest}.pdf"  # one folder per invoice, see prune()
+
+
+def lookup(inv) -> Optional[CachedPdf]:
+    digest = invoice_fingerprint(inv)
+    name = _storage_name(inv, digest)
+    if default_storage.exists(name):
+        return CachedPdf(name, digest, "cache", None, True)
+    return None
+
+
+def get_or_render(inv, render: Callable[[], Tuple[bytes, str]]) -> CachedPdf:
+    """
+    Cached PDF for inv. `render` is only called on a miss and returns
+    (pdf_bytes, engine_name); HTML-engine output is written to storage.
+    """
+    hit = lookup(inv)
+    if hit is not None:
+        return hit
+
+    digest = invoice_fingerprint(inv)
+    name = _storage_name(inv, digest)
+    t0 = time.perf_counter()
+    pdf_bytes, engine = render()
+    render_ms = (time.perf_counter() - t0) * 1000
+    stored = False
+    if engine in CACHEABLE_ENGINES:
+        name = default_storage.save(name, ContentFile(pdf_bytes))
+        stored = True
+        prune(inv, keep=name)
+    return CachedPdf(name, digest, engine, pdf_bytes, stored, render_ms)
+
+
+def prune(inv, keep: str = "") -> int:
+    """
+    Delete stored PDFs of inv other than `keep` (earlier revisions, which
+    are never looked up again). Returns the number of files removed.
+    """
+    folder = f"invoices/pdf/{inv.pk}"
+    try:
+        _, files = default_storage.listdir(folder)
+    except (FileNotFoundError, NotImplementedError):
+        return 0
+    removed = 0
+    for filename in files:
+        path = f"{folder}/{filename}"
+        if path != keep:
+            default_storage.delete(path)
+            removed += 1
+    return removed
+
+
+def _last_modified(name: str):
+    try:
+        return default_storage.get_modified_time(name)
+    except Exception:  # e.g. remote storages that don't expose mtimes
+        return None
+
+
+def serve(request, inv, render: Callable[[], Tuple[bytes, str]], filename: str) -> HttpResponse:
+    """
+    Full cached-PDF response for inv. A client already holding the current
+    version gets a 304 before anything is read from storage or rendered.
+    """
+    digest = invoice_fingerprint(inv)
+    not_modified = get_conditional_response(request, etag=f'"{digest}"')
+    if not_modified is not None:
+        return not_modified
+    return pdf_response(request, get_or_render(inv, render), filename)
+
+
+def pdf_response(request, cached: CachedPdf, filename: str) -> HttpResponse:
+    """
+    Serve a PDF with a strong ETag (the content hash) and Last-Modified.
+    Honours If-None-Match / If-Modified-Since (304) and a single
+    `Range: bytes=a-b` request (206); stored PDFs are streamed from storage.
+    """
+    # Uncached fallback output gets its own validator so a later HTML-engine
+    # render of the same invoice isn't answered with a 304.
+    etag = f'"{cached.etag}"' if cached.stored else f'"{cached.etag}-{cached.engine}"'
+    mtime = _last_modified(cached.name) if cached.stored else None
+    last_modified = int(mtime.timestamp()) if mtime else None
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+    if not_modified is not None:
+        return not_modified
+
+    size = default_storage.size(cached.name) if cached.content is None else len(cached.content)
+    rng = _parse_range(request.headers.get("Range", ""), size)
+    if rng is not None and request.headers.get("If-Range", etag) != etag:
+        rng = None  # validator mismatch: send the whole (new) document
+
+    if rng is False:
+        resp = HttpResponse(status=416)
+        resp["Content-Range"] = f"bytes */{size}"
+        return resp
+    if rng is not None:
+        start, end = rng
+        if cached.content is not None:
+            chunk = cached.content[start:end + 1]
+        else:
+            with default_storage.open(cached.name, "rb") as fh:
+                fh.seek(start)
+                chunk = fh.read(end - start + 1)
+        resp = HttpResponse(chunk, content_type="application/pdf", status=206)
+        resp["Content-Range"] = f"bytes {start}-{end}/{size}"
+    elif cached.content is None:
+        resp = FileResponse(default_storage.open(cached.name, "rb"), content_type="application/pdf")
+        resp["Content-Length"] = str(size)
+    else:
+        resp = HttpResponse(cached.content, content_type="application/pdf")
+
+    resp["Content-Disposition"] = f'inline; filename="{filename}"'
+    resp["Accept-Ranges"] = "bytes"
+    resp["ETag"] = etag
+    if last_modified:
+        resp["Last-Modified"] = http_date(last_modified)
+    resp["Cache-Control"] = "private, no-cache"  # always revalidate; 304s are cheap
+    resp["X-PDF-Generator"] = cached.engine
+    if cached.render_ms is not None:
+        resp["X-PDF-Render-Time"] = f"{cached.render_ms:.1f}ms"
+        resp["Server-Timing"] = f'pdf;desc="{cached.engine}";dur={cached.render_ms:.1f}'
+    else:
+        resp["Server-Timing"] = 'pdf;desc="cache"'
+    return resp
+
+
+def _parse_range(header: str, size: int):
+    """(start, end) for a satisfiable single range, False if unsatisfiable, None if absent/unsupported."""
+    m = _RANGE_RE.match(header.strip())
+    if not m:
+        return None
+    first, last = m.groups()
+    if not first and not last:
+        return None
+    if not first:  # suffix: last N bytes
+        length = int(last)
+        if length == 0:
+            return False
+        return max(0, size - length), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
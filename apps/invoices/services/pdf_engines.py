@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+import importlib
+import logging
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, NamedTuple, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ENGINES = ("playwright", "weasyprint", "reportlab")
+METRICS_KEY = "invoices:pdf:metrics:{engine}:{field}"
+METRIC_FIELDS = ("renders", "failures", "ms")
+
+
+class RenderResult(NamedTuple):
+    content: bytes
+    engine: str
+    ms: float
+
+
+# ---------- capability probes (once per process) ----------
+
+def _probe_playwright() -> bool:
+    """Importable *and* a Chromium build is installed; launching is left to the pool."""
+    from playwright.sync_api import sync_playwright
+
+    with sync_playwright() as p:
+        return Path(p.chromium.executable_path).exists()
+
+
+def _probe_weasyprint() -> bool:
+    importlib.import_module("weasyprint")  # loads pango/cairo; OSError when missing
+    return True
+
+
+def _probe_reportlab() -> bool:
+    importlib.import_module("reportlab.platypus")
+    return True
+
+
+PROBES: Dict[str, Callable[[], bool]] = {
+    "playwright": _probe_playwright,
+    "weasyprint": _probe_weasyprint,
+    "reportlab": _probe_reportlab,
+}
+
+_available: Optional[Dict[str, bool]] = None
+_probe_lock = threading.Lock()
+
+
+def probe(force: bool = False) -> Dict[str, bool]:
+    """
+    {engine: usable} for every configured engine. Run at worker boot (wsgi)
+    or lazily on the first PDF; the result is kept for the process lifetime.
+    """
+    global _available
+    with _probe_lock:
+        if _available is None or force:
+            found = {}
+            for name in configured():
+                check = PROBES.get(name)
+                try:
+                    found[name] = bool(check and check())
+                except Exception as exc:
+                    reason = (str(exc).splitlines() or [type(exc).__name__])[0]
+                    logger.info("PDF engine %s unavailable: %s", name, reason)
+                    found[name] = False
+            _available = found
+            logger.info("PDF engines available: %s", ", ".join(n for n, ok in found.items() if ok) or "none")
+        return dict(_available)
+
+
+def configured() -> tuple:
+    """Engine order from INVOICE_PDF_ENGINES (unknown names are ignored)."""
+    names = getattr(settings, "INVOICE_PDF_ENGINES", DEFAULT_ENGINES)
+    if isinstance(names, str):
+        names = names.split(",")
+    return tuple(n.strip() for n in names if n.strip() in PROBES)
+
+
+# ---------- failure cooldown ----------
+
+_failures: Dict[str, int] = {}
+_disabled_until: Dict[str, float] = {}
+_state_lock = threading.Lock()
+
+
+def _enabled(name: str) -> bool:
+    with _state_lock:
+        until = _disabled_until.get(name)
+        if until is None:
+            return True
+        if time.monotonic() >= until:
+            # Cooldown over: allow one trial render; a failure re-disables immediately.
+            del _disabled_until[name]
+            _failures[name] = getattr(settings, "INVOICE_PDF_ENGINE_MAX_FAILURES", 3) - 1
+            return True
+        return False
+
+
+def _record_success(name: str, ms: float) -> None:
+    with _state_lock:
+        _failures[name] = 0
+    _bump(name, "renders", 1)
+    _bump(name, "ms", int(ms))
+
+
+def _record_failure(name: str) -> None:
+    max_failures = getattr(settings, "INVOICE_PDF_ENGINE_MAX_FAILURES", 3)
+    cooldown = getattr(settings, "INVOICE_PDF_ENGINE_COOLDOWN", 300)
+    with _state_lock:
+        _failures[name] = _failures.get(name, 0) + 1
+        if _failures[name] >= max_failures:
+            _disabled_until[name] = time.monotonic() + cooldown
+            logger.warning("PDF engine %s disabled for %ss after %d failures", name, cooldown, _failures[name])
+    _bump(name, "failures", 1)
+
+
+# ---------- metrics (in the default cache) ----------
+#
+# Counters live in the default cache, so they are only as shared as the
+# cache is: with the default LocMemCache each web worker and run_worker
+# process counts its own renders. metrics_scope() tells the two apart.
+
+def _bump(engine: str, field: str, delta: int) -> None:
+    key = METRICS_KEY.format(engine=engine, field=field)
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.add(key, 0, timeout=None)
+        cache.incr(key, delta)
+
+
+def metrics_scope() -> str:
+    """Whether the counters are per "process" (local-memory cache) or "shared" by every worker."""
+    from django.core.cache import caches
+    from django.core.cache.backends.locmem import LocMemCache
+
+    return "process" if isinstance(caches["default"], LocMemCache) else "shared"
+
+
+def metrics() -> Dict[str, dict]:
+    """Render counters per engine (renders, failures, total and average ms); see metrics_scope()."""
+    keys = [METRICS_KEY.format(engine=e, field=f) for e in PROBES for f in METRIC_FIELDS]
+    raw = cache.get_many(keys)
+    out = {}
+    for engine in PROBES:
+        row = {f: raw.get(METRICS_KEY.format(engine=engine, field=f), 0) for f in METRIC_FIELDS}
+        row["avg_ms"] = round(row["ms"] / row["renders"], 1) if row["renders"] else None
+        out[engine] = row
+    return out
+
+
+def status() -> Dict[str, dict]:
+    """Per-process view: probe result, cooldown and consecutive failures."""
+    available = probe()
+    now = time.monotonic()
+    with _state_lock:
+        return {
+            name: {
+                "available": available.get(name, False),
+                "disabled_for": max(0, round(_disabled_until[name] - now)) if name in _disabled_until else 0,
+                "consecutive_failures": _failures.get(name, 0),
+            }
+            for name in configured()
+        }
+
+
+# ---------- chain ----------
+
+def render(renderers: Dict[str, Callable[..., bytes]], *args) -> RenderResult:
+    """
+    First successful engine in the configured order. Engines that failed the
+    probe are never attempted; ones that keep failing sit out a cooldown.
+    `renderers` maps engine name -> callable(*args) returning PDF bytes.
+    """
+    available = probe()
+    errors = []
+    for name in configured():
+        fn = renderers.get(name)
+        if fn is None or not available.get(name) or not _enabled(name):
+            continue
+        t0 = time.perf_counter()
+        try:
+            content = fn(*args)
+            if not content:
+                raise RuntimeError("empty PDF")
+        except Exception as exc:
+            logger.warning("PDF engine %s failed", name, exc_info=True)
+            _record_failure(name)
+            errors.append(f"{name}: {exc}")
+            continue
+        ms = (time.perf_counter() - t0) * 1000
+        _record_success(name, ms)
+        return RenderResult(content, name, ms)
+    raise RuntimeError("No PDF engine could render the document (" + "; ".join(errors or ["none available"]) + ")")
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+import logging
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, Tuple
+
+from django.conf import settings
+from django.db import close_old_connections
+
+from . import pdf_cache
+
+logger = logging.getLogger(__name__)
+
+
+class _Sink:
+    """Write-only, non-seekable file for ZipFile; pop() hands over what was written so far."""
+
+    def __init__(self):
+        self._chunks = []
+        self._offset = 0
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._offset += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._offset
+
+    def flush(self):
+        pass
+
+    def pop(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+def _entry_name(inv) -> str:
+    # Numbers are unique once assigned; a blank one must not collide with another.
+    return inv.number or f"invoice-{inv.pk}"
+
+
+def _pdf_for(inv, render: Callable[[object], Tuple[bytes, str]]) -> Tuple[str, bytes]:
+    try:
+        data = pdf_cache.get_or_render(inv, lambda: render(inv)).read()
+    finally:
+        close_old_connections()
+    return f"{_entry_name(inv)}.pdf", data
+
+
+def stream_zip(invoices: Iterable, render: Callable[[object], Tuple[bytes, str]],
+               workers: int | None = None) -> Iterator[bytes]:
+    """
+    Yield a ZIP of invoice PDFs chunk by chunk. PDFs come from the PDF cache
+    or are rendered by a thread pool; each is written to the archive as soon
+    as it's ready. At most 2 x workers PDFs are held in memory at a time, so
+    memory stays flat however many invoices there are. An invoice that
+    fails to render becomes a <number>.error.txt entry, so the archive is
+    always complete. `invoices` should carry select_related("user") /
+    prefetch_related("items").
+    """
+    workers = max(1, workers or getattr(settings, "INVOICE_EXPORT_WORKERS", 4))
+    sink = _Sink()
+    source = iter(invoices)
+    # PDFs are already compressed; storing them keeps CPU for rendering.
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_STORED) as zf, \
+            ThreadPoolExecutor(workers, thread_name_prefix="invoice-export") as pool:
+        pending = {}  # future -> invoice
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < workers * 2:
+                inv = next(source, None)
+                if inv is None:
+                    exhausted = True
+                else:
+                    pending[pool.submit(_pdf_for, inv, render)] = inv
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for fut in done:
+                inv = pending.pop(fut)
+                try:
+                    name, data = fut.result()
+                except Exception as exc:
+                    # The response is already streaming: record the failure in the archive instead.
+                    logger.exception("Could not render the PDF of invoice %s for the export", _entry_name(inv))
+                    name, data = f"{_entry_name(inv)}.error.txt", f"Rendering failed: {exc}\n".encode()
+                zf.writestr(name, data)
+                yield sink.pop()
+    yield sink.pop()  # central directory
@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import calendar
+import datetime
+from collections import defaultdict
+from typing import List, NamedTuple, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from ..models import (
+    ZERO, Invoice, InvoiceItem, InvoiceSearch, InvoiceTotals, RecurringInvoice, reserve_invoice_numbers,
+)
+
+C = RecurringInvoice.Cadence
+_MONTHS = {C.MONTHLY: 1, C.QUARTERLY: 3, C.YEARLY: 12}
+MAX_CATCH_UP = 24  # periods per template per run, so a long-dormant template can't flood a run
+
+
+class GenerateResult(NamedTuple):
+    templates: int
+    invoices: List[int]  # pks of the created invoices (empty on a dry run)
+    planned: int
+
+
+def _add_months(d: datetime.date, months: int, anchor_day: int) -> datetime.date:
+    month0 = d.month - 1 + months
+    year, month = d.year + month0 // 12, month0 % 12 + 1
+    return datetime.date(year, month, min(anchor_day, calendar.monthrange(year, month)[1]))
+
+
+def advance(rec: RecurringInvoice, run: datetime.date) -> datetime.date:
+    """The run date after `run`; monthly cadences stay on the start date's day, clamped to short months."""
+    if rec.cadence == C.WEEKLY:
+        return run + datetime.timedelta(weeks=1)
+    return _add_months(run, _MONTHS[rec.cadence], rec.start_date.day)
+
+
+def run_dates(rec: RecurringInvoice, as_of: datetime.date) -> List[datetime.date]:
+    """Every run date from next_run up to as_of (missed periods are caught up)."""
+    dates, run = [], rec.next_run
+    while run <= as_of and len(dates) < MAX_CATCH_UP:
+        dates.append(run)
+        run = advance(rec, run)
+    return dates
+
+
+def due_templates(as_of: datetime.date):
+    return (
+        RecurringInvoice.objects.filter(active=True, next_run__lte=as_of)
+        .select_related("user")
+        .prefetch_related("items")
+        .order_by("next_run", "pk")
+    )
+
+
+def _generate_chunk(templates: List[RecurringInvoice], as_of: datetime.date, now) -> List[int]:
+    dates = {rec.pk: run_dates(rec, as_of) for rec in templates}
+    plan = [(rec, run) for rec in templates for run in dates[rec.pk]]
+    if not plan:
+        return []
+
+    numbers = reserve_invoice_numbers(len(plan), when=now)
+    invoices, lines = [], []
+    for number, (rec, run) in zip(numbers, plan):
+        items = list(rec.items.all())
+        subtotal = sum((it.qty * it.unit_price for it in items), ZERO)
+        invoices.append(Invoice(
+            user=rec.user, recurring=rec, number=number, status=Invoice.Status.DRAFT,
+            currency=rec.currency, tax_rate=rec.tax_rate, notes=rec.notes,
+            issued_at=run, due_at=run + datetime.timedelta(days=rec.due_days),
+            amount=InvoiceTotals.from_subtotal(subtotal, rec.tax_rate).total,
+        ))
+        lines.append(items)
+
+    # bulk_create skips save() and signals: amount is set above, and the
+    # search rows the post_save receiver would write are created here.
+    Invoice.objects.bulk_create(invoices, batch_size=1000)
+    InvoiceItem.objects.bulk_create(
+        [
+            InvoiceItem(invoice_id=inv.pk, description=it.description, qty=it.qty, unit_price=it.unit_price)
+            for inv, items in zip(invoices, lines)
+            for it in items
+        ],
+        batch_size=1000,
+    )
+    InvoiceSearch.objects.bulk_create(
+        [InvoiceSearch(invoice_id=inv.pk, document=InvoiceSearch.build(inv.number, inv.user)) for inv in invoices],
+        batch_size=1000,
+    )
+
+    # Templates share a handful of next run dates: one UPDATE per date beats
+    # bulk_update's per-row CASE.
+    by_next_run = defaultdict(list)
+    for rec in templates:
+        # Resume after the last generated period (capped catch-ups finish on later runs).
+        by_next_run[advance(rec, dates[rec.pk][-1])].append(rec.pk)
+    for run, pks in by_next_run.items():
+        RecurringInvoice.objects.filter(pk__in=pks).update(next_run=run, last_run_at=now)
+    return [inv.pk for inv in invoices]
+
+
+def generate_due(as_of: Optional[datetime.date] = None, batch_size: int = 2000,
+                 dry_run: bool = False) -> GenerateResult:
+    """
+    Create the invoices for every active template whose next_run is on or
+    before as_of (default today). Each chunk of `batch_size` templates is one
+    transaction: one block of invoice numbers, bulk inserts for invoices,
+    items and search rows, and one UPDATE per new next_run date. Cached
+    amounts are computed in Python, so no per-row save() or recalc runs.
+    """
+    as_of = as_of or timezone.localdate()
+    qs = due_templates(as_of)
+    if dry_run:
+        templates = list(qs)
+        return GenerateResult(len(templates), [], sum(len(run_dates(r, as_of)) for r in templates))
+
+    now = timezone.now()
+    created, seen = [], 0
+    pks = list(qs.values_list("pk", flat=True))
+    for i in range(0, len(pks), batch_size):
+        with transaction.atomic():
+            # Re-check under lock: a concurrent run may have advanced some of them.
+            chunk = list(
+                due_templates(as_of).filter(pk__in=pks[i:i + batch_size]).select_for_update(of=("self",))
+            )
+            seen += len(chunk)
+            created.extend(_generate_chunk(chunk, as_of, now))
+    return GenerateResult(seen, created, len(created))
@@ -0,0 +1,63 @@
+from __future__ import annotations
+
+import logging
+import threading
+from typing import Optional
+
+from . import pdf_assets
+
+logger = logging.getLogger(__name__)
+
+
+class WeasyRenderer:
+    """
+    WeasyPrint with the expensive setup done once per process: the
+    FontConfiguration, the compiled stylesheets from the PDF asset bundle and
+    WeasyPrint's image cache are reused across renders. Renders are
+    serialized because FontConfiguration is not documented as thread-safe.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._font_config = None
+        self._stylesheets: Optional[list] = None
+        self._image_cache: dict = {}
+
+    def _prepare(self):
+        if self._stylesheets is not None:
+            return
+        from weasyprint import CSS
+        from weasyprint.text.fonts import FontConfiguration
+
+        font_config = FontConfiguration()
+        assets = pdf_assets.bundle()
+        sheets = []
+        if assets.css:
+            sheets.append(CSS(string=assets.css, base_url=assets.base_url, font_config=font_config))
+        self._font_config, self._stylesheets = font_config, sheets
+
+    def render(self, html: str) -> bytes:
+        from weasyprint import HTML
+
+        with self._lock:
+            self._prepare()
+            return HTML(string=html, base_url=pdf_assets.bundle().base_url).write_pdf(
+                stylesheets=self._stylesheets,
+                font_config=self._font_config,
+                cache=self._image_cache,
+            )
+
+    def warm(self) -> None:
+        """Build fonts/stylesheets and lay out a trivial page ahead of the first invoice."""
+        self.render("<html><body><p>warm-up</p></body></html>")
+
+
+renderer = WeasyRenderer()
+
+
+def prewarm() -> None:
+    """Called at worker boot (INVOICE_PDF_PREWARM); failures only cost the lazy path later."""
+    try:
+        renderer.warm()
+    except Exception:
+        logger.info("WeasyPrint pre-warm skipped", exc_info=True)
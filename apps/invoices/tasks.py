@@ -0,0 +1,102 @@
+# apps/invoices/tasks.py
+"""Background jobs for invoices (run by `manage.py run_worker`)."""
+from django.utils import timezone
+
+from apps.core import jobs
+
+from .models import Invoice
+from .services import pdf_cache
+
+EMAIL_TASK = "invoices.email"
+PDF_TASK = "invoices.render_pdf"
+BULK_TASK = "invoices.send_bulk"
+ORDERS_TASK = "invoices.from_orders"
+
+
+def _load(invoice_id):
+    return Invoice.objects.select_related("user").prefetch_related("items").get(pk=invoice_id)
+
+
+@jobs.task(PDF_TASK)
+def render_pdf(invoice_id):
+    from .views import _render_invoice_pdf
+
+    inv = _load(invoice_id)
+    pdf_cache.get_or_render(inv, lambda: _render_invoice_pdf(None, inv))
+
+
+@jobs.task(EMAIL_TASK)
+def email_invoice(invoice_id):
+    from .views import _email_invoice_to_customer
+
+    inv = _load(invoice_id)
+    if not _email_invoice_to_customer(None, inv):
+        Invoice.objects.filter(pk=invoice_id).update(
+            email_status=Invoice.EmailStatus.FAILED, email_error="Customer has no email address.",
+        )
+        return
+    Invoice.objects.filter(pk=invoice_id).update(
+        email_status=Invoice.EmailStatus.SENT, emailed_at=timezone.now(), email_error="",
+    )
+
+
+@jobs.on_failure(EMAIL_TASK)
+def email_failed(invoice_id):
+    Invoice.objects.filter(pk=invoice_id).update(
+        email_status=Invoice.EmailStatus.FAILED, email_error="Delivery failed after retries.",
+    )
+
+
+@jobs.task(BULK_TASK)
+def send_bulk(invoice_ids):
+    from .services.mailing import send_invoices
+
+    qs = Invoice.objects.filter(pk__in=invoice_ids).select_related("user").prefetch_related("items")
+    send_invoices(qs)
+
+
+@jobs.on_failure(BULK_TASK)
+def send_bulk_failed(invoice_ids):
+    # Delivered invoices were recorded batch by batch; whatever is still queued never went out.
+    Invoice.objects.filter(pk__in=invoice_ids, email_status=Invoice.EmailStatus.QUEUED).update(
+        email_status=Invoice.EmailStatus.FAILED, email_error="Bulk send stopped before this invoice.",
+    )
+
+
+@jobs.task(ORDERS_TASK)
+def invoice_orders(start, end):
+    from datetime import date
+
+    from .services import order_invoicing as oi
+
+    result = oi.invoice_orders(date.fromisoformat(start), date.fromisoformat(end), progress=oi.record_progress)
+    oi.record_progress(len(result.invoices), result.selected - result.skipped, skipped=result.skipped)
+
+
+def queue_pdf(inv):
+    """Render (and store) the PDF off-request so the first download is a cache hit."""
+    return jobs.enqueue(PDF_TASK, invoice_id=inv.pk, key=f"invoice-pdf:{inv.pk}")
+
+
+def queue_email(inv):
+    """Queue the customer email (PDF attached) and mark the invoice as queued."""
+    Invoice.objects.filter(pk=inv.pk).update(email_status=Invoice.EmailStatus.QUEUED, email_error="")
+    inv.email_status, inv.email_error = Invoice.EmailStatus.QUEUED, ""
+    return jobs.enqueue(EMAIL_TASK, invoice_id=inv.pk, key=f"invoice-email:{inv.pk}")
+
+
+def queue_bulk_send(invoice_ids):
+    """One job for the whole selection: one SMTP session, outcomes recorded per batch."""
+    ids = sorted(invoice_ids)
+    Invoice.objects.filter(pk__in=ids).exclude(user__email="").update(
+        email_status=Invoice.EmailStatus.QUEUED, email_error="",
+    )
+    return jobs.enqueue(BULK_TASK, invoice_ids=ids, max_attempts=1)
+
+
+def queue_order_invoicing(start, end):
+    """Invoice a date range of orders in the background; progress via order_invoicing.last_progress()."""
+    return jobs.enqueue(
+        ORDERS_TASK, start=start.isoformat(), end=end.isoformat(),
+        key=f"invoice-orders:{start}:{end}",  # idempotent, so retries are safe
+    )
@@ -1,3 +1,873 @@
-from django.test import TestCase
+import asyncio
+import datetime
+import io
+import shutil
+import tempfile
+import threading
+import time
+import zipfile
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.cache import cache
+from django.core.mail.backends.locmem import EmailBackend as LocmemBackend
+from django.db import connection, connections, transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.core import jobs
+from apps.orders.models import Order
+
+from . import models as invoice_models, tasks, views as invoice_views
+from .models import (
+    Invoice, InvoiceItem, InvoiceSearch, InvoiceSequence, InvoiceStatusChange, InvoiceTotals, OrderInvoice,
+    RecurringInvoice, RecurringInvoiceItem, deferred_amounts, reserve_invoice_numbers,
+)
+from .services import (
+    aging, browser_pool, lifecycle, mailing, order_invoicing, pdf_cache, pdf_engines, pdf_export, recurring, search, statement,
+)
+
+User = get_user_model()
+
+
+class InvoiceSequenceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("seq", "seq@example.com", "x")
+
+    def test_numbers_are_consecutive_per_month(self):
+        a = Invoice.objects.create(user=self.user)
+        b = Invoice.objects.create(user=self.user)
+        self.assertEqual(int(b.number.split("-")[-1]), int(a.number.split("-")[-1]) + 1)
+
+    def test_reserve_block(self):
+        first = reserve_invoice_numbers(1)[0]
+        block = reserve_invoice_numbers(5)
+        self.assertEqual(len(block), 5)
+        seqs = [int(n.split("-")[-1]) for n in [first, *block]]
+        self.assertEqual(seqs, list(range(seqs[0], seqs[0] + 6)))
+
+    def test_seeds_from_existing_numbers(self):
+        Invoice.objects.create(user=self.user, number="INV-209901-0041")
+        self.assertEqual(InvoiceSequence.reserve("209901"), range(42, 43))
+
+
+class InvoiceSequenceConcurrencyTests(TransactionTestCase):
+    """Creates invoices from many threads; every number must be unique and gapless."""
+
+    threads = 8
+    per_thread = 10
+
+    def setUp(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("shared-cache in-memory SQLite fails concurrent writers instead of queueing them")
+
+    def test_concurrent_creates_get_unique_numbers(self):
+        user = User.objects.create_user("conc", "conc@example.com", "x")
+        barrier = threading.Barrier(self.threads)
+        errors = []
+
+        def worker():
+            try:
+                barrier.wait()
+                for _ in range(self.per_thread):
+                    Invoice.objects.create(user=user)
+            except Exception as exc:  # pragma: no cover - reported below
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        pool = [threading.Thread(target=worker) for _ in range(self.threads)]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+
+        self.assertEqual(errors, [])
+        numbers = list(Invoice.objects.values_list("number", flat=True))
+        self.assertEqual(len(numbers), self.threads * self.per_thread)
+        self.assertEqual(len(set(numbers)), len(numbers))
+        seqs = sorted(int(n.split("-")[-1]) for n in numbers)
+        self.assertEqual(seqs, list(range(1, len(numbers) + 1)))
+
+
+class InvoiceTotalsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("tot", "tot@example.com", "x")
+
+    def _invoice(self, tax_rate, lines):
+        inv = Invoice.objects.create(user=self.user, tax_rate=Decimal(tax_rate))
+        InvoiceItem.objects.bulk_create(
+            [InvoiceItem(invoice=inv, description="x", qty=Decimal(q), unit_price=Decimal(p)) for q, p in lines]
+        )
+        return inv
+
+    def test_from_subtotal_rounds_half_up(self):
+        self.assertEqual(
+            InvoiceTotals.from_subtotal(Decimal("10.05"), Decimal("5")),
+            (Decimal("10.05"), Decimal("0.50"), Decimal("10.55")),
+        )
+        self.assertEqual(InvoiceTotals.from_subtotal(None, None).total, Decimal("0.00"))
+
+    def test_with_totals_matches_compute_totals(self):
+        invoices = [
+            self._invoice("20.00", [("3", "3.35"), ("1.5", "2.10")]),
+            self._invoice("7.50", [("1", "0.05")]),
+            self._invoice("10.00", []),
+        ]
+        annotated = {inv.pk: inv for inv in Invoice.objects.with_totals()}
+        for inv in invoices:
+            fresh = Invoice.objects.get(pk=inv.pk).compute_totals(fresh=True)
+            with self.assertNumQueries(0):
+                self.assertEqual(annotated[inv.pk].compute_totals(), fresh)
+        self.assertEqual(annotated[invoices[0].pk].total, Decimal("15.84"))
+        self.assertEqual(annotated[invoices[2].pk].total, Decimal("0.00"))
+
+    def test_compute_totals_is_one_query_and_memoized(self):
+        inv = Invoice.objects.get(pk=self._invoice("0", [("2", "5.00")]).pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(inv.subtotal, Decimal("10.00"))
+            self.assertEqual(inv.total, Decimal("10.00"))
+        prefetched = Invoice.objects.prefetch_related("items").get(pk=inv.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(prefetched.total, Decimal("10.00"))
+
+
+class AmountRecalcTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("recalc", "recalc@example.com", "x")
+        self.inv = Invoice.objects.create(user=self.user)
+
+    def amount(self):
+        return Invoice.objects.values_list("amount", flat=True).get(pk=self.inv.pk)
+
+    def recalcs(self):
+        return mock.patch.object(invoice_models, "recalc_amounts", wraps=invoice_models.recalc_amounts)
+
+    def test_item_changes_recalc_once_on_commit(self):
+        with self.recalcs() as recalc, self.captureOnCommitCallbacks(execute=True):
+            for price in ("1.00", "2.00", "3.00"):
+                InvoiceItem.objects.create(invoice=self.inv, description="x", unit_price=Decimal(price))
+            self.assertEqual(self.amount(), Decimal("0.00"))  # nothing until commit
+        self.assertEqual(recalc.call_count, 1)
+        self.assertEqual(self.amount(), Decimal("6.00"))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.inv.items.first().delete()
+        self.assertEqual(self.amount(), Decimal("5.00"))
+
+    def test_rolled_back_items_do_not_lose_later_recalcs(self):
+        with self.recalcs() as recalc, self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    InvoiceItem.objects.create(invoice=self.inv, description="x", unit_price=Decimal("9.00"))
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+            InvoiceItem.objects.create(invoice=self.inv, description="x", unit_price=Decimal("4.00"))
+        self.assertEqual(recalc.call_count, 1)
+        self.assertEqual(self.amount(), Decimal("4.00"))
+
+    def test_whole_transaction_rolled_back_then_a_new_one(self):
+        try:
+            with transaction.atomic():
+                InvoiceItem.objects.create(invoice=self.inv, description="x", unit_price=Decimal("9.00"))
+                raise RuntimeError
+        except RuntimeError:
+            pass
+        with self.captureOnCommitCallbacks(execute=True):
+            InvoiceItem.objects.create(invoice=self.inv, description="x", unit_price=Decimal("4.00"))
+        self.assertEqual(self.amount(), Decimal("4.00"))
+
+    def test_deferred_amounts_covers_bulk_operations(self):
+        other = Invoice.objects.create(user=self.user)
+        with self.recalcs() as recalc, self.captureOnCommitCallbacks(execute=True):
+            with deferred_amounts(self.inv):
+                InvoiceItem.objects.create(invoice=other, description="x", unit_price=Decimal("2.50"))
+                InvoiceItem.objects.bulk_create(  # no signals: covered by the explicit invoice
+                    [InvoiceItem(invoice=self.inv, description="x", unit_price=Decimal("1.25"))] * 2
+                )
+        self.assertEqual(recalc.call_count, 1)
+        self.assertEqual(self.amount(), Decimal("2.50"))
+        self.assertEqual(Invoice.objects.get(pk=other.pk).amount, Decimal("2.50"))
+
+
+class PdfResponseTests(TestCase):
+    pdf = b"%PDF-1.4 test document"
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        user = User.objects.create_user("pdf", "pdf@example.com", "x")
+        self.inv = Invoice.objects.create(user=user)
+        self.renders = []
+        self.factory = RequestFactory()
+
+    def render(self, engine="weasyprint"):
+        def fn():
+            self.renders.append(engine)
+            return self.pdf, engine
+        return fn
+
+    def get(self, engine="weasyprint", **headers):
+        request = self.factory.get("/pdf/", headers=headers)
+        return pdf_cache.serve(request, self.inv, self.render(engine), "inv.pdf")
+
+    def body(self, resp):
+        return b"".join(resp.streaming_content) if resp.streaming else resp.content
+
+    def test_renders_once_then_serves_from_storage(self):
+        first = self.get()
+        self.assertEqual((first.status_code, self.body(first)), (200, self.pdf))
+        self.assertEqual(first["ETag"], f'"{pdf_cache.invoice_fingerprint(self.inv)}"')
+        second = self.get()
+        self.assertEqual((second.status_code, self.body(second)), (200, self.pdf))
+        self.assertEqual(second["X-PDF-Generator"], "cache")
+        self.assertEqual(self.renders, ["weasyprint"])
+
+    def test_matching_etag_is_304_without_rendering(self):
+        etag = self.get()["ETag"]
+        self.assertEqual(self.get(If_None_Match=etag).status_code, 304)
+        self.assertEqual(self.renders, ["weasyprint"])
+
+        InvoiceItem.objects.create(invoice=self.inv, description="x", unit_price=Decimal("1.00"))
+        self.inv.refresh_from_db()
+        self.assertEqual(self.get(If_None_Match=etag).status_code, 200)  # edited: new fingerprint
+
+    def test_byte_ranges(self):
+        self.get()
+        part = self.get(Range="bytes=0-3")
+        self.assertEqual((part.status_code, part.content), (206, self.pdf[:4]))
+        self.assertEqual(part["Content-Range"], f"bytes 0-3/{len(self.pdf)}")
+        self.assertEqual(self.get(Range="bytes=-8").content, self.pdf[-8:])
+        self.assertEqual(self.get(Range="bytes=5-").content, self.pdf[5:])
+
+        unsatisfiable = self.get(Range=f"bytes={len(self.pdf)}-")
+        self.assertEqual(unsatisfiable.status_code, 416)
+        self.assertEqual(unsatisfiable["Content-Range"], f"bytes */{len(self.pdf)}")
+
+        stale = self.get(Range="bytes=0-3", If_Range='"old"')
+        self.assertEqual((stale.status_code, self.body(stale)), (200, self.pdf))
+
+    def test_storing_a_new_version_removes_the_old_ones(self):
+        self.get()
+        InvoiceItem.objects.create(invoice=self.inv, description="x", unit_price=Decimal("1.00"))
+        self.inv.refresh_from_db()
+        self.get()
+        _, files = pdf_cache.default_storage.listdir(f"invoices/pdf/{self.inv.pk}")
+        self.assertEqual(files, [f"{pdf_cache.invoice_fingerprint(self.inv)}.pdf"])
+        self.assertEqual(self.renders, ["weasyprint", "weasyprint"])
+
+    def test_fallback_output_is_not_stored(self):
+        first = self.get(engine="reportlab")
+        self.assertTrue(first["ETag"].endswith('-reportlab"'))
+        self.get(engine="reportlab")
+        self.assertEqual(self.renders, ["reportlab", "reportlab"])
+
+
+
+
+class FakePage:
+    def __init__(self, browser):
+        self.browser, self.closed = browser, False
+
+    async def set_content(self, html, wait_until):
+        browser = self.browser
+        browser.rendering += 1
+        browser.peak = max(browser.peak, browser.rendering)
+        await asyncio.sleep(0.02)
+        browser.rendering -= 1
+        browser.rendered.append(self)
+
+    async def pdf(self, **options):
+        return b"%PDF-fake"
+
+    def is_closed(self):
+        return self.closed
+
+    async def close(self):
+        self.closed = True
+
+
+class FakeBrowser:
+    def __init__(self):
+        self.connected, self.pages, self.rendered = True, [], []
+        self.rendering = self.peak = 0
+
+    def is_connected(self):
+        return self.connected
+
+    async def new_context(self):
+        return self  # the context only has to hand out pages
+
+    async def new_page(self):
+        self.pages.append(FakePage(self))
+        return self.pages[-1]
+
+    async def close(self):
+        self.connected = False
+        for page in self.pages:
+            page.closed = True
+
+
+class FakeBrowserPool(browser_pool.BrowserPool):
+    """Counts launches instead of starting Playwright."""
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.browsers = []
+
+    async def _launch(self):
+        self.browsers.append(FakeBrowser())
+        return mock.AsyncMock(), self.browsers[-1]
+
+
+class BrowserPoolTests(TestCase):
+    def pool(self, **kwargs):
+        pool = FakeBrowserPool(**kwargs)
+        self.addCleanup(pool.shutdown)
+        return pool
+
+    def test_pages_are_reused_across_renders(self):
+        pool = self.pool(max_pages=2)
+        for _ in range(5):
+            self.assertEqual(pool.render("<p>hi</p>"), b"%PDF-fake")
+        [browser] = pool.browsers
+        self.assertEqual(len(browser.pages), 2)
+        self.assertEqual(len(browser.rendered), 5)
+        self.assertEqual(pool.stats()["renders_since_launch"], 5)
+
+    def test_browser_is_relaunched_after_the_recycle_threshold(self):
+        pool = self.pool(max_pages=1, recycle_after=3)
+        for _ in range(7):
+            pool.render("<p>hi</p>")
+        self.assertEqual([len(b.rendered) for b in pool.browsers], [3, 3, 1])
+        self.assertEqual([b.connected for b in pool.browsers], [False, False, True])
+
+    def test_browser_is_relaunched_when_the_health_check_fails(self):
+        pool = self.pool(max_pages=1)
+        pool.render("<p>hi</p>")
+        pool.browsers[0].connected = False  # crashed between renders
+        pool.render("<p>hi</p>")
+        self.assertEqual(len(pool.browsers), 2)
+        self.assertEqual(len(pool.browsers[1].rendered), 1)
+
+    def test_no_more_than_max_pages_render_at_once(self):
+        pool = self.pool(max_pages=2)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(pool.render("<p>hi</p>"))) for _ in range(6)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        [browser] = pool.browsers
+        self.assertEqual(results, [b"%PDF-fake"] * 6)
+        self.assertEqual(browser.peak, 2)
+        self.assertEqual(len(browser.pages), 2)
+
+
+@override_settings(
+    INVOICE_PDF_ENGINES=["playwright", "weasyprint", "reportlab"],
+    INVOICE_PDF_ENGINE_MAX_FAILURES=2,
+    INVOICE_PDF_ENGINE_COOLDOWN=60,
+)
+class PdfEngineChainTests(TestCase):
+    """Fake renderers; every engine "passes" the probe and the clock is ours."""
+
+    def setUp(self):
+        cache.clear()
+        self.now = 1000.0
+        self.calls = []
+        self.broken = set()
+        for patcher in (
+            mock.patch.object(pdf_engines, "_failures", {}),
+            mock.patch.object(pdf_engines, "_disabled_until", {}),
+            mock.patch.object(pdf_engines, "probe", lambda force=False: dict.fromkeys(pdf_engines.PROBES, True)),
+            mock.patch.object(pdf_engines, "time", mock.Mock(monotonic=lambda: self.now, perf_counter=time.perf_counter)),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def renderer(self, name):
+        def fn(*args):
+            self.calls.append(name)
+            if name in self.broken:
+                raise RuntimeError(f"{name} is down")
+            return f"%PDF {name}".encode()
+        return fn
+
+    def render(self):
+        return pdf_engines.render({n: self.renderer(n) for n in pdf_engines.PROBES}).engine
+
+    def test_configured_order_is_respected(self):
+        self.assertEqual(self.render(), "playwright")
+        with self.settings(INVOICE_PDF_ENGINES="reportlab, weasyprint,bogus"):
+            self.assertEqual(pdf_engines.configured(), ("reportlab", "weasyprint"))
+            self.assertEqual(self.render(), "reportlab")
+
+    def test_engine_sits_out_a_cooldown_then_gets_one_trial(self):
+        self.broken.add("playwright")
+        self.assertEqual([self.render(), self.render()], ["weasyprint", "weasyprint"])
+        self.assertEqual(self.calls.count("playwright"), 2)  # MAX_FAILURES reached: disabled
+        self.assertEqual(pdf_engines.status()["playwright"]["disabled_for"], 60)
+
+        self.calls.clear()
+        self.now += 59
+        self.assertEqual(self.render(), "weasyprint")
+        self.assertNotIn("playwright", self.calls)  # skipped during the cooldown
+
+        self.calls.clear()
+        self.now += 1
+        self.assertEqual(self.render(), "weasyprint")
+        self.assertEqual(self.calls, ["playwright", "weasyprint"])  # one trial, which failed...
+        self.calls.clear()
+        self.render()
+        self.assertNotIn("playwright", self.calls)  # ...so it is disabled again straight away
+
+        self.broken.clear()
+        self.now += 60
+        self.assertEqual(self.render(), "playwright")  # the trial succeeds: back in the chain
+        self.assertEqual(pdf_engines.status()["playwright"]["consecutive_failures"], 0)
+
+    def test_all_engines_failing_raises(self):
+        self.broken.update(pdf_engines.PROBES)
+        with self.assertRaisesRegex(RuntimeError, "playwright is down.*reportlab is down"):
+            self.render()
+
+    def test_response_names_the_engine_and_its_timing(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        user = User.objects.create_user("eng", "eng@example.com", "x")
+        inv = Invoice.objects.create(user=user)
+        self.client.force_login(user)
+        self.broken.add("playwright")
+        renderers = {n: (lambda n: lambda request, inv: self.renderer(n)())(n) for n in pdf_engines.PROBES}
+        with override_settings(MEDIA_ROOT=media), mock.patch.dict(invoice_views.PDF_RENDERERS, renderers):
+            resp = self.client.get(reverse("invoices:pdf", args=[inv.pk]))
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp["X-PDF-Generator"], "weasyprint")
+        self.assertRegex(resp["X-PDF-Render-Time"], r"^\d+\.\dms$")
+        self.assertRegex(resp["Server-Timing"], r'^pdf;desc="weasyprint";dur=\d+\.\d$')
+        self.assertEqual(pdf_engines.metrics()["playwright"]["failures"], 1)
+
+class PdfExportTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=media)
+        override.enable()
+        self.addCleanup(override.disable)
+
+        user = User.objects.create_user("zip", "zip@example.com", "x")
+        for _ in range(5):
+            Invoice.objects.create(user=user)
+        self.renders = []
+
+    def invoices(self):
+        return list(Invoice.objects.select_related("user").prefetch_related("items").order_by("pk"))
+
+    def render(self, inv):
+        self.renders.append(inv.pk)
+        if inv.notes == "broken":
+            raise RuntimeError("every engine failed")
+        return f"%PDF-1.4 {inv.pk}".encode(), "weasyprint"
+
+    def archive(self, workers=2):
+        data = b"".join(pdf_export.stream_zip(self.invoices(), self.render, workers=workers))
+        zf = zipfile.ZipFile(io.BytesIO(data))
+        self.assertIsNone(zf.testzip())
+        return zf
+
+    def test_streams_a_valid_archive_with_one_entry_per_invoice(self):
+        zf = self.archive()
+        expected = {f"{inv.number}.pdf": f"%PDF-1.4 {inv.pk}".encode() for inv in self.invoices()}
+        self.assertEqual({name: zf.read(name) for name in zf.namelist()}, expected)
+
+    def test_cached_pdfs_are_reused(self):
+        self.archive()
+        self.assertEqual(len(self.renders), 5)
+        self.archive()
+        self.assertEqual(len(self.renders), 5)
+
+    def test_render_failure_still_yields_a_complete_archive(self):
+        broken = self.invoices()[2]
+        Invoice.objects.filter(pk=broken.pk).update(notes="broken")
+        with self.assertLogs("apps.invoices.services.pdf_export", "ERROR"):
+            zf = self.archive()
+        names = zf.namelist()
+        self.assertEqual(len(names), 5)
+        self.assertIn(f"{broken.number}.error.txt", names)
+        self.assertIn(b"every engine failed", zf.read(f"{broken.number}.error.txt"))
+
+    def test_blank_number_falls_back_to_the_pk(self):
+        blank = self.invoices()[0]
+        Invoice.objects.filter(pk=blank.pk).update(number="")
+        names = self.archive().namelist()
+        self.assertIn(f"invoice-{blank.pk}.pdf", names)
+        self.assertNotIn(".pdf", names)
+
+
+class StatementTests(TestCase):
+    start, end = datetime.date(2030, 1, 1), datetime.date(2030, 12, 31)
+
+    def setUp(self):
+        self.user = User.objects.create_user("stmt", "stmt@example.com", "x", first_name="Sam")
+
+    def invoice(self, issued, currency="EUR", status=Invoice.Status.SENT, items=((1, "10.00"),), user=None):
+        inv = Invoice.objects.create(user=user or self.user, currency=currency, status=status, issued_at=issued)
+        InvoiceItem.objects.bulk_create([
+            InvoiceItem(invoice=inv, description=f"Item {i}", qty=Decimal(qty), unit_price=Decimal(price))
+            for i, (qty, price) in enumerate(items)
+        ])
+        return inv
+
+    def url(self, user=None, **params):
+        path = reverse("invoices:customer_statement", args=[user.pk]) if user else reverse("invoices:statement")
+        return path + ("?" + "&".join(f"{k}={v}" for k, v in params.items()) if params else "")
+
+    def test_one_invoice_query_plus_one_items_prefetch(self):
+        for day in (1, 2, 3):
+            self.invoice(datetime.date(2030, 3, day), items=((1, "5.00"), (2, "1.50")))
+        with self.assertNumQueries(2):
+            invoices = list(statement.statement_invoices(self.user, self.start, self.end))
+        with self.assertNumQueries(0):
+            statement._summary(invoices)
+            self.assertEqual([len(inv.items.all()) for inv in invoices], [2, 2, 2])
+
+    def test_summary_rows_per_currency(self):
+        self.invoice(datetime.date(2030, 2, 1), items=((2, "10.00"),))
+        self.invoice(datetime.date(2030, 2, 2), status=Invoice.Status.PAID, items=((1, "5.00"),))
+        self.invoice(datetime.date(2030, 2, 3), currency="USD", items=((1, "7.25"),))
+        self.invoice(datetime.date(2030, 2, 4), status=Invoice.Status.VOID)
+        self.invoice(datetime.date(2029, 12, 31))  # before the period
+        self.invoice(datetime.date(2030, 2, 5), user=User.objects.create_user("other", "o@example.com", "x"))
+
+        rows = statement._summary(statement.statement_invoices(self.user, self.start, self.end))
+        self.assertEqual(rows, [
+            ["Currency", "Billed", "Paid", "Outstanding"],
+            ["EUR", "25.00 EUR", "5.00 EUR", "20.00 EUR"],
+            ["USD", "7.25 USD", "0.00 USD", "7.25 USD"],
+        ])
+
+    def test_view_returns_a_pdf(self):
+        self.invoice(datetime.date(2030, 5, 1))
+        self.client.force_login(self.user)
+        resp = self.client.get(self.url(start="2030-01-01", end="2030-12-31"))
+        body = b"".join(resp.streaming_content)
+        self.assertEqual((resp.status_code, resp["Content-Type"]), (200, "application/pdf"))
+        self.assertTrue(body.startswith(b"%PDF"))
+
+    def test_customers_only_get_their_own_statement(self):
+        other = User.objects.create_user("nosy", "nosy@example.com", "x")
+        self.client.force_login(other)
+        self.assertRedirects(self.client.get(self.url(self.user)), reverse("invoices:statement"),
+                             fetch_redirect_response=False)
+
+        staff = User.objects.create_user("staff", "staff@example.com", "x", is_staff=True)
+        self.client.force_login(staff)
+        resp = self.client.get(self.url(self.user))
+        self.assertEqual(resp.status_code, 200)
+        self.assertIn("statement-stmt-", resp["Content-Disposition"])
+
+    def test_invalid_or_reversed_period_is_rejected(self):
+        self.client.force_login(self.user)
+        for params in ({"start": "2030-02-30"}, {"start": "2030-06-01", "end": "2030-01-01"}, {"end": "soon"}):
+            self.assertRedirects(self.client.get(self.url(**params)), reverse("invoices:list"),
+                                 fetch_redirect_response=False)
+
+    def test_renders_a_few_hundred_invoices(self):
+        numbers = reserve_invoice_numbers(300)
+        invoices = Invoice.objects.bulk_create([
+            Invoice(user=self.user, number=n, issued_at=datetime.date(2030, 1, 1) + datetime.timedelta(days=i % 360),
+                    due_at=datetime.date(2031, 1, 1))
+            for i, n in enumerate(numbers)
+        ])
+        InvoiceItem.objects.bulk_create([
+            InvoiceItem(invoice=inv, description=f"Line {j}", qty=Decimal(1), unit_price=Decimal("9.99"))
+            for inv in invoices for j in range(3)
+        ])
+        out = io.BytesIO()
+        with self.assertNumQueries(2):
+            statement.render_statement(self.user, self.start, self.end, out)
+        self.assertTrue(out.getvalue().startswith(b"%PDF"))
+        self.assertGreater(len(out.getvalue()), 10_000)
+
+class FlakyBackend(LocmemBackend):
+    """Locmem backend that refuses mail to addresses starting with "bounce"."""
+
+    def send_messages(self, messages):
+        if any(to.startswith("bounce") for msg in messages for to in msg.to):
+            raise OSError("550 mailbox unavailable")
+        return super().send_messages(messages)
+
+
+@override_settings(EMAIL_BACKEND="apps.invoices.tests.FlakyBackend")
+@mock.patch.object(mailing, "_render", lambda inv: (b"%PDF-1.4 stub", "reportlab"))
+class BulkSendTests(TestCase):
+    def invoice(self, email):
+        user = User.objects.create_user(email or f"nomail{User.objects.count()}", email, "x")
+        return Invoice.objects.create(user=user)
+
+    def test_records_each_invoice_and_audits_the_status_change(self):
+        ok = [self.invoice(f"c{i}@example.com") for i in range(3)]
+        bounce = self.invoice("bounce@example.com")
+        nomail = self.invoice("")
+        Invoice.objects.filter(pk=ok[2].pk).update(status=Invoice.Status.OVERDUE)  # a reminder
+
+        result = mailing.send_invoices(
+            Invoice.objects.filter(pk__in=[*[i.pk for i in ok], bounce.pk, nomail.pk])
+            .select_related("user").order_by("pk"),
+            batch_size=2,
+        )
+        self.assertEqual(sorted(result.sent), [i.pk for i in ok])
+        self.assertEqual((result.failed, result.skipped), ([bounce.pk], [nomail.pk]))
+        self.assertEqual(len(mail.outbox), 3)
+
+        rows = {inv.pk: inv for inv in Invoice.objects.all()}
+        self.assertEqual(
+            [(rows[i.pk].status, rows[i.pk].email_status) for i in ok],
+            [(Invoice.Status.SENT, "SENT"), (Invoice.Status.SENT, "SENT"), (Invoice.Status.OVERDUE, "SENT")],
+        )
+        self.assertEqual((rows[bounce.pk].status, rows[bounce.pk].email_status), (Invoice.Status.DRAFT, "FAILED"))
+        self.assertEqual(
+            sorted(InvoiceStatusChange.objects.filter(source="bulk-send").values_list("invoice_id", flat=True)),
+            [ok[0].pk, ok[1].pk],
+        )
+
+    def test_crash_midway_keeps_what_was_already_sent(self):
+        first, second = self.invoice("a@example.com"), self.invoice("b@example.com")
+        real = mailing.invoice_email_message
+
+        def explode_on_second(inv, *args):
+            if inv.pk == second.pk:
+                raise KeyboardInterrupt  # not an Exception: aborts the run
+            return real(inv, *args)
+
+        with mock.patch.object(mailing, "invoice_email_message", explode_on_second):
+            with self.assertRaises(KeyboardInterrupt):
+                mailing.send_invoices(Invoice.objects.filter(pk__in=[first.pk, second.pk]).order_by("pk"))
+        self.assertEqual(Invoice.objects.get(pk=first.pk).email_status, Invoice.EmailStatus.SENT)
+        self.assertEqual(Invoice.objects.get(pk=second.pk).email_status, Invoice.EmailStatus.NONE)
+
+
+class InvoiceSearchTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("ada", "ada@example.com", "x", first_name="Ada")
+        self.invoices = [Invoice.objects.create(user=self.user) for _ in range(3)]
+
+    def found(self, q):
+        return set(search.filter_invoices(Invoice.objects.all(), q).values_list("pk", flat=True))
+
+    def test_login_does_not_reindex(self):
+        self.user.last_login = timezone.now()
+        with self.assertNumQueries(1):
+            self.user.save(update_fields=["last_login"])
+
+    def test_unchanged_save_checks_one_document(self):
+        with self.assertNumQueries(2):  # the UPDATE, one sample document
+            self.user.save()
+
+    def test_email_change_reindexes_every_invoice(self):
+        self.user.email = "lovelace@example.org"
+        self.user.save(update_fields=["email"])
+        self.assertEqual(self.found("lovelace"), {inv.pk for inv in self.invoices})
+        self.assertEqual(self.found("ada@example.com"), set())
+
+    def test_rebuild_recreates_documents_in_chunks(self):
+        InvoiceSearch.objects.all().delete()
+        self.assertEqual(search.rebuild(chunk_size=2), 3)
+        self.assertEqual(self.found("ada " + self.invoices[1].number), {self.invoices[1].pk})
+
+
+class AgingReportTests(TestCase):
+    as_of = datetime.date(2030, 6, 30)
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user("aging", "aging@example.com", "x")
+
+    def invoice(self, amount, status=Invoice.Status.SENT, days_overdue=None, currency="EUR"):
+        inv = Invoice.objects.create(user=self.user, currency=currency)
+        due = None if days_overdue is None else self.as_of - datetime.timedelta(days=days_overdue)
+        Invoice.objects.filter(pk=inv.pk).update(amount=Decimal(amount), status=status, due_at=due)
+        return inv
+
+    def test_buckets_counts_and_collection_rate(self):
+        self.invoice("10.00", days_overdue=0)        # due today: current
+        self.invoice("5.00")                         # no due date: current
+        self.invoice("20.00", days_overdue=1)
+        self.invoice("30.00", Invoice.Status.OVERDUE, days_overdue=30)
+        self.invoice("40.00", Invoice.Status.OVERDUE, days_overdue=31)
+        self.invoice("60.00", Invoice.Status.OVERDUE, days_overdue=90)
+        self.invoice("90.00", Invoice.Status.OVERDUE, days_overdue=91)
+        self.invoice("45.00", Invoice.Status.PAID, days_overdue=10)
+        self.invoice("99.00", Invoice.Status.DRAFT, days_overdue=10)  # not issued: ignored
+        self.invoice("99.00", Invoice.Status.VOID, days_overdue=10)
+
+        [eur] = aging.ar_aging(self.as_of)["currencies"]
+        self.assertEqual(eur["buckets"], [Decimal(v) for v in ("15.00", "50.00", "40.00", "60.00", "90.00")])
+        self.assertEqual((eur["outstanding"], eur["open_count"]), (Decimal("255.00"), 7))
+        self.assertEqual((eur["paid"], eur["paid_count"]), (Decimal("45.00"), 1))
+        self.assertEqual(eur["collection_rate"], Decimal("15.0"))
+
+    def test_base_row_converts_and_lists_unknown_currencies(self):
+        self.invoice("100.00", days_overdue=5)
+        self.invoice("100.00", days_overdue=5, currency="USD")
+        self.invoice("7.00", days_overdue=5, currency="XXX")
+
+        report = aging.ar_aging(self.as_of)
+        self.assertEqual([row["currency"] for row in report["currencies"]], ["EUR", "USD", "XXX"])
+        self.assertEqual(report["unconverted"], ["XXX"])
+        usd = aging.fx.rates().convert(Decimal("100.00"), "USD")
+        self.assertEqual(report["base"]["outstanding"], Decimal("100.00") + usd)
+        self.assertEqual(report["base"]["open_count"], 2)
+
+    def test_report_is_cached_per_day(self):
+        self.invoice("10.00", days_overdue=5)
+        aging.ar_aging(self.as_of)
+        with self.assertNumQueries(0):
+            aging.ar_aging(self.as_of)
+
+
+class LifecycleTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("life", "life@example.com", "x")
+
+    def invoice(self, status, due_at=None, paid_at=None):
+        inv = Invoice.objects.create(user=self.user)
+        Invoice.objects.filter(pk=inv.pk).update(status=status, due_at=due_at, paid_at=paid_at)
+        return inv
+
+    def audit(self, source):
+        return set(
+            InvoiceStatusChange.objects.filter(source=source)
+            .values_list("invoice_id", "from_status", "to_status", "changed_by")
+        )
+
+    def test_mark_overdue_is_set_based_and_audited(self):
+        today = datetime.date(2030, 1, 10)
+        late = [self.invoice(Invoice.Status.SENT, today - datetime.timedelta(days=d)) for d in (1, 5)]
+        self.invoice(Invoice.Status.SENT, today)  # due today: not late yet
+        self.invoice(Invoice.Status.DRAFT, today - datetime.timedelta(days=3))
+
+        self.assertEqual(lifecycle.mark_overdue(today, dry_run=True).changed, 2)
+        with self.assertNumQueries(4):  # savepoint, UPDATE, INSERT ... SELECT, release
+            result = lifecycle.mark_overdue(today, source="cron", actor=self.user)
+        self.assertEqual(result.changed, 2)
+        self.assertEqual(self.audit("cron"), {(i.pk, "SENT", "OVERDUE", self.user.pk) for i in late})
+        self.assertEqual(lifecycle.mark_overdue(today).changed, 0)
+
+    def test_each_audit_row_keeps_its_own_from_status(self):
+        sent = self.invoice(Invoice.Status.SENT)
+        overdue = self.invoice(Invoice.Status.OVERDUE, paid_at=datetime.date(2030, 1, 2))
+        draft = self.invoice(Invoice.Status.DRAFT)
+
+        result = lifecycle.mark_paid(Invoice.objects.all(), paid_on=datetime.date(2030, 1, 5), source="admin")
+        self.assertEqual(result.changed, 2)
+        self.assertEqual(self.audit("admin"), {(sent.pk, "SENT", "PAID", None), (overdue.pk, "OVERDUE", "PAID", None)})
+        paid_at = dict(Invoice.objects.values_list("pk", "paid_at"))
+        self.assertEqual(paid_at[sent.pk], datetime.date(2030, 1, 5))
+        self.assertEqual(paid_at[overdue.pk], datetime.date(2030, 1, 2))  # kept
+        self.assertEqual(Invoice.objects.get(pk=draft.pk).status, Invoice.Status.DRAFT)
+
+
+class RecurringInvoiceTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("rec", "rec@example.com", "x")
+
+    def template(self, start, cadence=RecurringInvoice.Cadence.MONTHLY, **kwargs):
+        rec = RecurringInvoice.objects.create(
+            user=self.user, cadence=cadence, start_date=start, next_run=start, tax_rate=Decimal("10"), **kwargs
+        )
+        RecurringInvoiceItem.objects.create(recurring=rec, description="Hosting", qty=2, unit_price=Decimal("12.50"))
+        return rec
+
+    def test_running_twice_does_not_duplicate(self):
+        rec = self.template(datetime.date(2030, 1, 15))
+        first = recurring.generate_due(as_of=datetime.date(2030, 1, 20))
+        again = recurring.generate_due(as_of=datetime.date(2030, 1, 20))
+        self.assertEqual((len(first.invoices), len(again.invoices)), (1, 0))
+
+        inv = Invoice.objects.get(recurring=rec)
+        self.assertEqual((inv.issued_at, inv.due_at), (datetime.date(2030, 1, 15), datetime.date(2030, 1, 29)))
+        self.assertEqual(inv.amount, Decimal("27.50"))
+        self.assertEqual([(it.qty, it.unit_price) for it in inv.items.all()], [(Decimal("2.00"), Decimal("12.50"))])
+        self.assertTrue(search.filter_invoices(Invoice.objects.all(), inv.number).exists())
+        rec.refresh_from_db()
+        self.assertEqual(rec.next_run, datetime.date(2030, 2, 15))
+
+    def test_catches_up_missed_periods_on_the_anchor_day(self):
+        rec = self.template(datetime.date(2030, 1, 31))
+        result = recurring.generate_due(as_of=datetime.date(2030, 4, 29))
+        self.assertEqual(len(result.invoices), 3)
+        issued = sorted(Invoice.objects.filter(recurring=rec).values_list("issued_at", flat=True))
+        self.assertEqual(issued, [datetime.date(2030, 1, 31), datetime.date(2030, 2, 28), datetime.date(2030, 3, 31)])
+        rec.refresh_from_db()
+        self.assertEqual(rec.next_run, datetime.date(2030, 4, 30))
+
+    def test_catch_up_is_capped_and_resumes(self):
+        rec = self.template(datetime.date(2030, 1, 1), cadence=RecurringInvoice.Cadence.WEEKLY)
+        as_of = datetime.date(2031, 1, 1)
+        self.assertEqual(len(recurring.generate_due(as_of=as_of).invoices), recurring.MAX_CATCH_UP)
+        rec.refresh_from_db()
+        self.assertEqual(rec.next_run, datetime.date(2030, 1, 1) + datetime.timedelta(weeks=recurring.MAX_CATCH_UP))
+
+    def test_dry_run_and_inactive_templates_create_nothing(self):
+        self.template(datetime.date(2030, 1, 1))
+        self.template(datetime.date(2030, 1, 1), active=False)
+        result = recurring.generate_due(as_of=datetime.date(2030, 2, 1), dry_run=True)
+        self.assertEqual((result.templates, result.planned, result.invoices), (1, 2, []))
+        self.assertFalse(Invoice.objects.exists())
+
+
+class OrderInvoicingTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("ord", "ord@example.com", "x")
+        self.today = timezone.localdate()
+
+    def order(self, user=None, status=Order.Status.PAID, amount="40.00"):
+        return Order.objects.create(
+            user=user, category=Order.Category.CAR_RENTAL, amount=Decimal(amount), status=status,
+        )
+
+    def test_each_order_is_linked_to_one_invoice(self):
+        paid, pending = self.order(self.user), self.order(self.user, Order.Status.PENDING, "15.00")
+        self.order(self.user, Order.Status.CANCELED)
+        self.order()  # no account
+
+        result = order_invoicing.invoice_orders(self.today, self.today, chunk_size=1)
+        self.assertEqual((result.selected, len(result.invoices), result.skipped), (3, 2, 1))
+        links = {link.order_id: link.invoice for link in OrderInvoice.objects.select_related("invoice")}
+        self.assertEqual(set(links), {paid.pk, pending.pk})
+        self.assertEqual((links[paid.pk].status, links[paid.pk].amount), (Invoice.Status.PAID, Decimal("40.00")))
+        self.assertEqual(links[pending.pk].status, Invoice.Status.DRAFT)
+        self.assertEqual(links[pending.pk].items.get().unit_price, Decimal("15.00"))
+
+        again = order_invoicing.invoice_orders(self.today, self.today)
+        self.assertEqual((again.invoices, Invoice.objects.count()), ([], 2))
+
+    def test_background_run_reports_progress_on_its_job(self):
+        self.assertIsNone(order_invoicing.last_progress())
+        self.order(self.user)
+        self.order(self.user)
+        self.order()
+        job = tasks.queue_order_invoicing(self.today, self.today)
+        self.assertEqual(order_invoicing.last_progress()["state"], "queued")
+
+        self.assertTrue(jobs.execute(jobs.claim("w1")))
+        job.refresh_from_db()
+        progress = order_invoicing.last_progress()
+        self.assertEqual(
+            {k: progress[k] for k in ("state", "start", "done", "total", "skipped")},
+            {"state": "done", "start": self.today.isoformat(), "done": 2, "total": 2, "skipped": 1},
+        )
+        self.assertEqual(job.progress["done"], 2)
+
+    def test_progress_outside_a_job_is_ignored(self):
+        self.assertFalse(jobs.report_progress(done=1))
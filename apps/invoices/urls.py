@@ -1,5 +1,5 @@
 from django.urls import path
-from .views import invoice_list, invoice_detail, invoice_create, invoice_update, invoice_delete, invoice_pdf, invoice_email
+from .views import invoice_aging, invoice_list, invoice_detail, invoice_create, invoice_update, invoice_delete, invoice_pdf, invoice_email, invoice_export, invoice_statement, pdf_engine_status
 
 app_name = "invoices"
 
@@ -11,4 +11,9 @@ urlpatterns = [
     path("<int:pk>/delete/", invoice_delete, name="delete"),  # <-- new
     path("<int:pk>/pdf/", invoice_pdf, name="pdf"),
     path("<int:pk>/email/", invoice_email, name="email"),
+    path("statement/", invoice_statement, name="statement"),
+    path("statement/<int:user_pk>/", invoice_statement, name="customer_statement"),
+    path("aging/", invoice_aging, name="aging"),
+    path("export/", invoice_export, name="export"),
+    path("pdf-engines/", pdf_engine_status, name="pdf_engines"),
 ]
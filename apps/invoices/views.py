@@ -1,19 +1,24 @@
 # apps/invoices/views.py
 from io import BytesIO
+from datetime import date, datetime, timedelta
 from decimal import Decimal
 
 from django.contrib import messages
+from django.contrib.auth import get_user_model
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.core.mail import EmailMessage
-from django.core.paginator import Paginator
-from django.db.models import Q
-from django.http import HttpResponse
+from django.db import transaction
+from django.http import FileResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.template.loader import render_to_string
+from django.utils import timezone
 from django.views.decorators.http import require_POST
 
+from apps.core.pagination import KeysetPaginator
+
+from . import tasks
 from .forms import InvoiceForm, InvoiceItemFormSet
 from .models import Invoice
+from .services import aging, mailing, pdf_assets, pdf_cache, pdf_engines, pdf_export, search, statement
 
 
 def _is_staff(u):
@@ -25,48 +30,23 @@ def _is_staff(u):
 @login_required
 def invoice_list(request):
     """
-    Invoice index page with search + pagination.
-    We pre-compute a pagination window so the template has no < or > logic.
+    Invoice index page with search + keyset pagination (cursor links for
+    prev/next, ?page=N for the window). We pre-compute a pagination window
+    so the template has no < or > logic.
     """
     q = (request.GET.get("q") or "").strip()
     invoices_qs = Invoice.objects.select_related("user").order_by("-created_at")
     if q:
-        invoices_qs = invoices_qs.filter(
-            Q(number__icontains=q)
-            | Q(user__username__icontains=q)
-            | Q(user__email__icontains=q)
-            | Q(user__first_name__icontains=q)
-            | Q(user__last_name__icontains=q)
-        )
-
-    paginator = Paginator(invoices_qs, 12)
-    page_number = request.GET.get("page")
-    page_obj = paginator.get_page(page_number)
-
-    # ---- pagination window ----
-    current = page_obj.number
-    num_pages = paginator.num_pages
+        invoices_qs = search.filter_invoices(invoices_qs, q)
 
-    start = max(1, current - 1)
-    end = min(num_pages, current + 1)
-    window_pages = list(range(start, end + 1))
-
-    show_left_ellipsis = start > 2
-    show_right_ellipsis = end < num_pages - 1
+    paginator = KeysetPaginator(invoices_qs, 12)
+    page_obj = paginator.get_page(cursor=request.GET.get("cursor"), number=request.GET.get("page"))
 
     context = {
         "q": q,
         "page_obj": page_obj,
         "invoices": page_obj.object_list,
-        "num_pages": num_pages,
-        "current": current,
-        "window_pages": window_pages,
-        "show_left_ellipsis": show_left_ellipsis,
-        "show_right_ellipsis": show_right_ellipsis,
-        "first_page": 1,
-        "last_page": num_pages,
-        "prev_page": current - 1 if page_obj.has_previous() else current,
-        "next_page": current + 1 if page_obj.has_next() else current,
+        **paginator.window(page_obj),
     }
     return render(request, "invoices/invoice_list.html", context)
 
@@ -79,6 +59,17 @@ def invoice_detail(request, pk):
     return render(request, "invoices/invoice_detail.html", {"inv": inv})
 
 
+@login_required
+@user_passes_test(_is_staff)
+def invoice_aging(request):
+    """Accounts-receivable aging (?as_of=YYYY-MM-DD, default today)."""
+    try:
+        as_of = date.fromisoformat(request.GET["as_of"]) if request.GET.get("as_of") else None
+    except ValueError:
+        as_of = None
+    return render(request, "invoices/aging.html", {"report": aging.ar_aging(as_of)})
+
+
 # ---------- Create / Update / Delete ----------
 
 @login_required
@@ -88,28 +79,31 @@ def invoice_create(request):
         form = InvoiceForm(request.POST)
         formset = InvoiceItemFormSet(request.POST)
         if form.is_valid() and formset.is_valid():
-            inv = form.save(commit=False)
-            inv.amount = Decimal("0.00")
-            inv.save()
-
-            formset.instance = inv
-            formset.save()
-
-            inv.amount = inv.total
-            inv.save(update_fields=["amount"])
-
-            if form.cleaned_data.get("send_now"):
-                if _email_invoice_to_customer(request, inv):
-                    messages.success(
-                        request,
-                        f"Invoice {inv.number} created and emailed to {inv.user.email}.",
-                    )
-                else:
-                    messages.warning(
-                        request,
-                        f"Invoice {inv.number} created, but the customer has no email.",
-                    )
+            # Item receivers coalesce into one amount recompute on commit.
+            with transaction.atomic():
+                inv = form.save(commit=False)
+                inv.amount = Decimal("0.00")
+                inv.save()
+
+                formset.instance = inv
+                formset.save()
+            inv.refresh_from_db(fields=["amount"])
+
+            # PDF + email run in the job worker, not in this request.
+            if form.cleaned_data.get("send_now") and inv.user.email:
+                tasks.queue_email(inv)
+                messages.success(
+                    request,
+                    f"Invoice {inv.number} created; email to {inv.user.email} queued.",
+                )
+            elif form.cleaned_data.get("send_now"):
+                tasks.queue_pdf(inv)
+                messages.warning(
+                    request,
+                    f"Invoice {inv.number} created, but the customer has no email.",
+                )
             else:
+                tasks.queue_pdf(inv)
                 messages.success(request, f"Invoice {inv.number} created.")
 
             return redirect("invoices:detail", pk=inv.pk)
@@ -130,11 +124,12 @@ def invoice_update(request, pk):
         form = InvoiceForm(request.POST, instance=inv)
         formset = InvoiceItemFormSet(request.POST, instance=inv)
         if form.is_valid() and formset.is_valid():
-            inv = form.save(commit=False)
-            inv.save()
-            formset.save()
-            inv.amount = inv.total
-            inv.save(update_fields=["amount"])
+            with transaction.atomic():
+                inv = form.save(commit=False)
+                inv.save()
+                formset.save()
+            inv.refresh_from_db(fields=["amount"])
+            tasks.queue_pdf(inv)
 
             messages.success(request, f"Invoice {inv.number} updated.")
             return redirect("invoices:detail", pk=inv.pk)
@@ -167,17 +162,21 @@ def _money(v: Decimal, currency: str) -> str:
     return f"{v:.2f} {currency}"
 
 
-def _render_pdf_html(request, inv) -> str:
-    ctx = {"inv": inv, "base_url": request.build_absolute_uri("/")}
+def _render_pdf_html(request, inv, inline_css: bool = True) -> str:
+    """
+    Self-contained invoice HTML: CSS, images and fonts are inlined, so no request is needed.
+    inline_css=False leaves the bundle stylesheet out for engines that get it precompiled.
+    """
+    ctx = {"inv": inv, "pdf_assets": pdf_assets.bundle(), "inline_css": inline_css, "base_url": None}
     return render_to_string("invoices/pdf.html", ctx, request=request)
 
 
 def _reportlab_invoice_pdf(inv) -> bytes:
     from reportlab.lib.pagesizes import A4
     from reportlab.lib.units import mm
-    from reportlab.lib import colors
-    from reportlab.platypus import Table, TableStyle, SimpleDocTemplate, Paragraph, Spacer
-    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import Table, SimpleDocTemplate, Paragraph, Spacer
+
+    st = statement.styles()  # shared, built once per process
 
     buf = BytesIO()
     doc = SimpleDocTemplate(
@@ -190,13 +189,9 @@ def _reportlab_invoice_pdf(inv) -> bytes:
         title=f"Invoice {inv.number}",
     )
 
-    styles = getSampleStyleSheet()
-    H = styles["Heading2"]; H.alignment = 1
-    P = styles["BodyText"]
-
     story = []
-    story.append(Paragraph("AeroLogicTech", H))
-    story.append(Paragraph(f"<b>Invoice</b> &nbsp; {inv.number}", P))
+    story.append(Paragraph("AeroLogicTech", st.title))
+    story.append(Paragraph(f"<b>Invoice</b> &nbsp; {inv.number}", st.body))
     story.append(Spacer(1, 6))
 
     meta = [
@@ -206,11 +201,7 @@ def _reportlab_invoice_pdf(inv) -> bytes:
         ["Status:", inv.status],
     ]
     t_meta = Table(meta, colWidths=[35 * mm, None])
-    t_meta.setStyle(TableStyle([
-        ("FONTNAME", (0,0), (-1,-1), "Helvetica"),
-        ("FONTSIZE", (0,0), (-1,-1), 10),
-        ("BOTTOMPADDING", (0,0), (-1,-1), 4),
-    ]))
+    t_meta.setStyle(st.meta)
     story.append(t_meta)
     story.append(Spacer(1, 8))
 
@@ -226,82 +217,59 @@ def _reportlab_invoice_pdf(inv) -> bytes:
         ])
 
     t = Table(data, colWidths=[15 * mm, None, 20 * mm, 30 * mm, 30 * mm])
-    t.setStyle(TableStyle([
-        ("BACKGROUND", (0,0), (-1,0), colors.HexColor("#e8f0fb")),
-        ("TEXTCOLOR", (0,0), (-1,0), colors.HexColor("#0f172a")),
-        ("FONTNAME", (0,0), (-1,0), "Helvetica-Bold"),
-        ("ALIGN", (2,1), (-1,-1), "RIGHT"),
-        ("INNERGRID", (0,0), (-1,-1), 0.25, colors.HexColor("#dbe3ef")),
-        ("BOX", (0,0), (-1,-1), 0.25, colors.HexColor("#c9d4e5")),
-        ("FONTSIZE", (0,0), (-1,-1), 9),
-        ("BOTTOMPADDING", (0,0), (-1,0), 6),
-        ("TOPPADDING", (0,1), (-1,-1), 4),
-        ("BOTTOMPADDING", (0,1), (-1,-1), 4),
-    ]))
+    t.setStyle(st.items)
     story.append(t)
     story.append(Spacer(1, 8))
 
+    sums = inv.compute_totals()
     totals = [
-        ["Subtotal:", _money(inv.subtotal, inv.currency)],
-        [f"Tax ({inv.tax_rate:.2f}%):", _money(inv.tax_amount, inv.currency)],
-        ["Grand Total:", _money(inv.total, inv.currency)],
+        ["Subtotal:", _money(sums.subtotal, inv.currency)],
+        [f"Tax ({inv.tax_rate:.2f}%):", _money(sums.tax_amount, inv.currency)],
+        ["Grand Total:", _money(sums.total, inv.currency)],
     ]
     t_tot = Table(totals, colWidths=[None, 40 * mm], hAlign="RIGHT")
-    t_tot.setStyle(TableStyle([
-        ("ALIGN", (1,0), (-1,-1), "RIGHT"),
-        ("FONTNAME", (0,0), (-1,-2), "Helvetica"),
-        ("FONTNAME", (0,-1), (-1,-1), "Helvetica-Bold"),
-        ("FONTSIZE", (0,0), (-1,-1), 10),
-    ]))
+    t_tot.setStyle(st.totals)
     story.append(t_tot)
     story.append(Spacer(1, 14))
 
-    story.append(Paragraph("<b>Authorized</b> — Management", P))
+    story.append(Paragraph("<b>Authorized</b> — Management", st.body))
 
     doc.build(story)
     buf.seek(0)
     return buf.read()
 
 
-def _render_pdf_via_weasyprint(request, inv) -> bytes | None:
-    try:
-        from weasyprint import HTML
-    except Exception:
-        return None
+def _render_pdf_via_weasyprint(request, inv) -> bytes:
+    """Render with the process-wide WeasyPrint engine (fonts + stylesheets compiled once)."""
+    from .services.weasy import renderer
 
-    try:
-        html = _render_pdf_html(request, inv)
-        pdf_io = BytesIO()
-        HTML(string=html, base_url=request.build_absolute_uri("/")).write_pdf(pdf_io)
-        return pdf_io.getvalue()
-    except Exception:
-        return None
+    return renderer.render(_render_pdf_html(request, inv, inline_css=False))
 
 
-def _render_pdf_via_playwright(request, inv) -> bytes | None:
-    try:
-        from playwright.sync_api import sync_playwright
-    except Exception:
-        return None
+def _render_pdf_via_playwright(request, inv) -> bytes:
+    """Render through this worker's long-lived Chromium (see services.browser_pool)."""
+    from .services.browser_pool import get_pool
 
-    html = _render_pdf_html(request, inv)
+    return get_pool().render(_render_pdf_html(request, inv), wait_until="load")  # nothing left to fetch
 
-    try:
-        with sync_playwright() as p:
-            browser = p.chromium.launch()
-            context = browser.new_context()
-            page = context.new_page()
-            page.set_content(html, wait_until="networkidle")
-            pdf_bytes = page.pdf(
-                format="A4",
-                margin={"top": "18mm", "right": "18mm", "bottom": "18mm", "left": "18mm"},
-                print_background=True,
-            )
-            context.close()
-            browser.close()
-        return pdf_bytes
-    except Exception:
-        return None
+
+# Engine name -> renderer; order and availability come from services.pdf_engines.
+PDF_RENDERERS = {
+    "playwright": _render_pdf_via_playwright,
+    "weasyprint": _render_pdf_via_weasyprint,
+    "reportlab": lambda request, inv: _reportlab_invoice_pdf(inv),
+}
+
+
+def _render_invoice_pdf(request, inv) -> tuple[bytes, str]:
+    """First working engine in INVOICE_PDF_ENGINES order: (pdf_bytes, engine)."""
+    result = pdf_engines.render(PDF_RENDERERS, request, inv)
+    return result.content, result.engine
+
+
+def _invoice_pdf_bytes(request, inv) -> bytes:
+    """Rendered PDF for inv, reusing the stored copy while the invoice is unchanged."""
+    return pdf_cache.get_or_render(inv, lambda: _render_invoice_pdf(request, inv)).read()
 
 
 # ---------- PDF endpoints ----------
@@ -312,28 +280,96 @@ def invoice_pdf(request, pk):
         Invoice.objects.select_related("user").prefetch_related("items"), pk=pk
     )
 
-    pdf_bytes = _render_pdf_via_playwright(request, inv)
-    if pdf_bytes:
-        resp = HttpResponse(pdf_bytes, content_type="application/pdf")
-        resp["Content-Disposition"] = f'inline; filename="{inv.number}.pdf"'
-        resp["X-PDF-Generator"] = "playwright"
-        return resp
-
-    pdf_bytes = _render_pdf_via_weasyprint(request, inv)
-    if pdf_bytes:
-        resp = HttpResponse(pdf_bytes, content_type="application/pdf")
-        resp["Content-Disposition"] = f'inline; filename="{inv.number}.pdf"'
-        resp["X-PDF-Generator"] = "weasyprint"
-        return resp
-
-    pdf_bytes = _reportlab_invoice_pdf(inv)
-    messages.info(
-        request,
-        "Using ReportLab fallback PDF locally (WeasyPrint/Playwright not available).",
+    resp = pdf_cache.serve(
+        request, inv, lambda: _render_invoice_pdf(request, inv), f"{inv.number}.pdf"
+    )
+    if resp.get("X-PDF-Generator") == "reportlab":
+        messages.info(
+            request,
+            "Using ReportLab fallback PDF locally (WeasyPrint/Playwright not available).",
+        )
+    return resp
+
+
+@login_required
+@user_passes_test(_is_staff)
+def pdf_engine_status(request):
+    """
+    Staff JSON: engines usable in this worker plus render counters. The
+    counters cover every worker only with a shared cache ("metrics_scope").
+    """
+    return JsonResponse({
+        "engines": pdf_engines.status(),
+        "metrics": pdf_engines.metrics(),
+        "metrics_scope": pdf_engines.metrics_scope(),
+    })
+
+
+@login_required
+@user_passes_test(_is_staff)
+def invoice_export(request):
+    """
+    ZIP of every invoice issued in ?month=YYYY-MM (default: this month),
+    streamed while the PDFs are rendered.
+    """
+    month = (request.GET.get("month") or timezone.localdate().strftime("%Y-%m")).strip()
+    try:
+        start = datetime.strptime(month, "%Y-%m").date()
+    except ValueError:
+        messages.error(request, "Choose a month to export (YYYY-MM).")
+        return redirect("invoices:list")
+    end = (start + timedelta(days=32)).replace(day=1)
+
+    invoices = (
+        Invoice.objects.filter(issued_at__gte=start, issued_at__lt=end)
+        .exclude(status=Invoice.Status.VOID)
+        .select_related("user")
+        .prefetch_related("items")
+        .order_by("number")
+        .iterator(chunk_size=100)
     )
-    resp = HttpResponse(pdf_bytes, content_type="application/pdf")
-    resp["Content-Disposition"] = f'inline; filename="{inv.number}.pdf"'
-    resp["X-PDF-Generator"] = "reportlab"
+    resp = StreamingHttpResponse(
+        pdf_export.stream_zip(invoices, lambda inv: _render_invoice_pdf(None, inv)),
+        content_type="application/zip",
+    )
+    resp["Content-Disposition"] = f'attachment; filename="invoices-{month}.zip"'
+    resp["Cache-Control"] = "no-store"
+    return resp
+
+
+def _statement_period(request):
+    """?start=&end= (YYYY-MM-DD); defaults to the current calendar year."""
+    today = timezone.localdate()
+    try:
+        start = date.fromisoformat(request.GET["start"]) if request.GET.get("start") else today.replace(month=1, day=1)
+        end = date.fromisoformat(request.GET["end"]) if request.GET.get("end") else today
+    except ValueError:
+        return None
+    return (start, end) if start <= end else None
+
+
+@login_required
+def invoice_statement(request, user_pk=None):
+    """
+    One PDF with every invoice of a customer for a period. Customers get
+    their own; staff can pass any customer's pk.
+    """
+    if user_pk is not None and user_pk != request.user.pk and not _is_staff(request.user):
+        return redirect("invoices:statement")
+    customer = get_object_or_404(get_user_model(), pk=user_pk) if user_pk else request.user
+
+    period = _statement_period(request)
+    if period is None:
+        messages.error(request, "Invalid statement period.")
+        return redirect("invoices:list")
+    start, end = period
+
+    resp = FileResponse(
+        statement.statement_file(customer, start, end),
+        content_type="application/pdf",
+        filename=f"statement-{customer.username}-{start:%Y%m%d}-{end:%Y%m%d}.pdf",
+    )
+    resp["Cache-Control"] = "private, no-store"
     return resp
 
 
@@ -343,17 +379,8 @@ def _email_invoice_to_customer(request, inv) -> bool:
     if not inv.user.email:
         return False
 
-    pdf_bytes = (
-        _render_pdf_via_playwright(request, inv)
-        or _render_pdf_via_weasyprint(request, inv)
-        or _reportlab_invoice_pdf(inv)
-    )
-
-    subject = f"Invoice {inv.number}"
-    body = render_to_string("invoices/email.txt", {"inv": inv})
-    email = EmailMessage(subject, body, to=[inv.user.email])
-    email.attach(filename=f"{inv.number}.pdf", content=pdf_bytes, mimetype="application/pdf")
-    email.send(fail_silently=False)
+    pdf_bytes = _invoice_pdf_bytes(request, inv)
+    mailing.invoice_email_message(inv, pdf_bytes).send(fail_silently=False)
     return True
 
 
@@ -367,6 +394,6 @@ def invoice_email(request, pk):
         messages.error(request, "This customer has no email address.")
         return redirect("invoices:detail", pk=pk)
 
-    _email_invoice_to_customer(request, inv)
-    messages.success(request, f"Invoice {inv.number} sent to {inv.user.email}.")
+    tasks.queue_email(inv)
+    messages.success(request, f"Invoice {inv.number} queued for delivery to {inv.user.email}.")
     return redirect("invoices:detail", pk=pk)
@@ -0,0 +1,17 @@
+from __future__ import annotations
+
+from django.core.management.base import BaseCommand
+
+from apps.orders.services import schedule
+
+
+class Command(BaseCommand):
+    help = "Fill Order.scheduled_at / customer_email from meta (for orders written before the columns or via bulk_create)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000, help="Orders per bulk_update")
+        parser.add_argument("--all", action="store_true", help="Re-derive every order, not just those with empty columns")
+
+    def handle(self, *args, **options):
+        changed = schedule.backfill(batch_size=options["batch_size"], only_missing=not options["all"])
+        self.stdout.write(self.style.SUCCESS(f"Updated {changed} order(s)."))
@@ -0,0 +1,26 @@
+from __future__ import annotations
+
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.orders.services import rollups
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute the daily/monthly order rollups from the orders table (reconciles "
+        "drift from bulk writes, which skip the Order signals)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since", help="YYYY-MM-DD; rebuild from the start of that month on (default: everything)")
+
+    def handle(self, *args, **options):
+        try:
+            since = date.fromisoformat(options["since"]) if options["since"] else None
+        except ValueError:
+            raise CommandError("--since must be YYYY-MM-DD")
+        written = rollups.rebuild(since)
+        scope = f"from {since.replace(day=1)}" if since else "for all orders"
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} rollup row(s) {scope}."))
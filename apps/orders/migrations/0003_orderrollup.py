@@ -0,0 +1,59 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+
+
+def backfill(apps, schema_editor):
+    # Same GROUP BYs as services.rollups.rebuild(), frozen here against the historical models.
+    Order = apps.get_model("orders", "Order")
+    OrderRollup = apps.get_model("orders", "OrderRollup")
+    db = schema_editor.connection.alias
+
+    rows = []
+    for period, trunc in (("D", TruncDate("created_at")), ("M", TruncMonth("created_at"))):
+        for per_user in (False, True):
+            group = ["bucket", "category", "currency"] + (["user_id"] if per_user else [])
+            qs = Order.objects.using(db).order_by()
+            if per_user:
+                qs = qs.filter(user__isnull=False)
+            for r in qs.annotate(bucket=trunc).values(*group).annotate(n=Count("id"), total=Sum("amount")):
+                bucket = r["bucket"]
+                rows.append(OrderRollup(
+                    period=period, day=bucket.date() if hasattr(bucket, "date") else bucket,
+                    category=r["category"], currency=r["currency"], user_id=r.get("user_id"),
+                    orders=r["n"], amount=r["total"] or 0,
+                ))
+    OrderRollup.objects.using(db).bulk_create(rows, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0002_alter_order_options_order_user_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.CharField(choices=[('D', 'Day'), ('M', 'Month')], max_length=1)),
+                ('day', models.DateField()),
+                ('category', models.CharField(choices=[('AIRPORT_SERVICE', 'Airport Service'), ('CAR_RENTAL', 'Car Rental')], max_length=32)),
+                ('currency', models.CharField(max_length=3)),
+                ('orders', models.IntegerField(default=0)),
+                ('amount', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period', 'user', 'day'], name='orders_orde_period_a64f94_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('user__isnull', False)), fields=('period', 'day', 'category', 'currency', 'user'), name='order_rollup_user_uniq'), models.UniqueConstraint(condition=models.Q(('user__isnull', True)), fields=('period', 'day', 'category', 'currency'), name='order_rollup_total_uniq')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:00
+
+from datetime import datetime
+
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill(apps, schema_editor):
+    # Order.meta_columns() as of this migration, frozen here against the historical model.
+    Order = apps.get_model("orders", "Order")
+    db = schema_editor.connection.alias
+    last_pk = 0
+    while True:
+        batch = list(
+            Order.objects.using(db).filter(pk__gt=last_pk).order_by("pk").only("pk", "meta")[:1000]
+        )
+        if not batch:
+            return
+        last_pk = batch[-1].pk
+        for order in batch:
+            meta = order.meta if isinstance(order.meta, dict) else {}
+            try:
+                when = datetime.fromisoformat(str(meta["when"]))
+            except (KeyError, ValueError):
+                when = None
+            if when is not None and timezone.is_naive(when):
+                when = timezone.make_aware(when)
+            order.scheduled_at = when
+            order.customer_email = str(meta.get("email") or "").strip().lower()[:254]
+        Order.objects.using(db).bulk_update(batch, ["scheduled_at", "customer_email"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0003_orderrollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='customer_email',
+            field=models.CharField(blank=True, default='', max_length=254),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='scheduled_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['scheduled_at', 'category'], name='orders_orde_schedul_fd1a7b_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer_email', 'scheduled_at'], name='orders_orde_custome_561408_idx'),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,11 @@
 # apps/orders/models.py
+from datetime import datetime
+
 from django.conf import settings
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
 
 
 class Order(models.Model):
@@ -35,13 +40,165 @@ class Order(models.Model):
     # Flexible per-category metadata (e.g., flight_no, pickup time, car model, days, etc.)
     meta = models.JSONField(default=dict, blank=True)
 
+    # Copied out of meta on save (see sync_meta_columns) so schedules and
+    # customer lookups are index scans, not JSON scans.
+    scheduled_at = models.DateTimeField(null=True, blank=True)  # meta["when"]
+    customer_email = models.CharField(max_length=254, blank=True, default="")  # meta["email"], lower-cased
+
+    META_COLUMNS = ("scheduled_at", "customer_email")
+
     def __str__(self):
         return f"{self.get_category_display()} {self.amount} {self.currency} ({self.status})"
 
+    @staticmethod
+    def meta_columns(meta) -> dict:
+        """scheduled_at / customer_email values for a meta dict (unparseable times become None)."""
+        meta = meta if isinstance(meta, dict) else {}
+        when = None
+        try:
+            when = datetime.fromisoformat(str(meta["when"]))
+        except (KeyError, ValueError):
+            pass
+        if when is not None and timezone.is_naive(when):
+            when = timezone.make_aware(when)
+        return {
+            "scheduled_at": when,
+            "customer_email": str(meta.get("email") or "").strip().lower()[:254],
+        }
+
+    def sync_meta_columns(self) -> None:
+        for field, value in self.meta_columns(self.meta).items():
+            setattr(self, field, value)
+
+    def save(self, *args, **kwargs):
+        self.sync_meta_columns()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "meta" in update_fields:
+            kwargs["update_fields"] = {*update_fields, *self.META_COLUMNS}
+        super().save(*args, **kwargs)
+
     class Meta:
         ordering = ["-created_at"]
         indexes = [
             models.Index(fields=["category", "created_at"]),
             models.Index(fields=["status", "created_at"]),
             models.Index(fields=["user", "created_at"]),  # helpful for user-history queries
+            models.Index(fields=["scheduled_at", "category"]),  # upcoming schedule by time range
+            models.Index(fields=["customer_email", "scheduled_at"]),  # a customer's bookings
+        ]
+
+
+class OrderRollup(models.Model):
+    """
+    Order count and amount per day or month, category, currency and user,
+    in the order's own currency. Rows with user=NULL total every order
+    (including those without an account). Kept incrementally by the Order
+    receivers below; `manage.py rebuild_order_rollups` recomputes them
+    (needed after bulk_create/update, which skip signals).
+    """
+
+    class Period(models.TextChoices):
+        DAY = "D", "Day"
+        MONTH = "M", "Month"
+
+    period   = models.CharField(max_length=1, choices=Period.choices)
+    day      = models.DateField()  # the day, or the first of the month
+    category = models.CharField(max_length=32, choices=Order.Category.choices)
+    currency = models.CharField(max_length=3)
+    user     = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.CASCADE, related_name="+")
+    orders   = models.IntegerField(default=0)
+    amount   = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)  # see rollup_version()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["period", "day", "category", "currency", "user"],
+                condition=models.Q(user__isnull=False), name="order_rollup_user_uniq",
+            ),
+            models.UniqueConstraint(
+                fields=["period", "day", "category", "currency"],
+                condition=models.Q(user__isnull=True), name="order_rollup_total_uniq",
+            ),
+        ]
+        indexes = [models.Index(fields=["period", "user", "day"])]
+
+    def __str__(self):
+        who = self.user_id or "all"
+        return f"{self.period} {self.day} {self.category} {self.currency} [{who}]: {self.orders} / {self.amount}"
+
+    @staticmethod
+    def keys(order: Order) -> list:
+        """Rows an order counts towards: day and month, for everyone and for its user."""
+        day = timezone.localtime(order.created_at).date()
+        month = day.replace(day=1)
+        users = [None] + ([order.user_id] if order.user_id else [])
+        return [
+            {"period": period, "day": d, "category": order.category, "currency": order.currency, "user_id": uid}
+            for period, d in ((OrderRollup.Period.DAY, day), (OrderRollup.Period.MONTH, month))
+            for uid in users
         ]
+
+    @classmethod
+    def apply(cls, key: dict, orders: int, amount) -> None:
+        """Add orders/amount (either may be negative) to one row, creating it if needed."""
+        delta = {
+            "orders": models.F("orders") + orders, "amount": models.F("amount") + amount,
+            "updated_at": timezone.now(),
+        }
+        if cls.objects.filter(**key).update(**delta):
+            return
+        try:
+            with transaction.atomic():
+                cls.objects.create(**key, orders=orders, amount=amount)
+        except IntegrityError:  # created concurrently
+            cls.objects.filter(**key).update(**delta)
+
+
+def rollup_version() -> str:
+    """
+    Changes whenever rollup rows change; part of cache keys for data built on
+    them. Read from the table (row count + latest updated_at, one indexed
+    aggregate), so every process agrees without a shared cache.
+    """
+    agg = OrderRollup.objects.aggregate(n=models.Count("id"), last=models.Max("updated_at"))
+    return f"{agg['n']}-{agg['last'].timestamp() if agg['last'] else 0}"
+
+
+# --- Keep OrderRollup in step with orders ---
+
+_ROLLUP_FIELDS = ("created_at", "category", "currency", "user_id", "amount")
+
+
+@receiver(pre_save, sender=Order)
+def _rollup_remember_old(sender, instance: Order, raw=False, **kwargs):
+    instance._rollup_old = None
+    if not raw and instance.pk:
+        instance._rollup_old = Order.objects.filter(pk=instance.pk).values(*_ROLLUP_FIELDS).first()
+
+
+@receiver(post_save, sender=Order)
+def _rollup_on_save(sender, instance: Order, raw=False, **kwargs):
+    if raw:
+        return
+    old = getattr(instance, "_rollup_old", None)
+    if old is not None:
+        if all(old[f] == getattr(instance, f) for f in _ROLLUP_FIELDS):
+            return  # e.g. a status change: nothing the rollups count
+        with transaction.atomic():
+            for key in OrderRollup.keys(Order(**old)):
+                OrderRollup.apply(key, -1, -old["amount"])
+            for key in OrderRollup.keys(instance):
+                OrderRollup.apply(key, 1, instance.amount)
+        return
+    with transaction.atomic():
+        for key in OrderRollup.keys(instance):
+            OrderRollup.apply(key, 1, instance.amount)
+
+
+@receiver(post_delete, sender=Order)
+def _rollup_on_delete(sender, instance: Order, **kwargs):
+    with transaction.atomic():
+        for key in OrderRollup.keys(instance):
+            OrderRollup.apply(key, -1, -instance.amount)
+
@@ -0,0 +1,60 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Dict, Iterable, Optional
+
+from django.db.models import Q
+
+from apps.core.pagination import MergedKeysetPaginator
+from apps.explore.models import PlaceBooking
+
+from ..models import Order
+
+# Feed kinds -> (source, Order category or None). Tabs pick a subset.
+KINDS = {
+    "service": ("order", Order.Category.AIRPORT_SERVICE),
+    "car": ("order", Order.Category.CAR_RENTAL),
+    "tourism": ("tourism", None),
+}
+
+# Fields the shared search box matches, per source.
+SEARCH_FIELDS = {
+    "order": ("customer_name", "status", "category"),
+    "tourism": ("full_name", "email", "phone", "status", "place__name"),
+}
+
+
+def _search(qs, q: str, fields: Iterable[str]):
+    if not q:
+        return qs
+    cond = Q()
+    for field in fields:
+        cond |= Q(**{f"{field}__icontains": q})
+    return qs.filter(cond)
+
+
+def booking_sources(kinds: Iterable[str] = KINDS, q: str = "", since: Optional[datetime] = None) -> Dict[str, object]:
+    """
+    Querysets for a merged bookings feed: orders (limited to the categories
+    of the requested kinds) and tourism bookings, with the same search text
+    and date filter applied to each.
+    """
+    kinds = [k for k in kinds if k in KINDS]
+    categories = [KINDS[k][1] for k in kinds if KINDS[k][0] == "order"]
+    sources = {}
+    if categories:
+        orders = Order.objects.all()
+        if len(categories) < 2:
+            orders = orders.filter(category__in=categories)
+        sources["order"] = _search(orders, q, SEARCH_FIELDS["order"])
+    if "tourism" in kinds:
+        sources["tourism"] = _search(PlaceBooking.objects.select_related("place"), q, SEARCH_FIELDS["tourism"])
+    if since is not None:
+        sources = {name: qs.filter(created_at__gte=since) for name, qs in sources.items()}
+    return sources
+
+
+def booking_feed(kinds: Iterable[str] = KINDS, q: str = "", since: Optional[datetime] = None,
+                 per_page: int = 15) -> MergedKeysetPaginator:
+    """Newest-first pages over orders and tourism bookings (see MergedKeysetPaginator)."""
+    return MergedKeysetPaginator(booking_sources(kinds, q, since), per_page)
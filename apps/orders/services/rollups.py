@@ -0,0 +1,118 @@
+from __future__ import annotations
+
+import datetime
+from decimal import Decimal
+from typing import NamedTuple, Optional
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate, TruncMonth
+
+from apps.core import fx
+
+from ..models import Order, OrderRollup
+
+P = OrderRollup.Period
+
+
+GRANULARITIES = ("day", "week", "month")
+
+
+class SalesSeries(NamedTuple):
+    labels: list
+    airport: list
+    car: list
+    currency: str
+    unconverted: list  # currencies without an FX rate, left out of the series
+
+
+def bucket_start(day: datetime.date, granularity: str) -> datetime.date:
+    if granularity == "week":
+        return day - datetime.timedelta(days=day.weekday())  # ISO weeks start on Monday
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(day: datetime.date, granularity: str) -> datetime.date:
+    if granularity == "month":
+        return (day.replace(day=28) + datetime.timedelta(days=4)).replace(day=1)
+    return day + datetime.timedelta(days=7 if granularity == "week" else 1)
+
+
+def _label(day: datetime.date, granularity: str) -> str:
+    if granularity == "month":
+        return day.strftime("%b %Y")
+    return day.strftime("%d %b %Y")
+
+
+def rebuild(since: Optional[datetime.date] = None, *, using: str = "default") -> int:
+    """
+    Recompute rollups from orders, for everything or from the month of
+    `since` on, in one transaction: four GROUP BY queries (day/month x
+    per-user/total) and a bulk insert. Returns the number of rows written.
+    """
+    orders = Order.objects.using(using).order_by()
+    rollups = OrderRollup.objects.using(using)
+    if since is not None:
+        since = since.replace(day=1)
+        orders = orders.filter(created_at__date__gte=since)
+        rollups = rollups.filter(day__gte=since)
+
+    rows = []
+    for period, trunc in ((P.DAY, TruncDate("created_at")), (P.MONTH, TruncMonth("created_at"))):
+        for per_user in (False, True):
+            group = ["bucket", "category", "currency"] + (["user_id"] if per_user else [])
+            qs = orders.filter(user__isnull=False) if per_user else orders
+            for r in qs.annotate(bucket=trunc).values(*group).annotate(n=Count("id"), total=Sum("amount")):
+                bucket = r["bucket"]
+                rows.append(OrderRollup(
+                    period=period, day=bucket.date() if isinstance(bucket, datetime.datetime) else bucket,
+                    category=r["category"], currency=r["currency"], user_id=r.get("user_id"),
+                    orders=r["n"], amount=r["total"] or 0,
+                ))
+
+    with transaction.atomic(using=using):
+        rollups.delete()
+        OrderRollup.objects.using(using).bulk_create(rows, batch_size=1000)
+    return len(rows)
+
+
+def sales_series(start: datetime.date, end: datetime.date, granularity: str = "month", user=None) -> SalesSeries:
+    """
+    Airport/car sales per day, week or month in [start, end], in the base
+    currency, with empty buckets filled with 0. Reads rollup rows (monthly
+    rows for months, daily rows otherwise) instead of scanning orders, and
+    converts them in the same query (fx.to_base).
+    """
+    if granularity not in GRANULARITIES:
+        raise ValueError(f"granularity must be one of {', '.join(GRANULARITIES)}")
+    first = bucket_start(start, granularity)
+    rows = (
+        OrderRollup.objects.filter(
+            period=P.MONTH if granularity == "month" else P.DAY, day__gte=first, day__lte=end,
+        )
+        .filter(**({"user": user} if user is not None else {"user__isnull": True}))
+        .annotate(base_amount=fx.to_base("amount"))
+        .values_list("day", "category", "currency", "base_amount")
+    )
+
+    buckets, day = {}, first
+    while day <= end:
+        buckets[day] = {Order.Category.AIRPORT_SERVICE: Decimal(0), Order.Category.CAR_RENTAL: Decimal(0)}
+        day = _next_bucket(day, granularity)
+
+    unconverted = set()
+    for day, category, currency, amount in rows:
+        if amount is None:  # no rate for the currency
+            unconverted.add(currency)
+            continue
+        buckets[bucket_start(day, granularity)][category] += amount.quantize(fx.CENT)
+
+    return SalesSeries(
+        labels=[_label(day, granularity) for day in buckets],
+        airport=[float(b[Order.Category.AIRPORT_SERVICE]) for b in buckets.values()],
+        car=[float(b[Order.Category.CAR_RENTAL]) for b in buckets.values()],
+        currency=fx.rates().base,
+        unconverted=sorted(unconverted),
+    )
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from django.db import transaction
+
+from ..models import Order
+
+UPCOMING_LIMIT = 200
+
+
+def backfill(batch_size: int = 1000, only_missing: bool = True, *, using: str = "default") -> int:
+    """
+    Copy meta["when"] / meta["email"] into scheduled_at / customer_email for
+    existing orders, batch by batch in pk order (one bulk_update each).
+    Rows written with bulk_create skip Order.save(), so this also repairs
+    those. Returns the number of rows changed.
+    """
+    qs = Order.objects.using(using).order_by("pk")
+    if only_missing:
+        qs = qs.filter(scheduled_at__isnull=True, customer_email="")
+    changed, last_pk = 0, 0
+    while True:
+        batch = list(qs.filter(pk__gt=last_pk).only("pk", "meta", *Order.META_COLUMNS)[:batch_size])
+        if not batch:
+            return changed
+        last_pk = batch[-1].pk
+        dirty = []
+        for order in batch:
+            values = Order.meta_columns(order.meta)
+            if any(getattr(order, f) != v for f, v in values.items()):
+                for f, v in values.items():
+                    setattr(order, f, v)
+                dirty.append(order)
+        if dirty:
+            with transaction.atomic(using=using):
+                Order.objects.using(using).bulk_update(dirty, list(Order.META_COLUMNS))
+            changed += len(dirty)
+
+
+def upcoming(start: datetime, end: Optional[datetime] = None, email: str = "", category: str = ""):
+    """
+    Orders scheduled in [start, end] (soonest first), optionally for one
+    customer email and/or category. Served by the (scheduled_at, category)
+    and (customer_email, scheduled_at) indexes.
+    """
+    qs = Order.objects.filter(scheduled_at__gte=start).select_related("user")
+    if end is not None:
+        qs = qs.filter(scheduled_at__lte=end)
+    if email:
+        qs = qs.filter(customer_email=email.strip().lower())
+    if category:
+        qs = qs.filter(category=category)
+    return qs.exclude(status__in=[Order.Status.CANCELED, Order.Status.REFUNDED]).order_by("scheduled_at", "pk")
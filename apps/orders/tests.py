@@ -1,3 +1,175 @@
-from django.test import TestCase
+import datetime
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import Order, OrderRollup, rollup_version
+from .services import rollups, schedule
+
+User = get_user_model()
+P = OrderRollup.Period
+
+
+class OrderRollupTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("roll", "roll@example.com", "x")
+
+    def order(self, amount="10.00", user=None, **fields):
+        return Order.objects.create(
+            category=fields.pop("category", Order.Category.CAR_RENTAL), amount=Decimal(amount), user=user, **fields,
+        )
+
+    def rows(self, period=P.DAY, user=None):
+        qs = OrderRollup.objects.filter(period=period, user=user).exclude(orders=0)
+        return {(r.day, r.category, r.currency): (r.orders, r.amount) for r in qs}
+
+    def move(self, order, **fields):
+        for name, value in fields.items():
+            setattr(order, name, value)
+        order.save()
+
+    def test_create_counts_towards_day_and_month_for_everyone_and_the_user(self):
+        self.order("10.00", self.user)
+        self.order("5.00")
+        today = timezone.localdate()
+        key = (today, Order.Category.CAR_RENTAL, "EUR")
+        self.assertEqual(self.rows(), {key: (2, Decimal("15.00"))})
+        self.assertEqual(self.rows(user=self.user), {key: (1, Decimal("10.00"))})
+        self.assertEqual(self.rows(P.MONTH), {(today.replace(day=1), *key[1:]): (2, Decimal("15.00"))})
+
+    def test_status_change_leaves_the_rollups_alone(self):
+        order = self.order("10.00", self.user)
+        before = list(OrderRollup.objects.values_list("pk", "orders", "amount"))
+        self.move(order, status=Order.Status.REFUNDED)
+        self.assertEqual(list(OrderRollup.objects.values_list("pk", "orders", "amount")), before)
+
+    def test_moving_the_date_moves_the_order_between_buckets(self):
+        order = self.order("10.00", self.user)
+        today = timezone.localdate()
+        moved = timezone.now() - datetime.timedelta(days=40)
+        self.move(order, created_at=moved)
+
+        old_day, new_day = today, timezone.localtime(moved).date()
+        self.assertEqual(self.rows(), {(new_day, Order.Category.CAR_RENTAL, "EUR"): (1, Decimal("10.00"))})
+        months = self.rows(P.MONTH, self.user)
+        self.assertEqual(months, {(new_day.replace(day=1), Order.Category.CAR_RENTAL, "EUR"): (1, Decimal("10.00"))})
+        self.assertTrue(OrderRollup.objects.filter(day=old_day, orders=0, amount=0).exists())
+
+    def test_amount_currency_and_user_changes(self):
+        order = self.order("10.00", self.user)
+        self.move(order, amount=Decimal("12.50"), currency="USD", user=None)
+        today = timezone.localdate()
+        self.assertEqual(self.rows(), {(today, Order.Category.CAR_RENTAL, "USD"): (1, Decimal("12.50"))})
+        self.assertEqual(self.rows(user=self.user), {})
+
+    def test_delete_takes_the_order_out(self):
+        keep, gone = self.order("10.00", self.user), self.order("4.00", self.user)
+        gone.delete()
+        self.assertEqual(list(self.rows(user=self.user).values()), [(1, Decimal("10.00"))])
+        keep.delete()
+        self.assertEqual(self.rows(), {})
+
+    def test_version_follows_the_rows(self):
+        empty = rollup_version()
+        order = self.order("10.00")
+        created = rollup_version()
+        self.assertNotEqual(created, empty)
+        self.assertEqual(rollup_version(), created)  # stable while nothing changes
+        self.move(order, status=Order.Status.CANCELED)
+        self.assertEqual(rollup_version(), created)
+        self.move(order, amount=Decimal("11.00"))
+        self.assertNotEqual(rollup_version(), created)
+
+    def test_rebuild_matches_the_incremental_rows(self):
+        self.order("10.00", self.user)
+        self.move(self.order("3.00"), created_at=timezone.now() - datetime.timedelta(days=70))
+        self.order("7.00", self.user, category=Order.Category.AIRPORT_SERVICE).delete()
+        incremental = {period: self.rows(period) for period in P.values}
+        per_user = self.rows(user=self.user)
+
+        self.assertEqual(rollups.rebuild(), 6)  # two orders: day + month, plus the user's day + month
+        self.assertEqual({period: self.rows(period) for period in P.values}, incremental)
+        self.assertEqual(self.rows(user=self.user), per_user)
+
+    def test_sales_series_reports_currencies_without_a_rate(self):
+        self.order("10.00")
+        self.order("99.00", currency="XYZ")
+        today = timezone.localdate()
+        series = rollups.sales_series(today, today, "day")
+        self.assertEqual((series.car, series.currency, series.unconverted), ([10.0], "EUR", ["XYZ"]))
+
+
+class OrderMetaColumnsTests(TestCase):
+    def order(self, meta):
+        return Order.objects.create(category=Order.Category.AIRPORT_SERVICE, amount=Decimal("20.00"), meta=meta)
+
+    def test_save_copies_meta_into_the_columns(self):
+        order = self.order({"when": "2030-05-01T09:30:00+00:00", "email": "  Ada@Example.com "})
+        order.refresh_from_db()
+        self.assertEqual(order.scheduled_at, datetime.datetime(2030, 5, 1, 9, 30, tzinfo=datetime.timezone.utc))
+        self.assertEqual(order.customer_email, "ada@example.com")
+
+    def test_naive_and_unparseable_times(self):
+        naive = self.order({"when": "2030-05-01T09:30"})
+        self.assertEqual(naive.scheduled_at, timezone.make_aware(datetime.datetime(2030, 5, 1, 9, 30)))
+        self.assertIsNone(self.order({"when": "next tuesday"}).scheduled_at)
+        self.assertIsNone(self.order(["not", "a", "dict"]).scheduled_at)
+
+    def test_update_fields_meta_also_writes_the_columns(self):
+        order = self.order({})
+        order.meta = {"when": "2030-06-01T08:00:00+00:00", "email": "b@example.com"}
+        order.save(update_fields=["meta"])
+        order.refresh_from_db()
+        self.assertEqual((order.scheduled_at.month, order.customer_email), (6, "b@example.com"))
+
+        order.meta = {}
+        order.save(update_fields=["status"])  # meta not saved, columns left alone
+        order.refresh_from_db()
+        self.assertEqual(order.customer_email, "b@example.com")
+
+    def test_backfill_repairs_bulk_created_orders(self):
+        Order.objects.bulk_create([
+            Order(category=Order.Category.CAR_RENTAL, amount=Decimal("1.00"), meta={"email": f"c{i}@example.com"})
+            for i in range(3)
+        ])
+        self.assertEqual(schedule.backfill(batch_size=2), 3)
+        self.assertEqual(sorted(Order.objects.values_list("customer_email", flat=True)),
+                         ["c0@example.com", "c1@example.com", "c2@example.com"])
+        self.assertEqual(schedule.backfill(), 0)
+
+
+@override_settings(STORAGES={  # no collectstatic manifest in tests
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+})
+class OrderScheduleViewTests(TestCase):
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("sched", "sched@example.com", "x", is_staff=True))
+        soon = timezone.localtime() + datetime.timedelta(days=2)
+        self.ada_car = self.order(soon, "ada@example.com", Order.Category.CAR_RENTAL)
+        self.ada_service = self.order(soon, "Ada@Example.com", Order.Category.AIRPORT_SERVICE)
+        self.bob = self.order(soon, "bob@example.com", Order.Category.CAR_RENTAL)
+
+    def order(self, when, email, category):
+        return Order.objects.create(
+            category=category, amount=Decimal("10.00"), meta={"when": when.isoformat(), "email": email},
+        )
+
+    def shown(self, **params):
+        resp = self.client.get(reverse("orders:schedule"), params)
+        self.assertEqual(resp.status_code, 200)
+        return resp, {o.pk for o in resp.context["orders"]}
+
+    def test_impossible_dates_fall_back_to_the_defaults(self):
+        resp, shown = self.shown(**{"from": "2026-02-30", "to": "2026-13-01"})
+        today = timezone.localdate()
+        self.assertEqual((resp.context["start"], resp.context["end"]), (today, today + datetime.timedelta(days=13)))
+        self.assertEqual(shown, {self.ada_car.pk, self.ada_service.pk, self.bob.pk})
+
+    def test_email_and_category_filters(self):
+        self.assertEqual(self.shown(email=" ADA@example.com ")[1], {self.ada_car.pk, self.ada_service.pk})
+        self.assertEqual(self.shown(email="ada@example.com", category=Order.Category.CAR_RENTAL)[1], {self.ada_car.pk})
+        self.assertEqual(len(self.shown(category="bogus")[1]), 3)
@@ -6,6 +6,7 @@ app_name = "orders"
 
 urlpatterns = [
     path("", orders_list, name="list"),
+    path("schedule/", views.order_schedule, name="schedule"),
     path("<int:pk>/", order_detail, name="detail"),
     path("create/", views.order_create, name="create"),
     path("thanks/<int:pk>/", order_thanks, name="thanks"),
@@ -3,18 +3,20 @@ from __future__ import annotations
 import json
 from datetime import timedelta, datetime
 
-from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
-from django.db.models import Q
+from django.contrib.auth.decorators import login_required, user_passes_test
+from django.db import transaction
 from django.http import JsonResponse, HttpRequest
 from django.shortcuts import get_object_or_404, render
 from django.urls import reverse
 from django.utils import timezone
+from django.utils.dateparse import parse_date
 from django.views.decorators.http import require_POST
 
 from .models import Order
+from apps.services import reservations
 from apps.services.models import AirportService, Car
-from apps.explore.models import PlaceBooking
+from .services import schedule
+from .services.feed import KINDS, booking_feed
 
 
 @login_required
@@ -26,44 +28,64 @@ def orders_list(request: HttpRequest):
     if tab not in valid_tabs:
         tab = "all"
 
-    if tab == "tourism":
-        qs = PlaceBooking.objects.select_related("place").order_by("-created_at")
-
-        if q:
-            qs = qs.filter(
-                Q(full_name__icontains=q)
-                | Q(email__icontains=q)
-                | Q(phone__icontains=q)
-                | Q(status__icontains=q)
-                | Q(place__name__icontains=q)
-            )
-    else:
-        qs = Order.objects.all().order_by("-created_at")
-        if tab == "service":
-            qs = qs.filter(category=Order.Category.AIRPORT_SERVICE)
-        elif tab == "car":
-            qs = qs.filter(category=Order.Category.CAR_RENTAL)
-
-        if q:
-            qs = qs.filter(
-                Q(customer_name__icontains=q)
-                | Q(status__icontains=q)
-                | Q(category__icontains=q)
-            )
-
+    since = None
     if date_range in {"week", "7"}:
         since = timezone.now() - timedelta(days=7)
-        qs = qs.filter(created_at__gte=since)
     elif date_range in {"month", "30"}:
         since = timezone.now() - timedelta(days=30)
-        qs = qs.filter(created_at__gte=since)
 
-    page_obj = Paginator(qs, 15).get_page(request.GET.get("page"))
+    # "all" merges orders and tourism bookings into one feed; the other tabs are one kind.
+    paginator = booking_feed(KINDS if tab == "all" else [tab], q=q, since=since, per_page=15)
+    page_obj = paginator.get_page(cursor=request.GET.get("cursor"), number=request.GET.get("page"))
     return render(request, "orders/orders_list.html", {
         "q": q,
         "date_range": date_range,
         "tab": tab,
         "page_obj": page_obj,
+        **paginator.window(page_obj),
+    })
+
+
+def _parse_day(value: str | None, default):
+    """YYYY-MM-DD, or `default` when missing, malformed or impossible (e.g. 2026-02-30)."""
+    try:
+        return parse_date(value or "") or default
+    except ValueError:
+        return default
+
+
+@user_passes_test(lambda u: u.is_staff)
+def order_schedule(request: HttpRequest):
+    """
+    Staff: upcoming bookings by scheduled time (?from=&to= YYYY-MM-DD,
+    default the next 14 days), optionally for one customer email/category.
+    """
+    today = timezone.localdate()
+    start = _parse_day(request.GET.get("from"), today)
+    end = _parse_day(request.GET.get("to"), start + timedelta(days=13))
+    if end < start:
+        end = start
+    email = (request.GET.get("email") or "").strip()
+    category = request.GET.get("category") or ""
+    if category not in Order.Category.values:
+        category = ""
+
+    tz = timezone.get_current_timezone()
+    qs = schedule.upcoming(
+        datetime.combine(start, datetime.min.time(), tz),
+        datetime.combine(end, datetime.max.time(), tz),
+        email=email, category=category,
+    )
+    rows = list(qs[: schedule.UPCOMING_LIMIT + 1])
+    return render(request, "orders/schedule.html", {
+        "orders": rows[: schedule.UPCOMING_LIMIT],
+        "truncated": len(rows) > schedule.UPCOMING_LIMIT,
+        "limit": schedule.UPCOMING_LIMIT,
+        "start": start,
+        "end": end,
+        "email": email,
+        "category": category,
+        "categories": Order.Category.choices,
     })
 
 
@@ -131,27 +153,44 @@ def order_create(request: HttpRequest):
     elif object_type == "car":
         obj = get_object_or_404(Car, pk=object_id)
         category = Order.Category.CAR_RENTAL
+        try:
+            days = min(max(int(payload.get("days") or 1), 1), 60)
+        except (TypeError, ValueError):
+            return JsonResponse({"error": "Invalid rental length."}, status=400)
         amount = obj.price or 0
         currency = "EUR"
         meta = {
             "car_id": obj.id,
             "car_name": obj.name,
             "when": dt.isoformat(),
+            "days": days,
             "email": email,
             "phone": phone,
         }
     else:
         return JsonResponse({"error": "Unknown object type."}, status=400)
 
-    o = Order.objects.create(
-        user=request.user,
-        category=category,
-        amount=amount,
-        currency=currency,
-        status=Order.Status.PAID,  # keep or change to PENDING as you prefer
-        customer_name=name,
-        meta=meta,
-    )
+    # Capacity is taken in the same transaction as the order, so a failed
+    # booking holds nothing (see apps.services.reservations).
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt)
+    try:
+        with transaction.atomic():
+            if object_type == "service":
+                reservations.reserve_service(obj, dt)
+            o = Order.objects.create(
+                user=request.user,
+                category=category,
+                amount=amount,
+                currency=currency,
+                status=Order.Status.PAID,  # keep or change to PENDING as you prefer
+                customer_name=name,
+                meta=meta,
+            )
+            if object_type == "car":
+                reservations.reserve_car(obj, dt, dt + timedelta(days=days), order=o)
+    except reservations.Unavailable as exc:
+        return JsonResponse({"error": str(exc)}, status=409)
 
     # Redirect regular users to a receipt; admins could still navigate to list.
     return JsonResponse({
@@ -1,10 +1,10 @@
 from django.contrib import admin
-from .models import AirportService, CarCategory, Car, Order, Invoice
+from .models import AirportService, CarCategory, Car, CarReservation, Order, Invoice, ServiceSlot
 
 
 @admin.register(AirportService)
 class AirportServiceAdmin(admin.ModelAdmin):
-    list_display = ("name", "price", "available")
+    list_display = ("name", "price", "slot_capacity", "available")
     list_filter = ("available",)
     search_fields = ("name", "description", "tags")
 
@@ -53,3 +53,21 @@ class InvoiceAdmin(admin.ModelAdmin):
     list_display = ("id", "order", "issued_by", "amount", "paid", "created_at")
     list_filter = ("paid", "created_at")
     search_fields = ("order__id", "issued_by__username")
+
+
+@admin.register(ServiceSlot)
+class ServiceSlotAdmin(admin.ModelAdmin):
+    list_display = ("service", "starts_at", "booked", "capacity")
+    list_filter = ("service",)
+    date_hierarchy = "starts_at"
+    list_select_related = ("service",)
+
+
+@admin.register(CarReservation)
+class CarReservationAdmin(admin.ModelAdmin):
+    list_display = ("car", "starts_at", "ends_at", "order", "rental", "created_at")
+    list_filter = ("car",)
+    date_hierarchy = "starts_at"
+    list_select_related = ("car",)
+    raw_id_fields = ("order", "rental")
+
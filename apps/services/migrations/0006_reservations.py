@@ -0,0 +1,56 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0004_order_schedule_columns'),
+        ('services', '0005_alter_carcategory_options_alter_order_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='airportservice',
+            name='slot_capacity',
+            field=models.PositiveSmallIntegerField(default=4),
+        ),
+        migrations.AddField(
+            model_name='car',
+            name='booking_seq',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.CreateModel(
+            name='CarReservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('car', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='services.car')),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='car_reservations', to='orders.order')),
+                ('rental', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='car_reservations', to='services.order')),
+            ],
+            options={
+                'ordering': ['starts_at'],
+                'indexes': [models.Index(fields=['car', 'starts_at', 'ends_at'], name='services_ca_car_id_db8200_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('ends_at__gt', models.F('starts_at'))), name='car_reservation_positive')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ServiceSlot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('starts_at', models.DateTimeField()),
+                ('capacity', models.PositiveSmallIntegerField()),
+                ('booked', models.PositiveSmallIntegerField(default=0)),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='slots', to='services.airportservice')),
+            ],
+            options={
+                'ordering': ['starts_at'],
+                'constraints': [models.UniqueConstraint(fields=('service', 'starts_at'), name='service_slot_uniq'), models.CheckConstraint(condition=models.Q(('booked__lte', models.F('capacity'))), name='service_slot_within_capacity')],
+            },
+        ),
+    ]
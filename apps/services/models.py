@@ -1,5 +1,7 @@
 from django.conf import settings
-from django.db import models
+from django.db import models, transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
 from django.urls import reverse
 from django.core.validators import MinValueValidator
 
@@ -15,6 +17,8 @@ class AirportService(models.Model):
     available = models.BooleanField(default=True, db_index=True)
     image = models.ImageField(upload_to="services/", blank=True, null=True)
     tags = models.CharField(max_length=200, blank=True, default="")
+    # Bookings accepted per time slot (SERVICE_SLOT_MINUTES); see reservations.py.
+    slot_capacity = models.PositiveSmallIntegerField(default=4)
 
     class Meta:
         ordering = ["name"]
@@ -68,6 +72,9 @@ class Car(models.Model):
         max_digits=10, decimal_places=2, default=0, validators=[MinValueValidator(0)]
     )
     available = models.BooleanField(default=True, db_index=True)
+    # Bumped by every reservation attempt; the UPDATE row-locks the car so
+    # overlap check + insert run one at a time per car (reservations.py).
+    booking_seq = models.PositiveIntegerField(default=0, editable=False)
 
     created_at = models.DateTimeField(auto_now_add=True, db_index=True)
 
@@ -141,10 +148,45 @@ class Order(models.Model):
         elif self.order_type == "car":
             if not self.car or self.service:
                 raise ValidationError("Car orders must reference a car only.")
+            if self.start_date and self.end_date and self.end_date < self.start_date:
+                raise ValidationError("The rental must end on or after its start date.")
+            if self.start_date:
+                # Early, friendly answer for forms; reserve_car() in save() is the real guard.
+                from .reservations import overlapping, rental_period
+
+                clashes = overlapping(self.car_id, *rental_period(self.start_date, self.end_date))
+                if self.pk is not None:
+                    clashes = clashes.exclude(rental_id=self.pk)  # its own hold is released on save
+                if clashes.exists():
+                    raise ValidationError(f"{self.car} is already booked for these dates.")
+
+    RESERVATION_FIELDS = ("order_type", "car_id", "start_date", "end_date")
+
+    def _reservation_changed(self) -> bool:
+        """True when saving must (re)reserve: a new dated car rental, or a change to the held interval."""
+        if self.pk is None:
+            return self.order_type == "car" and bool(self.start_date)
+        old = Order.objects.filter(pk=self.pk).values(*self.RESERVATION_FIELDS).first()
+        return old is None or any(old[f] != getattr(self, f) for f in self.RESERVATION_FIELDS)
 
     def save(self, *args, **kwargs):
         self.full_clean()
-        return super().save(*args, **kwargs)
+        if not self._reservation_changed():
+            return super().save(*args, **kwargs)
+        from django.core.exceptions import ValidationError
+
+        from .reservations import Unavailable, rental_period, reserve_car
+
+        # Release the old hold and take the new one in the same transaction,
+        # so a clash leaves the rental and its reservation as they were.
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.car_reservations.all().delete()
+            if self.order_type == "car" and self.start_date:
+                try:
+                    reserve_car(self.car, *rental_period(self.start_date, self.end_date), rental=self)
+                except Unavailable as exc:
+                    raise ValidationError(str(exc)) from exc
 
 
 class Invoice(models.Model):
@@ -164,3 +206,92 @@ class Invoice(models.Model):
 
     def __str__(self) -> str:
         return f"Invoice {self.id} for Order {self.order.id}"
+
+
+class ServiceSlot(models.Model):
+    """Booking counter for one airport service time slot; booked never exceeds capacity."""
+
+    service = models.ForeignKey(AirportService, on_delete=models.CASCADE, related_name="slots")
+    starts_at = models.DateTimeField()
+    capacity = models.PositiveSmallIntegerField()
+    booked = models.PositiveSmallIntegerField(default=0)
+
+    class Meta:
+        ordering = ["starts_at"]
+        constraints = [
+            models.UniqueConstraint(fields=["service", "starts_at"], name="service_slot_uniq"),
+            models.CheckConstraint(condition=models.Q(booked__lte=models.F("capacity")), name="service_slot_within_capacity"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.service} @ {self.starts_at:%Y-%m-%d %H:%M}: {self.booked}/{self.capacity}"
+
+
+class CarReservation(models.Model):
+    """A car held for [starts_at, ends_at); reservations of one car never overlap."""
+
+    car = models.ForeignKey(Car, on_delete=models.CASCADE, related_name="reservations")
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField()
+    # Booking that holds it: a checkout order or a services.Order rental.
+    order = models.ForeignKey(
+        "orders.Order", null=True, blank=True, on_delete=models.CASCADE, related_name="car_reservations"
+    )
+    rental = models.ForeignKey(
+        Order, null=True, blank=True, on_delete=models.CASCADE, related_name="car_reservations"
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["starts_at"]
+        indexes = [
+            # overlap test: car = ? AND starts_at < :end AND ends_at > :start
+            models.Index(fields=["car", "starts_at", "ends_at"]),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(ends_at__gt=models.F("starts_at")), name="car_reservation_positive"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.car}: {self.starts_at:%Y-%m-%d %H:%M} – {self.ends_at:%Y-%m-%d %H:%M}"
+
+
+# --- Give capacity back when a checkout order stops holding it ---
+#
+# reserve_service()/reserve_car() run when orders.Order is created (see
+# orders.views.order_create); cancelling, refunding or deleting the order
+# releases its slot place and its car reservations.
+
+RELEASING_STATUSES = ("CANCELED", "REFUNDED")
+
+
+def _release_order(order) -> None:
+    from .reservations import release_service
+
+    with transaction.atomic():
+        service_id = (order.meta or {}).get("service_id") if isinstance(order.meta, dict) else None
+        if service_id and order.scheduled_at:
+            release_service(service_id, order.scheduled_at)
+        CarReservation.objects.filter(order_id=order.pk).delete()
+
+
+@receiver(pre_save, sender="orders.Order")
+def _remember_held_status(sender, instance, raw=False, **kwargs):
+    instance._held_status = None
+    if not raw and instance.pk:
+        instance._held_status = sender.objects.filter(pk=instance.pk).values_list("status", flat=True).first()
+
+
+@receiver(post_save, sender="orders.Order")
+def _release_on_cancel(sender, instance, created=False, raw=False, **kwargs):
+    old = getattr(instance, "_held_status", None)
+    if raw or created or old is None:
+        return
+    if instance.status in RELEASING_STATUSES and old not in RELEASING_STATUSES:
+        _release_order(instance)
+
+
+@receiver(post_delete, sender="orders.Order")
+def _release_on_delete(sender, instance, **kwargs):
+    if instance.status not in RELEASING_STATUSES:  # a cancelled order gave its place back already
+        _release_order(instance)
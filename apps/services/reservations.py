@@ -0,0 +1,111 @@
+"""
+Capacity checks for bookings, safe under concurrent requests without
+application locks:
+
+* Airport services: the day is cut into SERVICE_SLOT_MINUTES slots, each
+  a ServiceSlot counter. Booking is one conditional UPDATE
+  (booked = booked + 1 WHERE booked < capacity); a check constraint backs it.
+* Cars: a reservation is an interval [starts_at, ends_at). The car row is
+  bumped first (UPDATE ... booking_seq + 1), which row-locks it until the
+  transaction ends, so the indexed overlap check and the insert that
+  follows can't interleave with another booking of the same car.
+
+Call these inside the transaction that creates the order, so a failed
+order releases what it reserved. Cancelling, refunding or deleting a
+checkout order gives its capacity back (receivers in services.models).
+"""
+from __future__ import annotations
+
+import datetime
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import AirportService, Car, CarReservation, ServiceSlot
+
+
+class Unavailable(Exception):
+    """The requested slot or period is fully booked (or the resource is not bookable)."""
+
+
+def slot_minutes() -> int:
+    return max(1, getattr(settings, "SERVICE_SLOT_MINUTES", 30))
+
+
+def slot_start(when: datetime.datetime) -> datetime.datetime:
+    """Start of the slot containing `when` (slots are aligned to local midnight)."""
+    when = timezone.localtime(when) if timezone.is_aware(when) else timezone.make_aware(when)
+    minutes = when.hour * 60 + when.minute
+    start = minutes - minutes % slot_minutes()
+    return when.replace(hour=start // 60, minute=start % 60, second=0, microsecond=0)
+
+
+# ---------- airport services: per-slot counters ----------
+
+def reserve_service(service: AirportService, when: datetime.datetime) -> ServiceSlot:
+    """Take one place in the service's slot at `when`, or raise Unavailable."""
+    if not service.available or service.slot_capacity < 1:
+        raise Unavailable(f"{service} is not available for booking.")
+    start = slot_start(when)
+    # Create the counter on first use; a concurrent creator makes this a no-op.
+    ServiceSlot.objects.bulk_create(
+        [ServiceSlot(service=service, starts_at=start, capacity=service.slot_capacity)],
+        ignore_conflicts=True,
+    )
+    taken = ServiceSlot.objects.filter(service=service, starts_at=start, booked__lt=F("capacity")).update(
+        booked=F("booked") + 1,
+    )
+    if not taken:
+        raise Unavailable(f"{service} is fully booked at {start:%d %b %Y %H:%M}.")
+    return ServiceSlot.objects.get(service=service, starts_at=start)
+
+
+def release_service(service_id: int, when: datetime.datetime) -> bool:
+    """Give back one place in the slot at `when` (e.g. when an order is cancelled)."""
+    return bool(
+        ServiceSlot.objects.filter(service_id=service_id, starts_at=slot_start(when), booked__gt=0).update(
+            booked=F("booked") - 1,
+        )
+    )
+
+
+# ---------- cars: interval overlap ----------
+
+def overlapping(car_id: int, starts_at: datetime.datetime, ends_at: datetime.datetime):
+    """Reservations of the car intersecting [starts_at, ends_at) (served by the (car, starts_at, ends_at) index)."""
+    return CarReservation.objects.filter(car_id=car_id, starts_at__lt=ends_at, ends_at__gt=starts_at)
+
+
+def reserve_car(car: Car, starts_at: datetime.datetime, ends_at: datetime.datetime,
+                order=None, rental=None) -> CarReservation:
+    """Hold the car for [starts_at, ends_at), or raise Unavailable if any reservation overlaps."""
+    if ends_at <= starts_at:
+        raise Unavailable("The rental must end after it starts.")
+    with transaction.atomic():
+        # Write first: the bump is the lock. It row-locks the car (and on
+        # SQLite takes the write lock) before the overlap check, so concurrent
+        # bookings of this car queue; a plain SELECT would let two checks pass
+        # together. When the check fails, raising out of this atomic block
+        # rolls the bump back with everything else.
+        if not Car.objects.filter(pk=car.pk, available=True).update(booking_seq=F("booking_seq") + 1):
+            raise Unavailable(f"{car} is not available for booking.")
+        clash = overlapping(car.pk, starts_at, ends_at).order_by("starts_at").first()
+        if clash is not None:
+            raise Unavailable(
+                f"{car} is already booked {timezone.localtime(clash.starts_at):%d %b %H:%M} – "
+                f"{timezone.localtime(clash.ends_at):%d %b %H:%M}."
+            )
+        return CarReservation.objects.create(car=car, starts_at=starts_at, ends_at=ends_at, order=order, rental=rental)
+
+
+def rental_period(start_date: datetime.date, end_date: Optional[datetime.date] = None):
+    """Whole-day rental dates (end inclusive) as an aware [start, end) interval."""
+    tz = timezone.get_current_timezone()
+    end_date = end_date or start_date
+    return (
+        datetime.datetime.combine(start_date, datetime.time.min, tz),
+        datetime.datetime.combine(end_date + datetime.timedelta(days=1), datetime.time.min, tz),
+    )
@@ -1,3 +1,204 @@
-from django.test import TestCase
+import json
+import threading
+from datetime import datetime, timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import connection, connections
+from django.test import Client, TestCase, TransactionTestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.orders.models import Order as CheckoutOrder
+
+from . import reservations
+from .models import AirportService, Car, CarReservation, Order, ServiceSlot
+
+User = get_user_model()
+
+
+def _at(hour, minute=0, days=7):
+    day = timezone.localdate() + timedelta(days=days)
+    return timezone.make_aware(datetime(day.year, day.month, day.day, hour, minute))
+
+
+class ReservationTests(TestCase):
+    def setUp(self):
+        self.service = AirportService.objects.create(name="Fast track", price=Decimal("20"), slot_capacity=2)
+        self.car = Car.objects.create(name="Corolla", price=Decimal("50"))
+
+    def test_service_slot_capacity(self):
+        reservations.reserve_service(self.service, _at(9, 5))
+        reservations.reserve_service(self.service, _at(9, 25))  # same 09:00 slot
+        with self.assertRaises(reservations.Unavailable):
+            reservations.reserve_service(self.service, _at(9, 10))
+        reservations.reserve_service(self.service, _at(9, 30))  # next slot
+        self.assertTrue(reservations.release_service(self.service.pk, _at(9, 0)))
+        reservations.reserve_service(self.service, _at(9, 0))
+        self.assertEqual(ServiceSlot.objects.get(starts_at=_at(9, 0)).booked, 2)
+
+    def test_car_intervals_may_touch_but_not_overlap(self):
+        reservations.reserve_car(self.car, _at(10), _at(14))
+        reservations.reserve_car(self.car, _at(14), _at(16))
+        with self.assertRaises(reservations.Unavailable):
+            reservations.reserve_car(self.car, _at(13), _at(15))
+        self.assertEqual(CarReservation.objects.count(), 2)
+
+    def test_rental_order_dates_are_checked(self):
+        user = User.objects.create_user("r", "r@example.com", "x")
+        start = timezone.localdate() + timedelta(days=3)
+        Order.objects.create(user=user, order_type="car", car=self.car, start_date=start, end_date=start + timedelta(days=2))
+        with self.assertRaises(ValidationError):
+            Order.objects.create(user=user, order_type="car", car=self.car, start_date=start + timedelta(days=2))
+        self.assertEqual(CarReservation.objects.count(), 1)
+
+    def rental(self, start, days=1, car=None):
+        user = User.objects.get_or_create(username="r", defaults={"email": "r@example.com"})[0]
+        return Order.objects.create(
+            user=user, order_type="car", car=car or self.car, start_date=start, end_date=start + timedelta(days=days - 1),
+        )
+
+    def held(self, rental):
+        return [(r.car_id, r.starts_at, r.ends_at) for r in rental.car_reservations.all()]
+
+    def test_editing_a_rental_moves_its_reservation(self):
+        start = timezone.localdate() + timedelta(days=3)
+        rental = self.rental(start, days=2)
+        rental.start_date, rental.end_date = start + timedelta(days=1), start + timedelta(days=3)  # overlaps its old dates
+        rental.save()
+        self.assertEqual(self.held(rental), [(self.car.pk, *reservations.rental_period(rental.start_date, rental.end_date))])
+
+        other = Car.objects.create(name="Yaris", price=Decimal("40"))
+        rental.car = other
+        rental.save()
+        self.assertEqual([car for car, *_ in self.held(rental)], [other.pk])
+        self.rental(start + timedelta(days=1))  # the first car is free again
+
+    def test_editing_into_a_clash_keeps_the_old_reservation(self):
+        start = timezone.localdate() + timedelta(days=3)
+        first, second = self.rental(start), self.rental(start + timedelta(days=5))
+        before = self.held(second)
+        second.start_date = second.end_date = start
+        with self.assertRaises(ValidationError):
+            second.save()
+        self.assertEqual(self.held(second), before)
+        self.assertEqual(Order.objects.get(pk=second.pk).start_date, start + timedelta(days=5))
+        self.assertEqual(len(self.held(first)), 1)
+
+    def test_unbookable_car_is_a_validation_error(self):
+        Car.objects.filter(pk=self.car.pk).update(available=False)
+        with self.assertRaises(ValidationError):
+            self.rental(timezone.localdate() + timedelta(days=3))
+        self.assertFalse(Order.objects.exists())
+
+
+
+class CheckoutReleaseTests(TestCase):
+    """Cancelled, refunded or deleted checkout orders give their capacity back."""
+
+    def setUp(self):
+        self.client.force_login(User.objects.create_user("rel", "rel@example.com", "x"))
+        self.service = AirportService.objects.create(name="Lounge", price=Decimal("25"), slot_capacity=1)
+        self.car = Car.objects.create(name="Polo", price=Decimal("45"))
+
+    def book(self, object_type, object_id, when, **extra):
+        payload = {
+            "object_type": object_type, "object_id": object_id, "when": when.strftime("%Y-%m-%dT%H:%M"),
+            "name": "Rel", "email": "rel@example.com", "phone": "1", **extra,
+        }
+        resp = self.client.post(reverse("orders:create"), json.dumps(payload), content_type="application/json")
+        return resp.status_code, CheckoutOrder.objects.filter(pk=resp.json().get("order_id")).first()
+
+    def set_status(self, order, status):
+        order.status = status
+        order.save()
+
+    def test_cancelled_booking_frees_its_slot(self):
+        status, order = self.book("service", self.service.pk, _at(11, 5))
+        self.assertEqual(status, 200)
+        self.assertEqual(self.book("service", self.service.pk, _at(11, 20))[0], 409)
+
+        self.set_status(order, CheckoutOrder.Status.CANCELED)
+        self.assertEqual(ServiceSlot.objects.get(service=self.service).booked, 0)
+        self.set_status(order, CheckoutOrder.Status.REFUNDED)  # still released: no second give-back
+        order.delete()
+        self.assertEqual(ServiceSlot.objects.get(service=self.service).booked, 0)
+        self.assertEqual(self.book("service", self.service.pk, _at(11, 20))[0], 200)
+
+    def test_refunded_booking_frees_its_car(self):
+        status, order = self.book("car", self.car.pk, _at(10), days=2)
+        self.assertEqual(status, 200)
+        self.assertEqual(self.book("car", self.car.pk, _at(12), days=1)[0], 409)
+
+        self.set_status(order, CheckoutOrder.Status.REFUNDED)
+        self.assertFalse(CarReservation.objects.filter(order=order).exists())
+        self.assertEqual(self.book("car", self.car.pk, _at(12), days=1)[0], 200)
+
+    def test_deleted_booking_frees_its_slot_and_car(self):
+        _, service_order = self.book("service", self.service.pk, _at(15))
+        _, car_order = self.book("car", self.car.pk, _at(15), days=1)
+        service_order.delete()
+        car_order.delete()
+        self.assertEqual(ServiceSlot.objects.get(service=self.service).booked, 0)
+        self.assertFalse(CarReservation.objects.exists())
+
+class BookingStressTests(TransactionTestCase):
+    """Fires parallel booking requests at order_create; capacity must hold exactly."""
+
+    threads = 12
+
+    def setUp(self):
+        if connection.vendor == "sqlite" and connection.is_in_memory_db():
+            self.skipTest("shared-cache in-memory SQLite fails concurrent writers instead of queueing them")
+        self.user = User.objects.create_user("stress", "stress@example.com", "x")
+
+    def _fire(self, payloads):
+        barrier = threading.Barrier(len(payloads))
+        statuses, errors = [], []
+
+        def worker(payload):
+            try:
+                client = Client()
+                client.force_login(self.user)
+                barrier.wait()
+                resp = client.post(reverse("orders:create"), json.dumps(payload), content_type="application/json")
+                statuses.append(resp.status_code)
+            except Exception as exc:  # pragma: no cover - reported below
+                errors.append(exc)
+            finally:
+                connections.close_all()
+
+        pool = [threading.Thread(target=worker, args=(p,)) for p in payloads]
+        for t in pool:
+            t.start()
+        for t in pool:
+            t.join()
+        self.assertEqual(errors, [])
+        return statuses
+
+    def _payload(self, object_type, object_id, when, **extra):
+        return {
+            "object_type": object_type, "object_id": object_id, "when": when.strftime("%Y-%m-%dT%H:%M"),
+            "name": "Stress", "email": "stress@example.com", "phone": "1", **extra,
+        }
+
+    def test_parallel_service_bookings_fill_the_slot_exactly(self):
+        service = AirportService.objects.create(name="Meet & greet", price=Decimal("30"), slot_capacity=3)
+        statuses = self._fire([self._payload("service", service.pk, _at(8, 10)) for _ in range(self.threads)])
+
+        self.assertEqual(statuses.count(200), 3)
+        self.assertEqual(statuses.count(409), self.threads - 3)
+        self.assertEqual(ServiceSlot.objects.get(service=service).booked, 3)
+        self.assertEqual(CheckoutOrder.objects.filter(category=CheckoutOrder.Category.AIRPORT_SERVICE).count(), 3)
+
+    def test_parallel_overlapping_car_bookings_admit_one(self):
+        car = Car.objects.create(name="Golf", price=Decimal("40"))
+        # Staggered starts, all overlapping the 2-day window of every other request.
+        payloads = [self._payload("car", car.pk, _at(9, 0) + timedelta(hours=i), days=2) for i in range(self.threads)]
+        statuses = self._fire(payloads)
+
+        self.assertEqual(statuses.count(200), 1)
+        self.assertEqual(statuses.count(409), self.threads - 1)
+        self.assertEqual(CarReservation.objects.filter(car=car).count(), 1)
+        self.assertEqual(CheckoutOrder.objects.filter(category=CheckoutOrder.Category.CAR_RENTAL).count(), 1)
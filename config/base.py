@@ -107,3 +107,38 @@ EXPLORE_CACHE_TTL_NEARBY = int(os.getenv("EXPLORE_CACHE_TTL_NEARBY", "86400"))
 EXPLORE_CACHE_TTL_DETAILS = int(os.getenv("EXPLORE_CACHE_TTL_DETAILS", "604800"))  # 7d
 EXPLORE_MAX_RESULTS = int(os.getenv("EXPLORE_MAX_RESULTS", "10"))
 EXPLORE_DAILY_CAP = int(os.getenv("EXPLORE_DAILY_CAP", "500"))
+EXPLORE_CACHE_TTL_DEMAND = int(os.getenv("EXPLORE_CACHE_TTL_DEMAND", "300"))  # 5m
+
+# -------------------- Dashboard -------------------- #
+DASHBOARD_SALES_CACHE_TTL = int(os.getenv("DASHBOARD_SALES_CACHE_TTL", "300"))  # seconds per chart range; keyed by data version
+
+# -------------------- List views -------------------- #
+LIST_COUNT_CACHE_TTL = int(os.getenv("LIST_COUNT_CACHE_TTL", "60"))  # seconds a filtered list total is reused
+
+# -------------------- Bookings -------------------- #
+SERVICE_SLOT_MINUTES = int(os.getenv("SERVICE_SLOT_MINUTES", "30"))  # airport service slot length; capacity is per slot
+
+# -------------------- Currency -------------------- #
+BASE_CURRENCY = os.getenv("BASE_CURRENCY", "EUR")  # reports total in this currency
+FX_RATES_FILE = os.getenv("FX_RATES_FILE", str(BASE_DIR / "config" / "fx_rates.json"))  # JSON or CSV, see core.fx
+
+# -------------------- Invoices / PDF -------------------- #
+INVOICE_AGING_CACHE_TTL = int(os.getenv("INVOICE_AGING_CACHE_TTL", "120"))  # seconds
+INVOICE_PDF_BROWSER_PAGES = int(os.getenv("INVOICE_PDF_BROWSER_PAGES", "2"))  # concurrent renders per worker
+INVOICE_PDF_BROWSER_RECYCLE_AFTER = int(os.getenv("INVOICE_PDF_BROWSER_RECYCLE_AFTER", "200"))
+INVOICE_PDF_RENDER_TIMEOUT = int(os.getenv("INVOICE_PDF_RENDER_TIMEOUT", "30"))  # seconds
+INVOICE_PDF_TEMPLATE_VERSION = os.getenv("INVOICE_PDF_TEMPLATE_VERSION", "1")  # bump to invalidate stored PDFs
+INVOICE_PDF_ENGINES = os.getenv("INVOICE_PDF_ENGINES", "playwright,weasyprint,reportlab").split(",")  # try in order
+INVOICE_PDF_ENGINE_MAX_FAILURES = int(os.getenv("INVOICE_PDF_ENGINE_MAX_FAILURES", "3"))  # consecutive, then cooldown
+INVOICE_PDF_ENGINE_COOLDOWN = int(os.getenv("INVOICE_PDF_ENGINE_COOLDOWN", "300"))  # seconds an engine sits out
+INVOICE_BULK_PDF_WORKERS = int(os.getenv("INVOICE_BULK_PDF_WORKERS", "4"))  # render threads per bulk send
+INVOICE_EMAIL_BATCH_SIZE = int(os.getenv("INVOICE_EMAIL_BATCH_SIZE", "50"))  # PDFs in memory / outcomes recorded per batch
+INVOICE_EXPORT_WORKERS = int(os.getenv("INVOICE_EXPORT_WORKERS", "4"))  # parallel renders per ZIP export
+INVOICE_PDF_PREWARM = os.getenv("INVOICE_PDF_PREWARM", "false").lower() == "true"  # warm WeasyPrint at worker boot
+
+# -------------------- Background jobs (core.Job, manage.py run_worker) -------------------- #
+JOBS_MAX_ATTEMPTS = int(os.getenv("JOBS_MAX_ATTEMPTS", "5"))
+JOBS_RETRY_BACKOFF = int(os.getenv("JOBS_RETRY_BACKOFF", "30"))  # seconds; doubles per attempt
+JOBS_VISIBILITY_TIMEOUT = int(os.getenv("JOBS_VISIBILITY_TIMEOUT", "300"))  # seconds before a stuck job is re-run
+JOBS_POLL_INTERVAL = float(os.getenv("JOBS_POLL_INTERVAL", "2"))
+JOBS_RUN_EAGERLY = os.getenv("JOBS_RUN_EAGERLY", "false").lower() == "true"  # run on commit, no worker (dev)
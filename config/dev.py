@@ -32,6 +32,13 @@ DATABASES = {
     )
 }
 
+# SQLite tests default to an in-memory database, which fails concurrent
+# writers instead of queueing them; a file lets the invoice numbering and
+# booking capacity concurrency tests actually run.
+if DATABASES["default"]["ENGINE"] == "django.db.backends.sqlite3":
+    _db_file = Path(DATABASES["default"]["NAME"])
+    DATABASES["default"].setdefault("TEST", {}).setdefault("NAME", str(_db_file.with_name(f"test_{_db_file.name}")))
+
 # -------------------- STATIC (WhiteNoise ok in dev too) -------------------- #
 
 MIDDLEWARE.insert(1, "whitenoise.middleware.WhiteNoiseMiddleware")
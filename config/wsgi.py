@@ -4,3 +4,15 @@ from django.core.wsgi import get_wsgi_application
 # Default to dev for local runserver; production should set DJANGO_SETTINGS_MODULE=config.prod
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.dev")
 application = get_wsgi_application()
+
+# Detect usable PDF engines once per worker, and optionally build the
+# WeasyPrint fonts/stylesheets before the first invoice PDF.
+from django.conf import settings  # noqa: E402
+
+from apps.invoices.services import pdf_engines  # noqa: E402
+
+_pdf_engines = pdf_engines.probe()
+if getattr(settings, "INVOICE_PDF_PREWARM", False) and _pdf_engines.get("weasyprint"):
+    from apps.invoices.services.weasy import prewarm
+
+    prewarm()